@@ -1,69 +1,204 @@
-from Belief_base.belief_base import BeliefBase, select_remainders, intersect_selected
+from Belief_base.belief_base import BeliefBase, select_remainders, intersect_selected, SELECTION_METHODS, UNKNOWN_POLICIES
+from Belief_base.budget import BudgetExceeded, UNKNOWN
 from Belief_base.formula import Formula, Atom, Not, Or, And
-from Belief_base.entailment import resolution_entails
+from Belief_base.entailment import clauses_for_belief
+from Belief_base.incremental import IncrementalEntailment
+from Belief_base.instrumentation import instrumented
+
+# Contraction used by revise: "partial_meet" keeps the intersection of the best remainders,
+# "kernel" cuts the lowest-priority belief out of every kernel
+REVISION_STRATEGIES = ("partial_meet", "kernel")
 
 class BeliefRevisionAgent:
-    def __init__(self):
-        self.base = BeliefBase()
+    # engine picks the entailment checker, "resolution" (default), "sat" for the CDCL solver or "bdd" for a compiled base
+    # remainder_method picks how contraction searches for remainders, see REMAINDER_METHODS in belief_base.py
+    # cache_size bounds the belief base's entailment cache, 0 turns it off
+    # store_cnf=False keeps beliefs as given instead of converting them with to_cnf
+    # selection picks how contraction chooses remainders, see SELECTION_METHODS in belief_base.py
+    # workers is the number of processes used by remainder_method="parallel", all cores by default
+    # unknown_policy decides what a contraction under a budget does with a check that runs out of it, see
+    # UNKNOWN_POLICIES in belief_base.py
+    # relevance_filter=False hands every belief to each entailment check instead of only the ones connected to the query
+    def __init__(self, engine="resolution", remainder_method="combinations", cache_size=1024, store_cnf=True,
+                 selection="enumerate", workers=None, unknown_policy="raise", relevance_filter=True):
+        self.base = BeliefBase(engine=engine, remainder_method=remainder_method, cache_size=cache_size,
+                               store_cnf=store_cnf, workers=workers, relevance_filter=relevance_filter)
+        self._check_selection(selection)
+        self.selection = selection
+        self._check_unknown_policy(unknown_policy)
+        self.unknown_policy = unknown_policy
+
+    @staticmethod
+    def _check_selection(selection):
+        if selection not in SELECTION_METHODS:
+            raise ValueError(f"Unknown selection method: {selection!r}, expected one of {list(SELECTION_METHODS)}")
+
+    @staticmethod
+    def _check_unknown_policy(policy):
+        if policy not in UNKNOWN_POLICIES:
+            raise ValueError(f"Unknown policy for unknown results: {policy!r}, expected one of {list(UNKNOWN_POLICIES)}")
         
     # Method to ask AI agent if a given belief base entails a query φ
-    def ask(self,query: Formula) -> bool:
-        return resolution_entails(self.base, query)
+    # engine overrides the belief base's engine for this query, engine="bdd" compiles the belief base to a BDD on the
+    # first such query after a change and answers from it until the next change (see self.base.compiled_stats())
+    # With a budget (Budget in budget.py) the answer is an EntailmentResult: entailed, not entailed, or unknown when
+    # the check ran out of the budget
+    @instrumented("ask")
+    def ask(self,query: Formula, engine=None, budget=None):
+        return self.base.entails(query, engine=engine, budget=budget)
+    
+    # Asks many queries against the current belief base at once, the answers come back in the same order as the queries
+    # workers > 1 spreads the queries over that many processes, the result also reports the queries per second
+    def ask_many(self, queries, workers=None):
+        return self.base.entails_many(queries, workers=workers)
     
     # Method to add beliefs to the belief base with a given priority
     
     # Contract partial meet is a method that removves a belief from the belief base whilst still keeping the belief base consistent
-    def contract_partial_meet(self, formula: Formula):
+    # selection overrides self.selection for this call
+    # With a budget every entailment check of the contraction runs under it, and self.unknown_policy decides what a
+    # check that runs out counts as. Branch and bound needs proofs from the solver, so the enumerate selection is used
+    @instrumented("contract_partial_meet")
+    def contract_partial_meet(self, formula: Formula, selection=None, budget=None):
+        selection = selection or self.selection
+        self._check_selection(selection)
         
         # Vacuity check: if the belief base doesn't entail the formula, no need to contract
-        if not resolution_entails(self.base, formula):
+        if budget is None:
+            if not self.base.entails(formula):
+                return
+        elif not self._entailed_within(formula, budget):
             return
-        
-        # Compute all maximal subsets of the belief base that do not entail the formula
-        remainders = self.base.compute_remainders(formula)
+        self._contract_partial_meet(formula, selection, budget)
+
+    # The vacuity check under a budget, an unknown answer goes through self.unknown_policy
+    def _entailed_within(self, formula: Formula, budget) -> bool:
+        result = self.base.entails(formula, budget=budget)
+        if result.status != UNKNOWN:
+            return result.entailed
+        if self.unknown_policy == "raise":
+            raise BudgetExceeded(result.reason, result.stats)
+        return self.unknown_policy == "entailed"
+
+    # The partial meet contraction itself, for a formula the belief base is known to entail
+    def _contract_partial_meet(self, formula: Formula, selection, budget=None):
+        if selection == "branch_and_bound" and budget is None:
+            # Search directly for the highest priority remainders instead of computing all of them first
+            selected = self.base.best_remainders(formula)
+        else:
+            # Compute all maximal subsets of the belief base that do not entail the formula
+            remainders = self.base.compute_remainders(formula, budget=budget, on_unknown=self.unknown_policy)
+            
+            # Get the priority values in the same order as belief indices
+            priorities = [pri for _, pri in self.base.get_prioritized_beliefs()]
+            
+            # Select the remainders with the highest total priority
+            # If we have remainders = [{0, 1}, {0, 3}] and priorities = [1, 2, 3, 4]
+            # We compute the scores for each remainder: {0, 1} = 1 + 2 = 3 and {0, 3} = 1 + 4 = 5, we return the set with the highest score so {0, 3}
+            # If we have several sets with the same highest score, we return all of them
+            selected = select_remainders(remainders, priorities) if remainders else []
         
         # --- guard against empty remainders ---
-        if not remainders:
+        if not selected:
             # no way to remove formula; clear the base entirely
             self.base.clear()
             return
         
-        # Get the priority values in the same order as belief indices
-        priorities = [pri for _, pri in self.base.get_prioritized_beliefs()]
-        
-        # Select the remainders with the highest total priority
-        # If we have remainders = [{0, 1}, {0, 3}] and priorities = [1, 2, 3, 4]
-        # We compute the scores for each remainder: {0, 1} = 1 + 2 = 3 and {0, 3} = 1 + 4 = 5, we return the set with the highest score so {0, 3}
-        # If we have several sets with the same highest score, we return all of them
-        selected = select_remainders(remainders, priorities)
-        
         # Intersect the slected remanders. If selected is [{0, 2}, {1, 2}], then the intersection is {2}
         # If we only have one selected remainder, like {0, 2}, we return {0, 2}
         keep_indexes = intersect_selected(selected)
         
         # Then rebuild KB in place: Keep only the beliefs in the intersection of all remainders
-        all_beliefs = self.base.get_prioritized_beliefs()
-        
-        # Filter the beliefs to keep only those indexes that were found in the intersection
-        new_beliefs = [all_beliefs[i] for i in sorted(keep_indexes)]
+        self._keep(keep_indexes)
+
+    # Kernel contraction: find every kernel (minimal subset of the belief base that entails the formula) and remove
+    # the beliefs picked by the incision function, which takes the lowest-priority belief of each kernel.
+    # Removing one belief of every kernel is enough, because any subset that still entails the formula contains a kernel
+    @instrumented("contract_kernel")
+    def contract_kernel(self, formula: Formula):
+        # Vacuity check: if the belief base doesn't entail the formula, no need to contract
+        if not self.base.entails(formula):
+            return
+        self._contract_kernel(formula)
+
+    # The kernel contraction itself, for a formula the belief base is known to entail
+    def _contract_kernel(self, formula: Formula):
+        kernels = self.base.compute_kernels(formula)
         
-        # Clear the belief base because we want to add the new beliefs that were filtered by the intersection
-        self.base.clear()
+        # Beliefs are sorted by descending priority, so the belief with the highest index in a kernel has the lowest
+        # priority (and among equal priorities, it is the one added last)
+        # A tautology has the empty kernel, nothing can be cut from it and the belief base stays as it is
+        incision = {max(kernel) for kernel in kernels if kernel}
         
-        # Add the new beliefs to the belief base and its priorities
-        for belief, priority in new_beliefs:
-            self.base.add(belief, priority)
+        self._keep(set(range(len(self.base.get_prioritized_beliefs()))) - incision)
+
+    # Shrink the belief base to the beliefs at the given indexes
+    # The kept beliefs stay exactly as they are: no to_cnf or clausifying again, and the beliefs of components the
+    # contraction never looked at keep their cached clauses
+    @instrumented("rebuild")
+    def _keep(self, keep_indexes):
+        self.base.retain(keep_indexes)
             
+    @instrumented("expand")
     def expand(self, formula: Formula, priority: int = 0):
         # Fairly simple, we simply add φ (in CNF form) with the given priority.
         # Note: this can introduce inconsistency, but expansion
         # by definition does not restore consistency.
         self.base.add(formula, priority)
 
-    def revise(self, formula: Formula):
+    # strategy picks the contraction, see REVISION_STRATEGIES
+    # budget bounds the contraction, see contract_partial_meet. Kernel contraction can't run under a budget
+    @instrumented("revise")
+    def revise(self, formula: Formula, priority: int = 0, strategy="partial_meet", budget=None):
+        self._check_strategy(strategy)
+        if budget is not None and strategy == "kernel":
+            raise ValueError("Budgets are only supported with strategy='partial_meet'")
         # K * φ = (K - ¬φ) ∪ {φ} THIS IS CALLED THE LEVI IDENTITY
-        self.contract_partial_meet(Not(formula))
-        self.expand(formula)
+        if strategy == "kernel":
+            self.contract_kernel(Not(formula))
+        else:
+            self.contract_partial_meet(Not(formula), budget=budget)
+        self.expand(formula, priority)
+
+    @staticmethod
+    def _check_strategy(strategy):
+        if strategy not in REVISION_STRATEGIES:
+            raise ValueError(f"Unknown revision strategy: {strategy!r}, expected one of {list(REVISION_STRATEGIES)}")
+
+    # Revise by a sequence of formulas, one after the other, ending with exactly the belief base that calling revise
+    # on each of them would give. The items are formulas or (formula, priority) pairs, like parse_file returns.
+    #
+    # Most steps of a long sequence don't contradict the beliefs, and then the contraction is vacuous and revising is
+    # just expanding. Sequential revise still pays a full entailment check from scratch for every step to find that
+    # out. Here one incremental SAT solver follows the belief base through the whole sequence instead: every distinct
+    # belief is added to it once, from the belief base's clause cache, behind its own selector, and a step only checks
+    # whether the current beliefs together with φ are satisfiable. If they are, φ is added without any contraction.
+    # If they aren't, the base entails ¬φ and the usual contraction runs, minus its vacuity check.
+    # The solver keeps what it learnt between the steps, and beliefs dropped by a contraction simply stop being assumed.
+    @instrumented("revise_many")
+    def revise_many(self, formulas, strategy="partial_meet"):
+        self._check_strategy(strategy)
+        checker = IncrementalEntailment([])
+        # Index of each formula in the checker, formulas are hash-consed so equal formulas share one entry
+        indexes = {}
+        
+        def index_of(formula, clauses):
+            index = indexes.get(formula)
+            if index is None:
+                index = indexes[formula] = checker.add_belief(clauses)
+            return index
+        
+        for item in formulas:
+            formula, priority = item if isinstance(item, tuple) else (item, 0)
+            current = [index_of(belief, clauses)
+                       for belief, clauses in zip(self.base.get_beliefs(), self.base.get_belief_clauses())]
+            # With no query clauses, "entails" means the selected beliefs have no model
+            if checker.entails(current + [index_of(formula, clauses_for_belief(formula))]):
+                if strategy == "kernel":
+                    self._contract_kernel(Not(formula))
+                else:
+                    self._contract_partial_meet(Not(formula), self.selection)
+            self.expand(formula, priority)
         
 if __name__ == "__main__":
     import os
@@ -74,9 +209,8 @@ if __name__ == "__main__":
     formulas = parse_file(txt_path)
 
     agent = BeliefRevisionAgent()
-    for f in formulas:
-        print(f"> Revising by: {f}")
-        agent.revise(f)
+    print(f"> Revising by {len(formulas)} formulas")
+    agent.revise_many(formulas)
 
     print("\n🧠 Final belief base after all revisions:")
     print(agent.base)
\ No newline at end of file
@@ -0,0 +1,102 @@
+import asyncio
+import json
+from itertools import count
+
+"""
+Client for the agent server in server.py.
+
+Every call sends one request line and returns once its response arrives. Calls don't wait for each other, so
+starting many of them at once (asyncio.gather) pipelines the requests over one connection, and the responses are
+matched to the calls by id in whatever order they come back.
+
+Example:
+    client = await AgentClient.connect(port=8765)     # or AgentClient.connect(path="/tmp/agent.sock")
+    await client.expand("p → q", priority=2)
+    await client.expand("p")
+    answers = await asyncio.gather(*(client.ask(q) for q in ["q", "¬q", "p ∧ q"]))   # [True, False, True]
+    await client.close()
+"""
+
+class AgentError(Exception):
+    """The server could not carry out a request, the message is the server's error."""
+
+
+class AgentClient:
+    """One connection to an agent server. agent picks the agent on the server that requests go to."""
+    def __init__(self, reader, writer, agent="default"):
+        self.reader = reader
+        self.writer = writer
+        self.agent = agent
+        self.ids = count(1)
+        # Requests that were sent and are still waiting for their response, by id
+        self.pending = {}
+        self.receiver = asyncio.create_task(self._receive())
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=8765, path=None, agent="default"):
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer, agent)
+
+    async def _receive(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                future = self.pending.pop(response.get("id"), None)
+                if future is None or future.done():
+                    continue
+                if response.get("ok"):
+                    future.set_result(response.get("result"))
+                else:
+                    future.set_exception(AgentError(response.get("error")))
+        finally:
+            # The connection is gone, nobody is going to answer the requests that are still pending
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Connection to the agent server closed"))
+            self.pending.clear()
+
+    async def request(self, op, **fields):
+        """Sends one request and returns its result, raises AgentError if the server reports an error."""
+        request_id = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        self.writer.write((json.dumps({"id": request_id, "op": op, "agent": self.agent, **fields},
+                                      ensure_ascii=False) + "\n").encode("utf-8"))
+        await self.writer.drain()
+        return await future
+
+    # budget is a dict with any of "seconds", "max_clauses" and "max_resolvents", see the protocol in server.py
+    def _with_budget(self, fields, budget):
+        if budget is not None:
+            fields["budget"] = budget
+        return fields
+
+    async def ask(self, formula: str, budget: dict = None):
+        """A bool, or "entailed" / "not_entailed" / "unknown" when asked with a budget."""
+        return await self.request("ask", **self._with_budget({"formula": formula}, budget))
+
+    async def expand(self, formula: str, priority: int = 0):
+        await self.request("expand", formula=formula, priority=priority)
+
+    async def contract(self, formula: str, strategy: str = "partial_meet", budget: dict = None):
+        await self.request("contract", **self._with_budget({"formula": formula, "strategy": strategy}, budget))
+
+    async def revise(self, formula: str, strategy: str = "partial_meet", budget: dict = None):
+        await self.request("revise", **self._with_budget({"formula": formula, "strategy": strategy}, budget))
+
+    async def beliefs(self):
+        return await self.request("beliefs")
+
+    async def stats(self):
+        return await self.request("stats")
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        await self.receiver
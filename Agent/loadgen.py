@@ -0,0 +1,87 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from Agent.agent import BeliefRevisionAgent
+from Agent.client import AgentClient
+from Agent.server import AgentServer, LatencyHistogram
+from benchmarks import generators
+
+"""
+Load generator for the agent server: opens a number of connections, keeps a number of requests in flight on each
+and reports throughput and latency.
+
+Against a running server:
+    python -m Agent.loadgen --port 8765 --connections 4 --requests 5000
+Or with a server started inside the same process:
+    python -m Agent.loadgen --local --engine sat
+"""
+
+# The text of a small random formula, sent to the server to parse
+def random_formula(rng, atoms):
+    return str(generators.random_formula(rng, atoms, 2))
+
+async def run_connection(client, rng, atoms, requests, in_flight, write_ratio, histogram):
+    slots = asyncio.Semaphore(in_flight)
+
+    async def one():
+        async with slots:
+            start = time.perf_counter()
+            if rng.random() < write_ratio:
+                await client.revise(random_formula(rng, atoms))
+            else:
+                await client.ask(random_formula(rng, atoms))
+            histogram.record(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+
+async def main(args):
+    server = None
+    if args.local:
+        # Revisions keep adding beliefs, so contraction searches for the best remainders directly instead of
+        # enumerating every remainder of an ever larger base
+        server = AgentServer(lambda: BeliefRevisionAgent(engine=args.engine, selection="branch_and_bound"),
+                             read_workers=args.read_workers)
+        await server.start()
+        args.host, args.port = server.address[:2]
+    rng = random.Random(args.seed)
+    atoms = generators.atoms(args.atoms, prefix="a")
+    clients = [await AgentClient.connect(args.host, args.port, args.path) for _ in range(args.connections)]
+    # Seed the base so asks have something to reason about
+    for _ in range(args.beliefs):
+        await clients[0].expand(random_formula(rng, atoms), priority=rng.randint(0, 5))
+
+    histogram = LatencyHistogram()
+    per_connection = args.requests // args.connections
+    start = time.perf_counter()
+    await asyncio.gather(*(run_connection(client, random.Random(rng.random()), atoms, per_connection, args.in_flight,
+                                          args.write_ratio, histogram) for client in clients))
+    seconds = time.perf_counter() - start
+
+    total = per_connection * args.connections
+    print(f"{total} requests over {args.connections} connections in {seconds:.2f} s: {total / seconds:,.0f} requests/s")
+    print("client latency:", json.dumps({k: v for k, v in histogram.snapshot().items() if k != "buckets"}))
+    print("server latency:", json.dumps({op: {k: round(v, 3) for k, v in snap.items() if k != "buckets"}
+                                         for op, snap in (await clients[0].stats()).items()}))
+    for client in clients:
+        await client.close()
+    if server is not None:
+        await server.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the throughput of an agent server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--path", help="connect to this Unix socket instead of TCP")
+    parser.add_argument("--local", action="store_true", help="start a server in this process")
+    parser.add_argument("--engine", default="sat", help="engine of the agents of a --local server")
+    parser.add_argument("--read-workers", type=int, default=4)
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--in-flight", type=int, default=16, help="requests in flight per connection")
+    parser.add_argument("--write-ratio", type=float, default=0.05, help="share of requests that are revisions")
+    parser.add_argument("--atoms", type=int, default=12)
+    parser.add_argument("--beliefs", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,327 @@
+"""
+asyncio server that puts belief revision agents behind a local TCP or Unix socket.
+
+The protocol is line-delimited JSON. Each request is one line with an "op", a client-chosen "id" and the fields of
+the op, and each response is one line with the same "id":
+
+    {"id": 1, "op": "expand", "formula": "p → q", "priority": 2}
+    {"id": 2, "op": "ask", "formula": "q"}
+    {"id": 1, "ok": true, "result": null}
+    {"id": 2, "ok": true, "result": false}
+    {"id": 3, "ok": false, "error": "Unexpected end of tokens."}
+
+Ops:
+    ask       formula                      -> bool
+    expand    formula, priority (default 0) -> null
+    contract  formula, strategy            -> null  ("partial_meet" by default, or "kernel")
+    revise    formula, strategy            -> null
+    beliefs                                -> ["priority: formula", ...]
+    stats                                  -> latency histograms per op
+An optional "agent" field names the agent to use ("default" if missing), each name gets its own agent.
+ask, contract and revise take an optional "budget" object with any of "seconds", "max_clauses" and "max_resolvents"
+(see budget.py). An ask with a budget answers "entailed", "not_entailed" or "unknown" instead of a bool, and a
+contraction that runs out of it fails with an error and leaves the beliefs as they were. A budget with strategy
+"kernel" is an error, kernel contraction can't run under one.
+
+A client may send many requests without waiting for the answers (pipelining). Responses are written as soon as they
+are ready, so they can come back in a different order, which is what the ids are for.
+
+Concurrency:
+    - asks only read the agent, so any number of them run at the same time on a thread pool
+    - expand, contract and revise change the agent, so they wait until no other request of that agent is running
+      and run one at a time
+    - the requests of one agent get their turn in the order they arrived (a first come, first served read/write lock
+      per agent), so an ask pipelined after a revise is answered after the revise and one sent before it before
+    - every connection has a bounded queue of requests. When it is full the server stops reading from that
+      connection, so a client that sends faster than the server answers is slowed down by the socket instead of
+      filling the server's memory (backpressure)
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from Agent.agent import BeliefRevisionAgent, REVISION_STRATEGIES
+from Belief_base.parser import parse_formula
+from Belief_base.budget import Budget
+
+READ_OPS = {"ask", "beliefs", "stats"}
+WRITE_OPS = {"expand", "contract", "revise"}
+
+
+class _ReadWriteLock:
+    """
+    Many readers or one writer, let in strictly in the order they asked: a reader waits for every writer that asked
+    before it, a writer for every request that asked before it. So an ask sees exactly the changes sent before it and
+    none sent after it, and a stream of asks can't starve a writer.
+    """
+    def __init__(self):
+        self._readers = 0
+        self._writer = False
+        # (is_writer, future) of the requests waiting for their turn, in the order they asked
+        self._waiting = deque()
+
+    @asynccontextmanager
+    async def reading(self):
+        await self._acquire(False)
+        try:
+            yield
+        finally:
+            self._release(False)
+
+    @asynccontextmanager
+    async def writing(self):
+        await self._acquire(True)
+        try:
+            yield
+        finally:
+            self._release(True)
+
+    def _can_enter(self, writer):
+        return not self._writer and (not writer or not self._readers)
+
+    def _enter(self, writer):
+        if writer:
+            self._writer = True
+        else:
+            self._readers += 1
+
+    # Registering in the line happens before the first await, so the order of the calls is the order of the turns
+    async def _acquire(self, writer):
+        if not self._waiting and self._can_enter(writer):
+            self._enter(writer)
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.append((writer, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                # Leave the line (unless _admit already skipped it), a waiter behind this one may be able to go now
+                if (writer, future) in self._waiting:
+                    self._waiting.remove((writer, future))
+                self._admit()
+            else:
+                # Let in just before the cancellation arrived
+                self._release(writer)
+            raise
+
+    def _release(self, writer):
+        if writer:
+            self._writer = False
+        else:
+            self._readers -= 1
+        self._admit()
+
+    # Lets in waiters from the front of the line for as long as they can enter
+    def _admit(self):
+        while self._waiting:
+            writer, future = self._waiting[0]
+            if future.cancelled():
+                self._waiting.popleft()
+                continue
+            if not self._can_enter(writer):
+                break
+            self._waiting.popleft()
+            self._enter(writer)
+            future.set_result(None)
+
+
+class LatencyHistogram:
+    """
+    Request latencies in buckets that double in width: bucket i holds latencies below 2^i microseconds (and at
+    least 2^(i-1)), so a few dozen counters cover everything from a microsecond to hours.
+    """
+    def __init__(self):
+        self.buckets = [0] * 40
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        micros = int(seconds * 1e6)
+        self.buckets[min(micros.bit_length(), len(self.buckets) - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p: float) -> float:
+        """Upper bound of the bucket that holds the p-th percentile, in seconds."""
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min((1 << i) / 1e6, self.max)
+        return self.max
+
+    def snapshot(self):
+        """The histogram as a JSON-friendly dict, times in milliseconds."""
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1e3 if self.count else 0.0,
+            "p50_ms": self.percentile(50) * 1e3,
+            "p90_ms": self.percentile(90) * 1e3,
+            "p99_ms": self.percentile(99) * 1e3,
+            "max_ms": self.max * 1e3,
+            # Upper bound in microseconds -> count, only for buckets that were hit
+            "buckets": {str(1 << i): n for i, n in enumerate(self.buckets) if n},
+        }
+
+
+class AgentServer:
+    """
+    Serves belief revision agents over a local socket, see the protocol above.
+
+    agent_factory builds the agent for a new agent name, read_workers is the size of the thread pool for asks,
+    max_pending bounds the queue of each connection and max_in_flight the requests of one connection that are
+    processed at the same time.
+
+    Example:
+        server = AgentServer(lambda: BeliefRevisionAgent(engine="sat"))
+        await server.start(port=8765)        # or server.start(path="/tmp/agent.sock")
+        await server.serve_forever()
+    """
+    def __init__(self, agent_factory=BeliefRevisionAgent, read_workers=4, max_pending=256, max_in_flight=32):
+        self.agent_factory = agent_factory
+        self.agents = {}
+        self.locks = {}
+        self.executor = ThreadPoolExecutor(max_workers=read_workers)
+        self.max_pending = max_pending
+        self.max_in_flight = max_in_flight
+        self.histograms = {}
+        self.server = None
+
+    def _agent(self, name):
+        if name not in self.agents:
+            self.agents[name] = self.agent_factory()
+            self.locks[name] = _ReadWriteLock()
+        return self.agents[name], self.locks[name]
+
+    async def start(self, host="127.0.0.1", port=0, path=None):
+        """Starts listening on a Unix socket if path is given, on host:port otherwise (port 0 picks a free port)."""
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self._serve, path=path)
+        else:
+            self.server = await asyncio.start_server(self._serve, host, port)
+        return self.server
+
+    @property
+    def address(self):
+        """The (host, port) or path the server listens on."""
+        return self.server.sockets[0].getsockname()
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.executor.shutdown(wait=False)
+
+    async def _serve(self, reader, writer):
+        queue = asyncio.Queue(self.max_pending)
+        handlers = [asyncio.create_task(self._handle(queue, writer)) for _ in range(self.max_in_flight)]
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                # Blocks while the queue is full, which stops reading from the socket
+                await queue.put((time.perf_counter(), line))
+            await queue.join()
+        finally:
+            for handler in handlers:
+                handler.cancel()
+            writer.close()
+
+    async def _handle(self, queue, writer):
+        while True:
+            received, line = await queue.get()
+            try:
+                request_id, op, response = None, None, None
+                try:
+                    request = json.loads(line)
+                    request_id, op = request.get("id"), request.get("op")
+                    response = {"id": request_id, "ok": True, "result": await self.dispatch(request)}
+                except Exception as e:
+                    response = {"id": request_id, "ok": False, "error": str(e)}
+                try:
+                    # The request ran either way, but once the client is gone there is nobody to answer
+                    if not writer.is_closing():
+                        writer.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+                        await writer.drain()
+                except OSError:
+                    # Connection reset, broken pipe and the like: stop writing to it, and keep taking requests off the
+                    # queue so the queue.join() in _serve still returns
+                    writer.close()
+                self.histograms.setdefault(op if op in READ_OPS | WRITE_OPS else "invalid", LatencyHistogram()) \
+                    .record(time.perf_counter() - received)
+            finally:
+                queue.task_done()
+
+    async def dispatch(self, request):
+        """Runs one decoded request and returns its result."""
+        op = request.get("op")
+        if op == "stats":
+            return {name: histogram.snapshot() for name, histogram in self.histograms.items()}
+        if op not in READ_OPS and op not in WRITE_OPS:
+            raise ValueError(f"Unknown op: {op!r}, expected one of {sorted(READ_OPS | WRITE_OPS)}")
+        agent, lock = self._agent(request.get("agent", "default"))
+        loop = asyncio.get_running_loop()
+        if op == "beliefs":
+            async with lock.reading():
+                return [f"{priority}: {formula}" for formula, priority in agent.base.get_prioritized_beliefs()]
+        if "formula" not in request:
+            raise ValueError(f"Missing field 'formula', op {op!r} needs a formula")
+        formula = parse_formula(request["formula"])
+        limits = request.get("budget")
+        if op == "ask":
+            async with lock.reading():
+                if limits is None:
+                    return await loop.run_in_executor(self.executor, agent.ask, formula)
+                # The deadline starts when the ask gets its turn, not while it waits for the lock
+                result = await loop.run_in_executor(self.executor, lambda: agent.ask(formula, budget=Budget(**limits)))
+                return result.status
+        strategy = request.get("strategy", "partial_meet")
+        if strategy not in REVISION_STRATEGIES:
+            raise ValueError(f"Unknown strategy: {strategy!r}, expected one of {list(REVISION_STRATEGIES)}")
+        if limits is not None and strategy == "kernel":
+            # Like BeliefRevisionAgent.revise, instead of running the kernel contraction without the budget
+            raise ValueError("Budgets are only supported with strategy='partial_meet'")
+        budget = lambda: None if limits is None else Budget(**limits)
+        if op == "expand":
+            call = lambda: agent.expand(formula, int(request.get("priority", 0)))
+        elif op == "contract":
+            call = (lambda: agent.contract_kernel(formula)) if strategy == "kernel" else \
+                   (lambda: agent.contract_partial_meet(formula, budget=budget()))
+        else:
+            call = lambda: agent.revise(formula, strategy=strategy, budget=budget())
+        async with lock.writing():
+            # Off the event loop as well, so a long contraction doesn't hold up other agents and connections
+            await loop.run_in_executor(self.executor, call)
+        return None
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Serve belief revision agents over a local socket.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--path", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--engine", default="sat")
+    parser.add_argument("--read-workers", type=int, default=4)
+    args = parser.parse_args()
+
+    async def main():
+        server = AgentServer(lambda: BeliefRevisionAgent(engine=args.engine), read_workers=args.read_workers)
+        await server.start(args.host, args.port, args.path)
+        print(f"Listening on {server.address}")
+        await server.serve_forever()
+
+    asyncio.run(main())
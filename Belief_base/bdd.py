@@ -0,0 +1,315 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple
+from Belief_base.formula import Formula, Atom, Not, And, Or, Implies, Equiv
+
+"""
+Reduced ordered binary decision diagrams (OBDDs), used to compile a belief base once and answer many queries.
+
+A BDD node tests one atom and has two children: lo (the atom is false) and hi (the atom is true). The leaves are
+FALSE and TRUE. Atoms are tested in one fixed order from the root down, and two rules keep the diagram reduced:
+    - a node whose children are the same node is skipped (it doesn't matter what the atom is)
+    - there is only ever one node with a given (atom, lo, hi), enforced by the unique table
+So every formula over the atoms has exactly one BDD, and two formulas are equivalent iff they get the same node.
+
+Example with the order p, q, the BDD of p ∧ q:
+
+        p
+      /   \\
+   FALSE   q
+         /   \\
+     FALSE   TRUE
+
+All operations go through ite(f, g, h), "if f then g else h", with a cache of the results computed so far.
+Each call splits on the first atom in the order and combines the two halves, so it takes time proportional to
+the product of the sizes of f, g and h at worst. With the base compiled to one node B:
+    - B ⊨ φ  iff  B ∧ ¬φ is FALSE, which implies() checks by walking pairs of nodes of B and φ without building
+      anything, so it takes at most size(B) * size(φ) steps
+    - the number of models of B is one pass over the nodes of B
+"""
+
+class BDD:
+    """
+    A BDD manager: a node table shared by every diagram built with it. Nodes are ints, 0 is FALSE and 1 is TRUE.
+
+    Example:
+        bdd = BDD(["p", "q"])
+        f = bdd.from_formula(And(Atom("p"), Atom("q")))
+        bdd.count(f)  # 1, only p = q = True
+    """
+    FALSE = 0
+    TRUE = 1
+    # The ite cache is dropped when it grows past this many entries, so a long run of queries can't exhaust memory
+    MAX_CACHE = 1 << 20
+    # The unique table can't just be dropped, every formula has exactly one node only as long as it is complete.
+    # Past this many nodes CompiledBase compacts it instead, see collect()
+    MAX_NODES = 1 << 20
+
+    def __init__(self, order: Iterable[str] = ()):
+        # names[i] is the atom tested at level i, levels grow from the root down
+        self.names: List[str] = []
+        self.levels: Dict[str, int] = {}
+        # Level, lo and hi of every node, the two leaves sit below every atom
+        self.level: List[int] = [float("inf"), float("inf")]
+        self.lo: List[int] = [0, 1]
+        self.hi: List[int] = [0, 1]
+        self.unique: Dict[Tuple[int, int, int], int] = {}
+        self.cache: Dict[Tuple[int, int, int], int] = {}
+        # Formula nodes already turned into BDD nodes, formulas are hash-consed so this is a plain dict lookup
+        self.built: Dict[Formula, int] = {}
+        for name in order:
+            self.declare(name)
+
+    def declare(self, name: str) -> int:
+        """Returns the level of the atom, putting a new atom below all the others."""
+        level = self.levels.get(name)
+        if level is None:
+            level = self.levels[name] = len(self.names)
+            self.names.append(name)
+        return level
+
+    def _mk(self, level, lo, hi):
+        if lo == hi:
+            return lo
+        key = (level, lo, hi)
+        node = self.unique.get(key)
+        if node is None:
+            node = self.unique[key] = len(self.level)
+            self.level.append(level)
+            self.lo.append(lo)
+            self.hi.append(hi)
+        return node
+
+    def var(self, name: str) -> int:
+        return self._mk(self.declare(name), self.FALSE, self.TRUE)
+
+    # The result of ite without splitting, or None when it has to split on the top atom
+    def _ite_shortcut(self, f, g, h):
+        if f == self.TRUE:
+            return g
+        if f == self.FALSE:
+            return h
+        if g == h:
+            return g
+        if g == self.TRUE and h == self.FALSE:
+            return f
+        return self.cache.get((f, g, h))
+
+    # Iterative, with an explicit stack of pending (f, g, h) calls, so the depth of the order (one level per atom)
+    # never hits the recursion limit
+    def ite(self, f: int, g: int, h: int) -> int:
+        """The node of (f ∧ g) ∨ (¬f ∧ h)."""
+        level, lo, hi, cache = self.level, self.lo, self.hi, self.cache
+        # Entries are (f, g, h, None) for a call still to make and (f, g, h, top) for a call whose two halves are on
+        # top of results, lo below hi, and only have to be joined into a node testing the atom at level top
+        stack = [(f, g, h, None)]
+        results = []
+        while stack:
+            f, g, h, top = stack.pop()
+            if top is not None:
+                high = results.pop()
+                low = results.pop()
+                result = self._mk(top, low, high)
+                if len(cache) >= self.MAX_CACHE:
+                    cache.clear()
+                cache[(f, g, h)] = result
+                results.append(result)
+                continue
+            result = self._ite_shortcut(f, g, h)
+            if result is not None:
+                results.append(result)
+                continue
+            top = min(level[f], level[g], level[h])
+            # Cofactors: a node that doesn't test the top atom is the same on both sides
+            f0, f1 = (lo[f], hi[f]) if level[f] == top else (f, f)
+            g0, g1 = (lo[g], hi[g]) if level[g] == top else (g, g)
+            h0, h1 = (lo[h], hi[h]) if level[h] == top else (h, h)
+            stack.append((f, g, h, top))
+            stack.append((f1, g1, h1, None))
+            stack.append((f0, g0, h0, None))
+        return results[0]
+
+    def not_(self, f: int) -> int:
+        return self.ite(f, self.FALSE, self.TRUE)
+
+    def and_(self, f: int, g: int) -> int:
+        return self.ite(f, g, self.FALSE)
+
+    def or_(self, f: int, g: int) -> int:
+        return self.ite(f, self.TRUE, g)
+
+    def from_formula(self, formula: Formula) -> int:
+        """The node of a formula, built bottom-up with an explicit stack so deep formulas don't hit the recursion limit."""
+        built = self.built
+        stack = [(formula, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if node in built:
+                continue
+            if isinstance(node, Atom):
+                built[node] = self.var(node.name)
+                continue
+            children = node._args()
+            if not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in children)
+                continue
+            if isinstance(node, Not):
+                result = self.not_(built[node.formula])
+            # Atoms are ordered by first occurrence, so the last children usually test the lowest atoms. Joining them
+            # first puts every new child above the result so far, instead of walking all of it for each child
+            elif isinstance(node, And):
+                result = self.TRUE
+                for child in reversed(children):
+                    result = self.and_(built[child], result)
+            elif isinstance(node, Or):
+                result = self.FALSE
+                for child in reversed(children):
+                    result = self.or_(built[child], result)
+            elif isinstance(node, Implies):
+                result = self.ite(built[node.premise], built[node.conclusion], self.TRUE)
+            elif isinstance(node, Equiv):
+                right = built[node.right]
+                result = self.ite(built[node.left], right, self.not_(right))
+            else:
+                raise ValueError(f"Unknown formula type: {type(node).__name__}")
+            built[node] = result
+        return built[formula]
+
+    def implies(self, f: int, g: int) -> bool:
+        """
+        True if every model of f is a model of g. Walks pairs of nodes of f and g without building f ∧ ¬g, so it
+        creates no nodes and stops at the first model of f that is not a model of g.
+        """
+        level, lo, hi = self.level, self.lo, self.hi
+        stack = [(f, g)]
+        seen = set()
+        while stack:
+            f, g = stack.pop()
+            if f == self.FALSE or g == self.TRUE or f == g:
+                continue
+            # Any node other than FALSE has a model, and any node other than TRUE has a non-model
+            if g == self.FALSE or f == self.TRUE:
+                return False
+            if (f, g) in seen:
+                continue
+            seen.add((f, g))
+            top = min(level[f], level[g])
+            f0, f1 = (lo[f], hi[f]) if level[f] == top else (f, f)
+            g0, g1 = (lo[g], hi[g]) if level[g] == top else (g, g)
+            stack.append((f0, g0))
+            stack.append((f1, g1))
+        return True
+
+    def count(self, f: int, num_vars: int = None) -> int:
+        """Number of assignments to the first num_vars atoms (all declared atoms by default) that make f true."""
+        num_vars = len(self.names) if num_vars is None else num_vars
+        level, lo, hi = self.level, self.lo, self.hi
+
+        def depth(node):
+            return num_vars if node < 2 else level[node]
+
+        # counts[node] is the number of models over the atoms from the node's level down
+        counts = {self.FALSE: 0, self.TRUE: 1}
+        for node in self.nodes(f):
+            counts[node] = (counts[lo[node]] << (depth(lo[node]) - level[node] - 1)) + \
+                           (counts[hi[node]] << (depth(hi[node]) - level[node] - 1))
+        return counts[f] << depth(f)
+
+    def nodes(self, f: int) -> List[int]:
+        """The inner nodes reachable from f, children before parents."""
+        order, seen = [], set()
+        stack = [(f, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if node < 2 or (node in seen and not expanded):
+                continue
+            if expanded:
+                order.append(node)
+                continue
+            seen.add(node)
+            stack.append((node, True))
+            stack.append((self.lo[node], False))
+            stack.append((self.hi[node], False))
+        return order
+
+    def collect(self, roots: List[int]) -> List[int]:
+        """
+        Drops every node that is not reachable from one of the roots and returns the new numbers of the roots.
+        Node numbers of earlier results are not valid afterwards, and the caches start empty.
+        """
+        fresh = BDD(self.names)
+        renamed = {self.FALSE: self.FALSE, self.TRUE: self.TRUE}
+        for root in roots:
+            for node in self.nodes(root):
+                if node not in renamed:
+                    renamed[node] = fresh._mk(self.level[node], renamed[self.lo[node]], renamed[self.hi[node]])
+        self.level, self.lo, self.hi, self.unique = fresh.level, fresh.lo, fresh.hi, fresh.unique
+        self.cache = {}
+        self.built = {}
+        return [renamed[root] for root in roots]
+
+    def __len__(self):
+        """Number of inner nodes in the table."""
+        return len(self.level) - 2
+
+
+class CompiledBase:
+    """
+    The conjunction of a list of beliefs compiled to one BDD, with the atoms ordered by first occurrence.
+    Queries are compiled into the same manager, so their nodes are shared with the base and with earlier queries.
+    """
+    def __init__(self, formulas: Iterable[Formula]):
+        start = time.perf_counter()
+        formulas = list(formulas)
+        self.bdd = BDD()
+        # Atoms that occur together in a belief end up close in the order, which keeps the diagram small
+        for formula in formulas:
+            for atom in self._atoms(formula):
+                self.bdd.declare(atom)
+        self.num_vars = len(self.bdd.names)
+        self.root = BDD.TRUE
+        for formula in formulas:
+            self.root = self.bdd.and_(self.root, self.bdd.from_formula(formula))
+        self.compile_seconds = time.perf_counter() - start
+        self.size = len(self.bdd.nodes(self.root))
+        self.queries = 0
+        # Queries add nodes to the shared manager, so threads asking at the same time take turns
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _atoms(formula):
+        # Atoms in left-to-right order of first occurrence
+        seen, stack = {}, [formula]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Atom):
+                seen.setdefault(node.name, None)
+            else:
+                stack.extend(reversed(node._args()))
+        return list(seen)
+
+    def entails(self, query: Formula) -> bool:
+        """True if the compiled beliefs entail the query, that is base ∧ ¬query has no model."""
+        with self.lock:
+            self.queries += 1
+            result = self.bdd.implies(self.root, self.bdd.from_formula(query))
+            # The nodes of earlier queries are garbage, keep only the base's once there are too many
+            if len(self.bdd) > BDD.MAX_NODES:
+                self.root, = self.bdd.collect([self.root])
+            return result
+
+    def count_models(self) -> int:
+        """Number of assignments to the atoms of the beliefs that satisfy every belief."""
+        # Atoms declared later by queries sit below the base's atoms and the root doesn't test them
+        return self.bdd.count(self.root, self.num_vars)
+
+    def stats(self):
+        """Compile time, size of the base's diagram, size of the whole node table and number of queries, as a dict."""
+        return {
+            "compile_seconds": self.compile_seconds,
+            "nodes": self.size,
+            "table_nodes": len(self.bdd),
+            "variables": self.num_vars,
+            "queries": self.queries,
+        }
@@ -1,26 +1,195 @@
-from Belief_base.formula import Formula
+from Belief_base.formula import Formula, Not
 from itertools import combinations
-from Belief_base.entailment import resolution_entails
+from Belief_base.entailment import get_engine, clauses_for_belief, negated_query_clauses, refutes_many, BatchResult
+from Belief_base.incremental import IncrementalEntailment
+from Belief_base.cache import EntailmentCache
+from Belief_base.bdd import CompiledBase
+from Belief_base.remainders import mcs_remainders, best_remainders, enumerate_kernels, parallel_remainders
+from Belief_base import instrumentation
+from Belief_base.instrumentation import instrumented
+from Belief_base.budget import BudgetExceeded, EntailmentResult, ENTAILED, NOT_ENTAILED, UNKNOWN
 from functools import reduce
+import os
+import threading
+import time
 from operator import and_
 
+# How compute_remainders finds remainders: "combinations" runs the belief base's engine on each subset from scratch,
+# "incremental" tests every subset as a set of assumptions against one incremental SAT solver, "parallel" does the
+# same on a pool of worker processes, and "mcs" skips the subset enumeration and finds the remainders as complements
+# of the smallest hitting sets of the kernels (remainders.py)
+REMAINDER_METHODS = ("combinations", "incremental", "parallel", "mcs")
+
+# How partial meet contraction picks the remainders it keeps: "enumerate" computes every remainder and then keeps the
+# ones with the highest priority sum (select_remainders), "branch_and_bound" searches for those directly (best_remainders)
+SELECTION_METHODS = ("enumerate", "branch_and_bound")
+
+# What a contraction does with an entailment check that ran out of its budget: "raise" raises BudgetExceeded and leaves
+# the belief base as it was, "entailed" counts the check as entailed (the contraction may remove more than needed,
+# but every subset it keeps was proven not to entail the formula) and "not_entailed" counts it as not entailed
+# (the contraction removes less, and the result may still entail the formula)
+UNKNOWN_POLICIES = ("raise", "entailed", "not_entailed")
+
+"""
+Relevance filtering of entailment checks.
+
+Two clauses can only ever be resolved together (or constrain each other in the SAT solver) if they share an atom. So if
+the clauses of B ∪ {¬query} fall apart into groups that share no atom, the set is unsatisfiable iff one of the groups
+is. The groups without a clause of ¬query only hold belief clauses, and when B is consistent each of them is
+satisfiable. Then B ⊨ query iff the beliefs reachable from the atoms of ¬query (through beliefs sharing atoms with
+beliefs already reached) entail it, and only those are handed to the engine.
+
+The base keeps an inverted index from every atom (auxiliary atoms included) to the beliefs whose clauses use it,
+updated by add, remove and clear, so finding the reachable beliefs only touches those beliefs.
+
+Fallback for inconsistent bases: an inconsistent base entails every query, but the reachable beliefs alone may be
+consistent and would not. So the filter first asks whether the whole base is consistent, once per version, on an
+incremental SAT solver that holds every belief behind its own selector (see incremental.py), so adding a belief only
+extends it and removing one only stops assuming it. If the base is inconsistent, entails() answers True without a
+further check.
+"""
+
+"""
+Localized remainders and kernels.
+
+A base that is a union of independent sub-theories (one per device, say) falls apart into components: groups of
+beliefs connected through shared atoms. The same argument as above says that when B is consistent, a subset of B
+entails phi iff its part in the components sharing an atom with ¬phi does. So with R the beliefs of those components
+and O the others:
+    - the remainders of B are the remainders of R, each together with all of O (just O if R has no remainder but phi
+      is not a tautology, no remainder at all if phi is a tautology)
+    - the kernels of B are the kernels of R
+compute_remainders, best_remainders and compute_kernels solve the small problem on R and map the result back, so a
+contraction only pays the exponential cost of the components it touches and keeps O as it is.
+
+The components are kept in a union-find over atoms: add unites the atoms of the new belief, which is nearly constant
+time. remove and retain can split a component, which union-find can't undo, so they only mark the components stale
+and the next contraction builds them again from the remaining beliefs. Inconsistent bases fall back to the whole base
+like entails() does, and relevance_filter=False turns the localization off too.
+"""
+
+# Engines that answer entails() from a compiled form of the whole belief base instead of from its clauses.
+# Subset checks (remainders, kernels) still need a clause engine and use "sat" for these
+COMPILED_ENGINES = ("bdd",)
+
 class BeliefBase:
     """
     A belief base that stores propositional formulas with priorities.
     Higher priority values mean the belief is more important.
+    The engine is the name of the entailment checker used by entails(), see ENGINES in entailment.py,
+    and remainder_method is the default method of compute_remainders, see REMAINDER_METHODS.
+    Entailment results are kept in an LRU cache of at most cache_size entries (0 turns it off).
+    With store_cnf=False beliefs are stored as given instead of converted with to_cnf, which avoids the exponential
+    blow-up of to_cnf on formulas like chains of ↔; entailment clausifies them with auxiliary atoms either way.
+    workers is the number of processes of remainder_method="parallel", all cores by default.
+    relevance_filter=True hands entailment checks only the beliefs connected to the query, and remainder and kernel
+    computations only the components the formula touches, see above.
     """
-    def __init__(self):
-        # List of (formula, priority) pairs
+    def __init__(self, engine="resolution", remainder_method="combinations", cache_size=1024, store_cnf=True,
+                 workers=None, relevance_filter=True):
+        # List of (formula, priority) pairs, sorted by descending priority and, among equal priorities, in the order
+        # they were added. add inserts at the right place, see _position
         self.beliefs = []
+        # Stored formula -> priorities of its copies in self.beliefs (usually one), for membership tests and to find
+        # the beliefs to remove without scanning the whole list
+        self._priorities = {}
+        # Clauses of each stored formula, extracted once when the belief is added so entailment checks
+        # only have to clausify the negated query
+        self.clause_cache = {}
+        # Atom number -> stored formulas whose clauses use the atom
+        self.symbol_index = {}
+        self.relevance_filter = relevance_filter
+        # Incremental solver with every belief added since it was built behind its own selector, for the consistency
+        # check of the relevance filter, and the index of each formula in it. Removed beliefs just stop being assumed
+        self._consistency = None
+        self._consistency_index = {}
+        self._consistent = None
+        self._consistent_version = None
+        # entails() reaches the check from concurrent readers (see server.py), so they take turns on the solver
+        self._consistency_lock = threading.Lock()
+        # Union-find over atom numbers, the atoms of one belief are always in one set. Every set is the atoms of a
+        # component, see above. add unites, remove and retain only mark it stale and it is built again when needed
+        self._parent = {}
+        self._components_stale = False
+        # Fail early on a misspelled engine name instead of on the first query
+        self._check_engine(engine)
+        self.engine = engine
+        self._check_remainder_method(remainder_method)
+        self.remainder_method = remainder_method
+        # Goes up by one on every add, remove and clear, so cached results of older versions are never looked up again
+        self.version = 0
+        self.entailment_cache = EntailmentCache(cache_size)
+        self.store_cnf = store_cnf
+        self.workers = workers or os.cpu_count() or 1
+        # The BDD of the beliefs, compiled on the first "bdd" query after a change, and the version it belongs to
+        self._compiled = None
+        self._compiled_version = None
+
+    @staticmethod
+    def _check_engine(engine):
+        if engine not in COMPILED_ENGINES:
+            get_engine(engine)
+
+    # The refutation function used for clause-level checks, compiled engines fall back to the SAT solver
+    def _refutes(self):
+        return get_engine("sat" if self.engine in COMPILED_ENGINES else self.engine)
+
+    @staticmethod
+    def _check_unknown_policy(policy):
+        if policy not in UNKNOWN_POLICIES:
+            raise ValueError(f"Unknown policy for unknown results: {policy!r}, expected one of {list(UNKNOWN_POLICIES)}")
+
+    @staticmethod
+    def _check_remainder_method(method):
+        if method not in REMAINDER_METHODS:
+            raise ValueError(f"Unknown remainder method: {method!r}, expected one of {list(REMAINDER_METHODS)}")
     
     def add(self, formula, priority=0):
         """Add a belief with the given priority."""
-        # Convert formula to CNF for more efficient entailment checking later
-        cnf_formula = formula.to_cnf()
-        # Add the cnf_formula and its priority to the belief base
-        self.beliefs.append((cnf_formula, priority))
-        # Sort beliefs by priority (descending)
-        self.beliefs.sort(key=lambda x: x[1], reverse=True)
+        # Convert formula to CNF for more efficient entailment checking later (unless we were told to store it as is)
+        if self.store_cnf and instrumentation.ENABLED:
+            with instrumentation.phase("to_cnf"):
+                cnf_formula = formula.to_cnf()
+        else:
+            cnf_formula = formula.to_cnf() if self.store_cnf else formula
+        # Insert the cnf_formula with its priority after every belief of the same or higher priority, which keeps
+        # self.beliefs sorted by priority (descending) exactly like appending and sorting again would
+        self.beliefs.insert(self._position(priority), (cnf_formula, priority))
+        self._priorities.setdefault(cnf_formula, []).append(priority)
+        clauses = self._clauses_of(cnf_formula)
+        atoms = self._atoms_of(clauses)
+        for var in atoms:
+            self.symbol_index.setdefault(var, set()).add(cnf_formula)
+        if not self._components_stale:
+            self._unite(atoms)
+        self.version += 1
+
+    # Binary search in self.beliefs: the index after the last belief with priority >= the given one, or with
+    # before=True, after the last belief with priority > it. The beliefs of one priority are the slice between the two
+    def _position(self, priority, before=False):
+        lo, hi = 0, len(self.beliefs)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            other = self.beliefs[mid][1]
+            if other > priority or (other == priority and not before):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def __contains__(self, formula):
+        """True if the formula is stored, as given or (with store_cnf) as its CNF."""
+        return self._stored_form(formula) is not None
+
+    # The formula as it is stored, which with store_cnf is usually its CNF, or None if it isn't stored
+    def _stored_form(self, formula):
+        if formula in self._priorities:
+            return formula
+        if self.store_cnf:
+            cnf_formula = formula.to_cnf()
+            if cnf_formula in self._priorities:
+                return cnf_formula
+        return None
     
     def get_beliefs(self):
         """Get all beliefs in the belief base without priorities."""
@@ -29,6 +198,26 @@ class BeliefBase:
     def get_prioritized_beliefs(self):
         """Get all beliefs with their priorities."""
         return self.beliefs
+
+    # Example: with beliefs [p, ¬p ∨ q] this gives [[(1,)], [(-1, 2)]], one list of clauses per belief in the same order as self.beliefs
+    def get_belief_clauses(self):
+        """Get the cached clauses of each belief."""
+        return [self._clauses_of(formula) for formula, _ in self.beliefs]
+
+    # Normally a cache hit, but beliefs put straight into self.beliefs are clausified here on first use
+    def _clauses_of(self, formula):
+        clauses = self.clause_cache.get(formula)
+        if clauses is None:
+            if instrumentation.ENABLED:
+                with instrumentation.phase("clausify"):
+                    clauses = self.clause_cache[formula] = clauses_for_belief(formula)
+            else:
+                clauses = self.clause_cache[formula] = clauses_for_belief(formula)
+        return clauses
+
+    def get_clauses(self):
+        """Get the clauses of all beliefs as one list."""
+        return [clause for clauses in self.get_belief_clauses() for clause in clauses]
     
     # Uses each Formula object's __str__ method to print the belief base, for example the Not class prints: print(Not(Atom("p")))  # Output: ¬(p)
     def __str__(self):
@@ -36,21 +225,364 @@ class BeliefBase:
     
     # Update the beliefs list by removing any entry where the stored formula f in the existing list is equal to formula passed as an argument
     # f != formula calls f.__eq__(formula) from the relevant formula class Atom, Not, Or etc
+    # Only the beliefs with the priorities of the formula's copies are looked at, and nothing changes if it isn't stored
+    # The formula is found like `formula in base` finds it, as given or as its CNF
     def remove(self, formula):
         """Remove a belief from the belief base."""
-        self.beliefs = [(f, p) for f, p in self.beliefs if f != formula]
+        formula = self._stored_form(formula)
+        if formula is None:
+            return
+        priorities = self._priorities.pop(formula)
+        for priority in set(priorities):
+            start, end = self._position(priority, before=True), self._position(priority)
+            self.beliefs[start:end] = [(f, p) for f, p in self.beliefs[start:end] if f != formula]
+        # Every copy of the formula is gone, so its clauses are no longer needed
+        self._forget(formula)
+        self._removed()
+
+    # Example: with beliefs [p, q, r] (in this order), retain({0, 2}) keeps p and r
+    def retain(self, indexes):
+        """Keep only the beliefs at the given indexes of get_prioritized_beliefs(), as they are and in their order."""
+        keep = set(indexes)
+        dropped = [belief for i, belief in enumerate(self.beliefs) if i not in keep]
+        if not dropped:
+            return
+        self.beliefs = [belief for i, belief in enumerate(self.beliefs) if i in keep]
+        for formula, priority in dropped:
+            priorities = self._priorities[formula]
+            priorities.remove(priority)
+            if not priorities:
+                del self._priorities[formula]
+                self._forget(formula)
+        self._removed()
+
+    # Drops the cached clauses and index entries of a formula that is no longer in the base
+    def _forget(self, formula):
+        clauses = self.clause_cache.pop(formula, None)
+        for var in self._atoms_of(clauses or []):
+            formulas = self.symbol_index.get(var)
+            if formulas is not None:
+                formulas.discard(formula)
+                if not formulas:
+                    del self.symbol_index[var]
+
+    # Bookkeeping after beliefs were taken out. Every subset of a consistent base is consistent, so a known answer of
+    # is_consistent carries over to the new version
+    def _removed(self):
+        with self._consistency_lock:
+            consistent = self._consistent_version == self.version and self._consistent
+            self.version += 1
+            if consistent:
+                self._consistent_version = self.version
+        self._components_stale = True
     
     def clear(self):
         """Remove all beliefs from the belief base."""
         self.beliefs = []
+        self._priorities = {}
+        self.clause_cache = {}
+        self.symbol_index = {}
+        self._consistency = None
+        self._consistency_index = {}
+        self._parent = {}
+        self._components_stale = False
+        self.version += 1
+
+    @staticmethod
+    def _atoms_of(clauses):
+        return {abs(lit) for clause in clauses for lit in clause}
+
+    def is_consistent(self, budget=None) -> bool:
+        """
+        True if the beliefs have a model. Decided by the SAT solver, once per version.
+        With a budget, raises BudgetExceeded when the check runs out of it, and the next call tries again.
+        Safe to call from several threads at once, as long as none of them changes the beliefs meanwhile.
+        """
+        with self._consistency_lock:
+            return self._check_consistency(budget)
+
+    # is_consistent without the lock
+    def _check_consistency(self, budget):
+        if self._consistent_version != self.version:
+            # Start over once the solver mostly holds beliefs that were removed since
+            if self._consistency is None or len(self._consistency_index) > 2 * len(self.beliefs) + 64:
+                self._consistency = IncrementalEntailment([])
+                self._consistency_index = {}
+            indexes = []
+            for formula, clauses in zip(self.get_beliefs(), self.get_belief_clauses()):
+                index = self._consistency_index.get(formula)
+                if index is None:
+                    index = self._consistency_index[formula] = self._consistency.add_belief(clauses)
+                indexes.append(index)
+            # With no query clauses, "entails" means the assumed beliefs have no model
+            self._consistent = not self._consistency.entails(indexes, budget)
+            self._consistent_version = self.version
+        return self._consistent
+
+    # Union-find with path compression, every atom is a set of its own until a belief unites it with others
+    def _find(self, var):
+        parent = self._parent
+        root = var
+        while parent[root] != root:
+            root = parent[root]
+        while parent[var] != root:
+            parent[var], var = root, parent[var]
+        return root
+
+    def _unite(self, atoms):
+        root = None
+        for var in atoms:
+            if var not in self._parent:
+                self._parent[var] = var
+            other = self._find(var)
+            if root is None:
+                root = other
+            elif other != root:
+                self._parent[other] = root
+
+    # The set of a belief, None for beliefs without atoms (a tautology, or ⊥ which makes the base inconsistent)
+    def _root_of(self, formula):
+        clauses = self._clauses_of(formula)
+        for clause in clauses:
+            for lit in clause:
+                # Beliefs put straight into self.beliefs join the union-find on first use
+                if abs(lit) not in self._parent:
+                    self._unite(self._atoms_of(clauses))
+                return self._find(abs(lit))
+        return None
+
+    # Builds the union-find again after remove or retain
+    def _refresh_components(self):
+        if self._components_stale:
+            self._parent = {}
+            for clauses in self.get_belief_clauses():
+                self._unite(self._atoms_of(clauses))
+            self._components_stale = False
+
+    # Example: with beliefs [p, p → q, r, ⊤] this gives [[0, 1], [2]]
+    def components(self):
+        """The beliefs grouped by shared atoms, as lists of indexes into get_prioritized_beliefs(). Beliefs without atoms are left out."""
+        self._refresh_components()
+        groups = {}
+        for i, (formula, _) in enumerate(self.beliefs):
+            root = self._root_of(formula)
+            if root is not None:
+                groups.setdefault(root, []).append(i)
+        return list(groups.values())
+
+    # Splits the belief indexes into those in a component sharing an atom with the clauses of ¬phi and the others,
+    # see "Localized remainders and kernels" above. None means every belief counts: the filter is off, the base is
+    # inconsistent, or its consistency couldn't be decided within the budget
+    def _localize(self, query_clauses, budget=None):
+        if not self.relevance_filter:
+            return None
+        try:
+            if not self.is_consistent(budget):
+                return None
+        except BudgetExceeded:
+            return None
+        self._refresh_components()
+        roots = {self._find(var) for var in self._atoms_of(query_clauses) if var in self._parent}
+        relevant, others = [], []
+        for i, (formula, _) in enumerate(self.beliefs):
+            (relevant if self._root_of(formula) in roots else others).append(i)
+        return relevant, others
+
+    # Maps remainders (or best remainders) of the relevant beliefs back to the whole base, see above
+    def _globalize(self, remainders, relevant, others, query_clauses):
+        if not others:
+            return [{relevant[i] for i in rem} for rem in remainders]
+        if not remainders:
+            # No nonempty subset of the relevant beliefs is a remainder. Unless phi is a tautology, the other
+            # beliefs alone still are one
+            if self._refutes()([], query_clauses):
+                return []
+            remainders = [set()]
+        result = [{relevant[i] for i in rem} | set(others) for rem in remainders]
+        result.sort(key=lambda remainder: sorted(remainder))
+        return result
+
+    # The beliefs that share an atom with the clauses of ¬query, directly or through other such beliefs
+    def relevant_beliefs(self, query_clauses):
+        """The stored formulas that an entailment check of the query needs, when the base is consistent."""
+        frontier = list(self._atoms_of(query_clauses))
+        reached_atoms = set(frontier)
+        relevant = set()
+        while frontier:
+            for formula in self.symbol_index.get(frontier.pop(), ()):
+                if formula in relevant:
+                    continue
+                relevant.add(formula)
+                for var in self._atoms_of(self.clause_cache[formula]):
+                    if var not in reached_atoms:
+                        reached_atoms.add(var)
+                        frontier.append(var)
+        return relevant
+
+    # The belief clauses to check ¬query against, None when the base is inconsistent and so entails every query
+    def _usable_clauses(self, query_clauses, budget=None):
+        if not self.relevance_filter:
+            return self.get_clauses()
+        if not self.is_consistent(budget):
+            return None
+        relevant = self.relevant_beliefs(query_clauses)
+        # In the order of the beliefs, so the engine sees the clauses in the same order on every run
+        clauses = [clause for formula, _ in self.beliefs if formula in relevant for clause in self.clause_cache[formula]]
+        if instrumentation.ENABLED:
+            instrumentation.count(relevant_clauses=len(clauses))
+        return clauses
+
+    # Checks KB ⊨ query with the engine chosen for this belief base, or with engine for this call only
+    # With a budget (see budget.py) the answer is an EntailmentResult instead of a bool, and it is UNKNOWN when the
+    # check runs out of the budget. Compiled engines use the SAT solver then, compiling the base has no budget
+    @instrumented("entails")
+    def entails(self, query: Formula, engine=None, budget=None):
+        """Returns True if the belief base entails the query."""
+        engine = engine or self.engine
+        self._check_engine(engine)
+        # Only the negated query is clausified here, the belief clauses come from the cache
+        query_clauses = negated_query_clauses(query)
+        # Equivalent queries with the same clauses, like p ∨ q and q ∨ p, share one cache entry
+        # Every engine gives the same answer, so the entry is shared between engines too
+        key = ("base", self.version, frozenset(query_clauses))
+        result = self.entailment_cache.get(key)
+        if budget is not None:
+            return self._entails_within(key, result, engine, query, query_clauses, budget)
+        if result is None:
+            if engine in COMPILED_ENGINES:
+                result = self.compiled().entails(query)
+            else:
+                usable = self._usable_clauses(query_clauses)
+                result = True if usable is None else get_engine(engine)(usable, query_clauses)
+            # Holding ¬query keeps the numbers of its auxiliary atoms, and so the key, valid while the entry lives
+            self.entailment_cache.put(key, result, Not(query))
+        return result
+
+    # entails() under a budget, cached is the cache entry for key (None when missing)
+    # Only known answers go into the cache, an unknown one may well be decided by a later call with more budget
+    def _entails_within(self, key, cached, engine, query, query_clauses, budget) -> EntailmentResult:
+        if cached is not None:
+            return EntailmentResult(ENTAILED if cached else NOT_ENTAILED, stats={"cached": True})
+        refutes = get_engine("sat" if engine in COMPILED_ENGINES else engine)
+        start = time.perf_counter()
+        try:
+            usable = self._usable_clauses(query_clauses, budget)
+            result = True if usable is None else refutes(usable, query_clauses, budget)
+        except BudgetExceeded as e:
+            return EntailmentResult(UNKNOWN, e.reason, e.stats)
+        self.entailment_cache.put(key, result, Not(query))
+        return EntailmentResult(ENTAILED if result else NOT_ENTAILED, stats={"seconds": time.perf_counter() - start})
+
+    # The BDD of the current beliefs, compiled again only after an add, remove or clear
+    def compiled(self) -> CompiledBase:
+        """Returns the compiled form of the belief base, see bdd.py."""
+        if self._compiled is None or self._compiled_version != self.version:
+            self._compiled = CompiledBase(self.get_beliefs())
+            self._compiled_version = self.version
+        return self._compiled
+
+    def count_models(self) -> int:
+        """Number of assignments to the symbols of the beliefs that satisfy every belief."""
+        return self.compiled().count_models()
+
+    def compiled_stats(self):
+        """Compile time and size statistics of the compiled form, see CompiledBase.stats."""
+        return self.compiled().stats()
+
+    # Checks KB ⊨ query for many queries at once, see entails_many in entailment.py
+    # Cached answers are reused and the rest share one incremental solver (or one per worker process with workers > 1),
+    # whatever the base's engine is, since every engine gives the same answers. Like entails(), an inconsistent base
+    # entails every query, and with the relevance filter the solver only gets the beliefs connected to some query
+    @instrumented("entails_many")
+    def entails_many(self, queries, workers=None) -> BatchResult:
+        """Returns a BatchResult with one answer per query, in the order of the queries."""
+        start = time.perf_counter()
+        keys = [("base", self.version, frozenset(negated_query_clauses(query))) for query in queries]
+        owners = dict(zip(keys, (Not(query) for query in queries)))
+        results = [self.entailment_cache.get(key) for key in keys]
+        # Every distinct query that is not cached yet is decided once
+        missing = list(dict.fromkeys(key for key, result in zip(keys, results) if result is None))
+        if missing:
+            # A belief connected to one query but not to another shares no atom with the other one (and the base is
+            # consistent), so it doesn't change the other answer
+            usable = self._usable_clauses([clause for key in missing for clause in key[2]])
+            if usable is None:
+                answers = dict.fromkeys(missing, True)
+            else:
+                answers = dict(zip(missing, refutes_many(usable, [sorted(key[2]) for key in missing], workers)))
+            for key, answer in answers.items():
+                self.entailment_cache.put(key, answer, owners[key])
+            results = [answers[key] if result is None else result for key, result in zip(keys, results)]
+        seconds = time.perf_counter() - start
+        return BatchResult(results, seconds, len(queries) / seconds if seconds > 0 else float("inf"))
+
+    def cache_stats(self):
+        """Hit, miss and eviction counters of the entailment cache."""
+        return self.entailment_cache.stats()
         
     # Computes all maximal subsets of the current belief base that do not entail formula phi
     # These subsets are the remainders and we need these for the partial meet contraction
-    def compute_remainders(self, phi: Formula):
-        # Retrieve the belief base and its priorities in each element
-        beliefs = self.get_prioritized_beliefs()
-        # Get the number of beliefs in the belief base
-        n = len(beliefs)
+    # method overrides self.remainder_method for this call
+    # With a budget, every subset check runs under it and on_unknown (see UNKNOWN_POLICIES) decides what a check that
+    # runs out counts as. The methods that need proofs from the solver ("mcs") or other processes ("parallel") give
+    # the same remainders as "incremental", which is used for them then
+    @instrumented("compute_remainders")
+    def compute_remainders(self, phi: Formula, method=None, budget=None, on_unknown="raise"):
+        method = method or self.remainder_method
+        self._check_remainder_method(method)
+        self._check_unknown_policy(on_unknown)
+        if budget is not None and method in ("mcs", "parallel"):
+            method = "incremental"
+        # The cached clauses of every belief, and the clauses of ¬phi which we only need to compute once
+        belief_clauses = self.get_belief_clauses()
+        query_clauses = negated_query_clauses(phi)
+        # Only the components that phi touches have to be searched, see "Localized remainders and kernels"
+        local = self._localize(query_clauses, budget)
+        if local is None:
+            return self._counted(self._remainders(belief_clauses, query_clauses, method, budget, on_unknown))
+        relevant, others = local
+        remainders = self._remainders([belief_clauses[i] for i in relevant], query_clauses, method, budget, on_unknown)
+        return self._counted(self._globalize(remainders, relevant, others, query_clauses))
+
+    # The remainders of the beliefs with the given clauses, as index sets into belief_clauses
+    def _remainders(self, belief_clauses, query_clauses, method, budget, on_unknown):
+        # Get the number of beliefs
+        n = len(belief_clauses)
+        if method == "mcs":
+            return mcs_remainders(belief_clauses, query_clauses)
+        if method == "parallel":
+            # The workers check the subsets with their own solvers, these checks don't go through the entailment cache
+            return parallel_remainders(belief_clauses, query_clauses, self.workers)
+        if method == "incremental":
+            # One solver for the whole computation, each subset is just a different set of selector assumptions
+            checker = IncrementalEntailment(belief_clauses, query_clauses)
+            def check_subset(indexes):
+                return checker.entails(indexes, budget)
+        else:
+            refutes = self._refutes()
+            # Check if the subset entails phi, that is, if the subset clauses together with ¬phi are unsatisfiable
+            def check_subset(indexes):
+                clauses = [clause for i in indexes for clause in belief_clauses[i]]
+                return refutes(clauses, query_clauses) if budget is None else refutes(clauses, query_clauses, budget)
+        query_key = frozenset(query_clauses)
+
+        # Subsets are cached by their clauses rather than by version, so the same subset met again in a later
+        # contraction (after the base was rebuilt) is still a hit
+        def entails_subset(indexes):
+            if instrumentation.ENABLED:
+                instrumentation.count(subsets_tested=1)
+            key = ("subset", frozenset(clause for i in indexes for clause in belief_clauses[i]), query_key)
+            result = self.entailment_cache.get(key)
+            if result is None:
+                try:
+                    result = check_subset(indexes)
+                except BudgetExceeded:
+                    if on_unknown == "raise":
+                        raise
+                    # Not cached, the policy's guess is not an answer
+                    return on_unknown == "entailed"
+                self.entailment_cache.put(key, result)
+            return result
         # Initialize empty remainders list
         remainders = []
         
@@ -63,17 +595,12 @@ class BeliefBase:
                 # THIS AVOIDS DUPLICATE REMAINDERS
                 # Example: If {0,1,2} already is a remainder, so we don't need to bother testing {0,1} or {1,2}
                 if any(set(indexes).issubset(rem) for rem in remainders):
+                    if instrumentation.ENABLED:
+                        instrumentation.count(subsets_pruned=1)
                     continue
                 
-                # Create a temporary belief base from the subset
-                temp = BeliefBase()
-                # Add the beliefs in the current subset to the temporary belief base
-                for i in indexes:
-                    belief, pri = beliefs[i]
-                    temp.add(belief, priority=pri)
-
-                # Check if the temporary belief base entails phi
-                if not resolution_entails(temp, phi):
+                # Check if the beliefs in the current subset entail phi
+                if not entails_subset(indexes):
                     remainders.append(set(indexes))
             # If we found at least one remainder of size k, we can stop looking for smaller subsets
             if remainders:
@@ -81,6 +608,41 @@ class BeliefBase:
 
         return remainders
 
+    @staticmethod
+    def _counted(remainders):
+        if instrumentation.ENABLED:
+            instrumentation.count(remainders=len(remainders))
+        return remainders
+
+    # The remainders that select_remainders would pick from compute_remainders(phi), found by branch and bound
+    # over the beliefs instead of by computing every remainder first, see remainders.py
+    @instrumented("best_remainders")
+    def best_remainders(self, phi: Formula):
+        priorities = [priority for _, priority in self.get_prioritized_beliefs()]
+        belief_clauses = self.get_belief_clauses()
+        query_clauses = negated_query_clauses(phi)
+        local = self._localize(query_clauses)
+        if local is None:
+            return best_remainders(belief_clauses, query_clauses, priorities)
+        # Every remainder holds all other beliefs, so the best ones on the relevant beliefs are the best ones overall
+        relevant, others = local
+        best = best_remainders([belief_clauses[i] for i in relevant], query_clauses, [priorities[i] for i in relevant])
+        return self._globalize(best, relevant, others, query_clauses)
+
+    # Computes all minimal subsets of the current belief base that entail phi (the phi-kernels), as index sets
+    # These are what kernel contraction cuts into
+    @instrumented("compute_kernels")
+    def compute_kernels(self, phi: Formula):
+        belief_clauses = self.get_belief_clauses()
+        query_clauses = negated_query_clauses(phi)
+        local = self._localize(query_clauses)
+        if local is None:
+            return enumerate_kernels(belief_clauses, query_clauses)
+        # A kernel is minimal, so it never holds a belief outside the components phi touches
+        relevant, _ = local
+        kernels = enumerate_kernels([belief_clauses[i] for i in relevant], query_clauses)
+        return [frozenset(relevant[i] for i in kernel) for kernel in kernels]
+
 # We take the remainders and sum up the priority values and return the set with the highest score
 # If we have several sets with the same highest score, we return all of them
 def select_remainders(remainders: list[set[int]], priorities: list[int]) -> list[set[int]]:
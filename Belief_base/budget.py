@@ -0,0 +1,95 @@
+import time
+from typing import Optional
+
+"""
+Resource limits for entailment checks, and the three-valued answer of a check that may run out of them.
+
+A Budget bounds one operation (an ask, a contraction or a revision) by
+    - seconds: wall time, counted from when the budget is created, shared by every check of the operation
+    - max_clauses: clauses one check may hold at a time (resolution: active + waiting, SAT: original + learnt)
+    - max_resolvents: clauses one check may derive (resolution: resolvents, SAT: learnt clauses, one per conflict)
+The engines call budget.check(...) while they work and stop with BudgetExceeded when a limit is hit. BeliefBase.entails
+turns that into an EntailmentResult with status UNKNOWN, and the agent's unknown_policy decides what a contraction
+does with it.
+
+Example:
+    result = agent.ask(phi, budget=Budget(seconds=0.05, max_resolvents=100_000))
+    if result.status == UNKNOWN:
+        print(result.reason, result.stats)   # "deadline" {"clauses": ..., "resolvents": ..., "seconds": 0.05}
+"""
+
+ENTAILED = "entailed"
+NOT_ENTAILED = "not_entailed"
+UNKNOWN = "unknown"
+
+
+class BudgetExceeded(Exception):
+    """An entailment check ran out of its budget. reason names the limit, stats is the work done until then."""
+    def __init__(self, reason: str, stats: dict):
+        super().__init__(f"Entailment budget exceeded: {reason}")
+        self.reason = reason
+        self.stats = stats
+
+
+class Budget:
+    """Limits for one operation, see the module docstring. None means no limit."""
+    def __init__(self, seconds: Optional[float] = None, max_clauses: Optional[int] = None,
+                 max_resolvents: Optional[int] = None):
+        self.seconds = seconds
+        self.max_clauses = max_clauses
+        self.max_resolvents = max_resolvents
+        self.start = time.perf_counter()
+        self.deadline = None if seconds is None else self.start + seconds
+
+    def check(self, clauses: int = 0, resolvents: int = 0):
+        """Raises BudgetExceeded if the deadline passed or one check holds or derived too many clauses."""
+        reason = None
+        if self.max_clauses is not None and clauses > self.max_clauses:
+            reason = "max_clauses"
+        elif self.max_resolvents is not None and resolvents > self.max_resolvents:
+            reason = "max_resolvents"
+        elif self.deadline is not None and time.perf_counter() >= self.deadline:
+            reason = "deadline"
+        if reason is not None:
+            raise BudgetExceeded(reason, {"clauses": clauses, "resolvents": resolvents,
+                                          "seconds": time.perf_counter() - self.start})
+
+    def __repr__(self):
+        return f"Budget(seconds={self.seconds}, max_clauses={self.max_clauses}, max_resolvents={self.max_resolvents})"
+
+
+class EntailmentResult:
+    """
+    The answer of an entailment check under a budget: status is ENTAILED, NOT_ENTAILED or UNKNOWN. For UNKNOWN,
+    reason names the limit that was hit and stats holds the work done until then.
+    A known result can be used as a bool, an unknown one raises ValueError instead of silently counting as False.
+    """
+    __slots__ = ("status", "reason", "stats")
+
+    def __init__(self, status: str, reason: Optional[str] = None, stats: Optional[dict] = None):
+        self.status = status
+        self.reason = reason
+        self.stats = stats or {}
+
+    @property
+    def entailed(self) -> Optional[bool]:
+        """True, False, or None when unknown."""
+        return None if self.status == UNKNOWN else self.status == ENTAILED
+
+    def __bool__(self):
+        if self.status == UNKNOWN:
+            raise ValueError(f"Entailment is unknown ({self.reason}), check result.status")
+        return self.status == ENTAILED
+
+    def __eq__(self, other):
+        if isinstance(other, EntailmentResult):
+            return self.status == other.status
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.status)
+
+    def __repr__(self):
+        if self.status == UNKNOWN:
+            return f"EntailmentResult({self.status!r}, reason={self.reason!r}, stats={self.stats!r})"
+        return f"EntailmentResult({self.status!r})"
@@ -0,0 +1,69 @@
+import threading
+from collections import OrderedDict
+from Belief_base import instrumentation
+
+class EntailmentCache:
+    """
+    Bounded least-recently-used cache for entailment results.
+
+    Keys are built by BeliefBase: (belief base version, canonical query) for whole-base checks and
+    (subset fingerprint, canonical query) for the subset checks of compute_remainders.
+    When the cache is full, the entry that was used least recently is evicted.
+    put takes an optional owner that is kept alive as long as the entry: BeliefBase passes the negated query, so the
+    auxiliary atoms in the key keep their numbers (SymbolTable.aux_ids only holds live subformulas).
+    A maxsize of 0 turns caching off.
+    Safe to share between threads, for example when asks run in a thread pool.
+    """
+    def __init__(self, maxsize=1024):
+        if maxsize < 0:
+            raise ValueError("maxsize must be at least 0")
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the cached result for key, or None if it is not cached."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                if instrumentation.ENABLED:
+                    instrumentation.count(cache_misses=1)
+                return None
+            # Mark as most recently used
+            self.entries.move_to_end(key)
+            self.hits += 1
+            if instrumentation.ENABLED:
+                instrumentation.count(cache_hits=1)
+            return entry[0]
+
+    def put(self, key, result, owner=None):
+        if self.maxsize == 0:
+            return
+        with self.lock:
+            self.entries[key] = (result, owner)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drops every entry, the counters are kept."""
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """Hit, miss and eviction counters plus the current size, as a dict."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+        }
+
+    def __len__(self):
+        return len(self.entries)
@@ -1,24 +1,93 @@
-from typing import List, Set, Tuple
+import threading
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
 from Belief_base.formula import Formula, And, Or, Not, Atom
 # from Belief_base.belief_base import BeliefBase
-from itertools import combinations
+from collections import defaultdict
+from heapq import heappush, heappop
+from Belief_base.sat_solver import CDCLSolver
+from Belief_base.tseitin import tseitin_clauses
+from Belief_base import truth_table
+from Belief_base import instrumentation
+from Belief_base.instrumentation import instrumented
+from Belief_base.truth_table import truth_table_refutes
+from Belief_base.budget import Budget
 
-# Literal is for (atom name, is_positive) example: ("p", False) means ¬p
-Literal = Tuple[str, bool]
-# Clause is the frozenset of literals
-Clause  = frozenset[Literal]
+# Literal is a signed int: the atom's number when positive, minus the number when negated, so with p ↦ 1 the literal ¬p is -1
+Literal = int
+# Clause is a sorted tuple of distinct literals, like (-1, 2) for ¬p ∨ q
+Clause  = Tuple[Literal, ...]
+
+class SymbolTable:
+    """
+    Interns atom names to small positive ints so that literals and clauses are plain ints and tuples.
+    Example: after intern("p") == 1 and intern("q") == 2, the clause ¬p ∨ q is stored as (-1, 2).
+    """
+    def __init__(self):
+        # Held while a new number is handed out, so threads clausifying at the same time never share one
+        self.lock = threading.Lock()
+        self.ids: Dict[str, int] = {}
+        # names[i] is the atom behind number i, position 0 is unused because 0 has no negation and auxiliary atoms
+        # have None, see name()
+        self.names: List[str] = [None]
+        # Auxiliary atoms of the Tseitin conversion, one per distinct live subformula. The keys are weak, so the
+        # entries of subformulas nobody holds any more (queries that were answered, beliefs that were removed) go away
+        # on their own instead of piling up in a long-running process. Numbers are never handed out twice, so a
+        # subformula built again later gets a new one, and names grows by one slot per auxiliary atom ever created
+        self.aux_ids = weakref.WeakKeyDictionary()
+
+    def intern(self, name: str) -> int:
+        """Returns the number of the atom, assigning the next free one on first use."""
+        var = self.ids.get(name)
+        if var is None:
+            with self.lock:
+                var = self.ids.get(name)
+                if var is None:
+                    var = len(self.names)
+                    self.names.append(name)
+                    self.ids[name] = var
+        return var
+
+    # Auxiliary atoms are named _aux<number> for printing, but they are not in self.ids, so they can never be
+    # confused with an atom of the same name
+    def aux(self, formula: Formula) -> int:
+        """Returns the auxiliary atom standing for the subformula, assigning a new one on first use."""
+        var = self.aux_ids.get(formula)
+        if var is None:
+            with self.lock:
+                var = self.aux_ids.get(formula)
+                if var is None:
+                    var = len(self.names)
+                    self.names.append(None)
+                    self.aux_ids[formula] = var
+        return var
+
+    def literal(self, name: str, positive: bool = True) -> Literal:
+        var = self.intern(name)
+        return var if positive else -var
+
+    def name(self, lit: Literal) -> str:
+        var = abs(lit)
+        return self.names[var] or f"_aux{var}"
+
+    # Turn an int clause back into readable (atom name, is_positive) pairs, handy for printing and debugging
+    def decode(self, clause: Clause) -> frozenset:
+        return frozenset((self.name(lit), lit > 0) for lit in clause)
+
+    def __len__(self):
+        return len(self.names) - 1
+
+# Process-wide table used by default, so the same atom gets the same number in every belief base
+SYMBOLS = SymbolTable()
 
 # We need this tautology check because if not, our resolution algorithm will treat every tautology as a contradiction, which is wrong
 # So we need this method to filter out tautologies from the clauses
 def is_tautology(clause: Clause) -> bool:
-    # clause is a frozenset of (symbol, is_positive) pairs
-    syms = {}
-    for sym, pos in clause:
-        if sym in syms and syms[sym] != pos:
-            # we’ve seen the same symbol with the opposite polarity
-            return True
-        syms[sym] = pos
-    return False
+    # Literals in a clause are distinct, so two of them sharing an atom means p and ¬p are both in there
+    return len({abs(lit) for lit in clause}) != len(clause)
 
 """ 
 Something like this:
@@ -28,20 +97,25 @@ And(
   Atom("r")                        # clause 2: r
 )
 
-Will give 
+Will give (with p ↦ 1, q ↦ 2, r ↦ 3 in the symbol table)
 
 [
-  frozenset({("p", True),  ("q", False)}),
-  frozenset({("r", True)})
+  (-2, 1),
+  (3,)
 ]
 
 via extract_clauses()
 
 """
-def extract_clauses(formula: Formula) -> List[Clause]:
+@instrumented("extract_clauses")
+def extract_clauses(formula: Formula, table: SymbolTable = SYMBOLS) -> List[Clause]:
     # print("Extraction started for formula:", formula)
     # Double check if the formula is in CNF
-    cnf = formula.to_cnf()
+    if instrumentation.ENABLED:
+        with instrumentation.phase("to_cnf"):
+            cnf = formula.to_cnf()
+    else:
+        cnf = formula.to_cnf()
     # print("CNF form:", cnf)
     
     # If the formula has ∧, break up the conjunction into separate clauses
@@ -65,24 +139,26 @@ def extract_clauses(formula: Formula) -> List[Clause]:
             # If there is no or operator, then we have a unit clause like Atom("p") or Not(Atom("q")) which is a single literal
             disjunctions = [sub]
             
-        # set of literals to turn each disjunction into a (atom, is_positive) tuple
-        lits: Set[Literal] = set()
+        # set of literals to turn each disjunction into signed ints
+        lits = set()
         
         # Loop through each literal in the disjunctions list
         for lit in disjunctions:
             # Check if the literal is true
             if isinstance(lit, Atom):
-                lits.add((lit.name, True))  # Positive literal
+                lits.add(table.intern(lit.name))  # Positive literal
             # Check if the literal is a negation (false) and that it is an atom
             elif isinstance(lit, Not) and isinstance(lit.formula, Atom):
-                lits.add((lit.formula.name, False))
+                lits.add(-table.intern(lit.formula.name))
             else:
                 # In every proper CNF, every literal must be either an Atom or Not(Atom)
                 raise ValueError(f"Non literal in clause: {lit}")
             
-        # Finally add the set of literals to the clauses list as a frozenset
-        clauses.append(frozenset(lits)) 
+        # Finally add the literals to the clauses list as a sorted tuple, so equal clauses compare and hash equal
+        clauses.append(tuple(sorted(lits)))
     
+    if instrumentation.ENABLED:
+        instrumentation.count(clauses_out=len(clauses))
     return clauses
 
 """
@@ -92,73 +168,281 @@ beliefs = [
 ]
 """
 
+# The clause form used by the entailment pipeline. Unlike extract_clauses it never calls to_cnf: compound
+# subformulas under a ∨ get auxiliary atoms (see tseitin.py), so the clauses grow linearly instead of exponentially.
+# For a formula that already is in CNF the clauses are exactly the ones extract_clauses gives.
+def clausify(formula: Formula, table: SymbolTable = SYMBOLS) -> List[Clause]:
+    return tseitin_clauses(formula, table)
+
+# Clauses of a single belief, without tautologies. BeliefBase caches this per belief when the belief is added
+# Example: belief = Or(Not(Atom("p")), Atom("q")), clausify recognizes the OR and builds the clause (-1, 2)
+def clauses_for_belief(belief: Formula, table: SymbolTable = SYMBOLS) -> List[Clause]:
+    # tseitin_clauses already drops tautological clauses, which would otherwise break the consistency postulate
+    return clausify(belief, table)
+
+# All clauses of the beliefs in the belief base, taken from the belief base's clause cache
+def belief_clauses(kb) -> List[Clause]:
+    return kb.get_clauses()
+
+# Clauses of ¬query, which is what we add to the belief base clauses to prove the query by contradiction
+def negated_query_clauses(query, table: SymbolTable = SYMBOLS) -> List[Clause]:
+    # Negate the φ and clausify it, ¬(p ∧ q) gives the single clause (¬p ∨ ¬q)
+    return clausify(Not(query), table)
+
 # Query the clauses where we 
-def cnf_clauses_for_query(kb, query) -> List[Clause]:
-    from Belief_base.belief_base import BeliefBase
-    all_clauses: List[Clause] = []
-    
-    # Iterate through each belief in the belief base
-    # 1st iteration example: belief = Or(Not(Atom("p")), Atom("q"))
-    # Extract_clauses recognizes the OR and builds set frozenset({ ("p", False), ("q", True) })
-    # 2nd iteration example: belief = Atom("p")
-    # Extract_clauses recognizes the single atom and builds set frozenset({ ("p", True) })
-    for belief in kb.get_beliefs():
-        # For each belief formula, get each 
-        all_clauses.extend(extract_clauses(belief))
-    
-    # Negate the φ and convert to cnf
-    neg_query = Not(query).to_cnf()
-    
-    # Add the negated φ to the clauses list (because resolution works by proof of contradition), so the final all_clauses in our example becomes: 
-    all_clauses.extend(extract_clauses(neg_query))
-    
+def cnf_clauses_for_query(kb, query, table: SymbolTable = SYMBOLS) -> List[Clause]:
+    # Add the negated φ to the clauses list (because resolution works by proof of contradition), so the final clauses in our example becomes: 
     """ 
     [
-            frozenset({ ("p", False), ("q", True) }),   # (¬p ∨ q)   from Implies(p, q)
-            frozenset({ ("p", True) }),                 # (p)        from Atom(p)
-            frozenset({ ("q", False) })                  # (¬q)       from ¬query
+            (-1, 2),   # (¬p ∨ q)   from Implies(p, q)
+            (1,),      # (p)        from Atom(p)
+            (-2,)      # (¬q)       from ¬query
         ] 
         
         """
-        
-    # DROP ALL CLAUSES THAT ARE TAUTOLOGIES OR ELSE THE CONSISTENCY POSTULATE WILL FAIL
-    return [c for c in all_clauses if not is_tautology(c)]
+    return belief_clauses(kb) + negated_query_clauses(query, table)
+
+"""
+Given-clause resolution with set of support.
+
+The clauses are kept in three places:
+    - passive: clauses waiting to be picked, in a heap ordered by length so unit clauses are picked first
+    - active: clauses that were picked (the "given" clauses) and the belief base clauses, indexed by literal
+    - reservoir: the belief base clauses that have not been picked as given clause yet
+
+The set of support starts as the clauses of ¬query. Each given clause is resolved against the active clauses only,
+so every pair of clauses is resolved at most once, and its resolvents go back into passive. A given clause that is
+subsumed by an active clause (some active clause is a subset of it) is thrown away (forward subsumption), and
+active clauses that are subsumed by the given clause are deleted (backward subsumption).
+
+Resolving only from the set of support is complete as long as the belief base clauses are satisfiable on their own.
+For an inconsistent belief base (which entails everything) we fall back to picking the remaining belief base clauses
+as given clauses too once the set of support runs dry, resolving each only against the reservoir clauses it has not
+met yet. That finishes a complete saturation, so the answers are the same as resolving every pair.
+"""
+@instrumented("resolution_refutes")
+def resolution_refutes(usable: List[Clause], support: List[Clause], budget: Optional[Budget] = None) -> bool:
+    """
+    Returns True if the empty clause can be derived from usable ∪ support by resolution.
+    With a budget, raises BudgetExceeded as soon as one of its limits is hit.
+    """
+    active: Dict[Clause, frozenset] = {}
+    occurs: Dict[Literal, set] = defaultdict(set)
+    reservoir = set()
+    passive = []
+    seen = set()
+    # Work counters reported to instrumentation when the search ends
+    counts = {"given": 0, "subsumed": 0, "start": 0}
+
+    # Forward subsumption: is some active clause a subset of lits?
+    def subsumed(lits):
+        for lit in lits:
+            for other in occurs[lit]:
+                if active[other] <= lits:
+                    return True
+        return False
+
+    # Backward subsumption: delete every active clause that contains all of lits
+    def remove_subsumed_by(lits):
+        rarest = min(lits, key=lambda lit: len(occurs[lit]))
+        for other in list(occurs[rarest]):
+            if lits <= active[other]:
+                for lit in other:
+                    occurs[lit].discard(other)
+                del active[other]
+                reservoir.discard(other)
+                counts["subsumed"] += 1
+
+    def activate(clause, lits):
+        active[clause] = lits
+        for lit in clause:
+            occurs[lit].add(clause)
+
+    # Resolve the given clause against the active clauses (or only the reservoir ones), True on the empty clause
+    def resolve(lits, only_reservoir=False):
+        for lit in lits:
+            for other in occurs[-lit]:
+                if only_reservoir and other not in reservoir:
+                    continue
+                # Example: given = {-1, 2} (¬p ∨ q) and other = {1} (p), remove the pair -1, 1 and we are left with {2} (q)
+                R = (lits | active[other]) - {lit, -lit}
+                # If the set is empty, that means we have derived the empty clause, which means we have a contradiction
+                if not R:
+                    return True
+                # A resolvent with another complementary pair left is a tautology and can never help
+                if any(-l in R for l in R):
+                    continue
+                clause = tuple(sorted(R))
+                if clause not in seen:
+                    seen.add(clause)
+                    heappush(passive, (len(clause), clause))
+                    if budget is not None:
+                        budget.check(len(active) + len(passive), len(seen) - counts["start"])
+        return False
+
+    # A tautology like p ∨ ¬p is true anyway and must not take part: resolve removes both p and ¬p from a resolvent,
+    # so (¬p ∨ ¬q) against (p ∨ ¬p) would wrongly give ¬q. Such clauses are dropped before anything else happens
+    def tautological(lits):
+        return any(-lit in lits for lit in lits)
+
+    # The belief base clauses start out active, shortest first so that subsumed duplicates are dropped right away
+    for clause in sorted(set(usable), key=lambda c: (len(c), c)):
+        if not clause:
+            return True
+        lits = frozenset(clause)
+        if tautological(lits) or subsumed(lits):
+            continue
+        remove_subsumed_by(lits)
+        activate(clause, lits)
+        reservoir.add(clause)
+        seen.add(clause)
+    # The set of support starts with ¬query
+    for clause in support:
+        if not clause:
+            return True
+        if clause not in seen and not tautological(frozenset(clause)):
+            seen.add(clause)
+            heappush(passive, (len(clause), clause))
+    # Everything added to seen from here on is a resolvent
+    counts["start"] = len(seen)
+    if budget is not None:
+        budget.check(len(active) + len(passive), 0)
+
+    def done(result):
+        if instrumentation.ENABLED:
+            instrumentation.count(clauses_in=len(usable) + len(support), resolvents=len(seen) - counts["start"],
+                                  subsumed=counts["subsumed"], given_clauses=counts["given"])
+        return result
+
+    while True:
+        while passive:
+            _, given = heappop(passive)
+            counts["given"] += 1
+            if budget is not None:
+                budget.check(len(active) + len(passive), len(seen) - counts["start"])
+            lits = frozenset(given)
+            if subsumed(lits):
+                counts["subsumed"] += 1
+                continue
+            remove_subsumed_by(lits)
+            if resolve(lits):
+                return done(True)
+            activate(given, lits)
+        # Nothing left to resolve from the set of support, so KB ∪ {¬query} is satisfiable unless KB is inconsistent
+        if not reservoir:
+            return done(False)
+        given = min(reservoir, key=lambda c: (len(c), c))
+        reservoir.discard(given)
+        counts["given"] += 1
+        if resolve(active[given], only_reservoir=True):
+            return done(True)
 
 # Method that takes in the belief base, query (phi) to check if the belief base entails the query kb ⊨ query?
+@instrumented("resolution_entails")
 def resolution_entails(kb, query) -> bool:
-    from Belief_base.belief_base import BeliefBase
-    # Turn everything into clauses and cnf_clauses_for_query will also negate the query and return frozensets of literals
-    clauses = set(cnf_clauses_for_query(kb, query))
+    # The belief base clauses are usable, the clauses of ¬query form the set of support
+    return resolution_refutes(belief_clauses(kb), negated_query_clauses(query))
 
-    # new_clauses to store any new clauses generated during resolution
-    new_clauses = set()
-    while True:
-        # Loop over all pairs of existing clauses
-        # We try to resolve each pair -- that is, find complementary pairs like p and ¬p so that they cancel out
-        for C1, C2 in combinations(clauses, 2):
-            # For each literal (symbol, is_positive) in C1, check if the opposite literal exists in C2
-            # Example: C1 = [("p", False), ("q", True)] and C2 = [("p", True)]
-            for (sym, pos) in C1:
-                # We take the first element ("p", False) and define pair comp as ("p", True)
-                comp = (sym, not pos)
-                # If ("p", True) is in C2 (in our example it is), we can resolve C1 and C2
-                if comp in C2:
-                    # C1 | C2 is the set union between C1 and C2 combining all literals
-                    # So in our example, that would be {("p", False), ("q", True), ("p", True)} and we take
-                    # this and remove the complementary pair in our case ("p", True) and ("p", False)
-                    # and we are left with only ("q", True)
-                    R = frozenset((C1 | C2) - {(sym,pos), comp})
-                    # If the set is empty, that means we have derived the empty clause, which means we have a contradiction
-                    # and therefore the original query is entailed by the belief base
-                    if len(R) == 0:
-                        return True
-                    # If the set is not empty, we add it to the new_clauses set
-                    new_clauses.add(R)
-                    
-        # Below we add new_clauses to clauses and so if new_clauses is a subset of clauses, that means we have not made any new unique pair
-        # and so KB ⊭ query
-        if new_clauses.issubset(clauses):
-            return False
-        
-        # Add new_clauses to clauses
-        clauses |= new_clauses
+# The CDCL counterpart of resolution_refutes: usable ∪ support is refuted when the solver finds no model
+@instrumented("sat_refutes")
+def sat_refutes(usable: List[Clause], support: List[Clause], budget: Optional[Budget] = None) -> bool:
+    """Returns True if usable ∪ support is unsatisfiable. With a budget, raises BudgetExceeded when it runs out."""
+    solver = CDCLSolver(usable)
+    for clause in support:
+        solver.add_clause(clause)
+    result = not solver.solve(budget=budget)
+    if instrumentation.ENABLED:
+        instrumentation.count(clauses_in=len(usable) + len(support), conflicts=solver.conflicts,
+                              decisions=solver.decisions, propagations=solver.propagations)
+    return result
+
+
+# Same question as resolution_entails, but KB ∪ {¬query} is handed to the CDCL solver instead of being saturated by resolution
+# If the solver cannot find a model, the clause set is unsatisfiable and so KB ⊨ query
+def sat_entails(kb, query) -> bool:
+    # The clauses are already signed ints, which is exactly what the solver takes
+    return sat_refutes(belief_clauses(kb), negated_query_clauses(query))
+
+"""
+Batch entailment: many queries against the same belief base.
+
+All queries share one incremental CDCL solver that is loaded with the belief base clauses once. Each query gets a
+fresh selector atom s, its ¬query clauses are added as (¬s ∨ C), and the query is decided by solving under the
+assumption s. Afterwards the unit clause ¬s switches the query off for good, so the clauses the solver learnt stay
+valid and are reused by the following queries. The answers are the same as the ones of any other engine.
+"""
+
+class BatchResult(NamedTuple):
+    """Answers of a batch of queries, in the order of the queries, and how fast they were found."""
+    results: List[bool]
+    seconds: float
+    queries_per_second: float
+
+
+# Decide the refutation of usable ∪ support for every support in turn, on one solver
+def _refutes_chunk(usable: List[Clause], supports: Sequence[List[Clause]]) -> List[bool]:
+    solver = CDCLSolver(usable)
+    # Selectors are numbered above every atom in the clauses, so they can't clash with one
+    selector = max((abs(lit) for clauses in (usable, *supports) for clause in clauses for lit in clause), default=0)
+    results = []
+    for support in supports:
+        selector += 1
+        for clause in support:
+            solver.add_clause((-selector,) + clause)
+        results.append(not solver.solve([selector]))
+        solver.add_clause((-selector,))
+    return results
+
+def refutes_many(usable: List[Clause], supports: Sequence[List[Clause]], workers: Optional[int] = None) -> List[bool]:
+    """
+    For each support (the clauses of one ¬query), returns True if usable ∪ support is unsatisfiable.
+    With workers > 1 the supports are split into that many chunks, each solved in its own process.
+    """
+    if not workers or workers < 2 or len(supports) < 2:
+        return _refutes_chunk(usable, supports)
+    size = -(-len(supports) // workers)
+    chunks = [supports[i:i + size] for i in range(0, len(supports), size)]
+    with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+        # map keeps the chunks in order, so the answers line up with the queries
+        return [result for results in pool.map(_refutes_chunk, repeat(usable), chunks) for result in results]
+
+# Decide kb ⊨ query for every query, clausifying the belief base only once
+def entails_many(kb, queries: Sequence[Formula], workers: Optional[int] = None) -> BatchResult:
+    start = time.perf_counter()
+    results = refutes_many(belief_clauses(kb), [negated_query_clauses(query) for query in queries], workers)
+    seconds = time.perf_counter() - start
+    return BatchResult(results, seconds, len(queries) / seconds if seconds > 0 else float("inf"))
+
+# Same question again, answered by checking every assignment with numpy bit arrays (see truth_table.py)
+def truth_table_entails(kb, query) -> bool:
+    return truth_table_refutes(belief_clauses(kb), negated_query_clauses(query))
+
+# Up to this many variables the "auto" engine enumerates the truth table, 2^22 assignments is 512 KB of bits per variable
+TRUTH_TABLE_MAX_VARS = 22
+
+# Picks the engine by the number of variables in the clauses: small signatures go to the truth table when numpy is
+# installed, everything else to the CDCL solver
+def auto_refutes(usable: List[Clause], support: List[Clause], budget: Optional[Budget] = None) -> bool:
+    """Returns True if usable ∪ support is unsatisfiable."""
+    if truth_table.available():
+        variables = {abs(lit) for clauses in (usable, support) for clause in clauses for lit in clause}
+        if len(variables) <= TRUTH_TABLE_MAX_VARS:
+            return truth_table_refutes(usable, support, budget)
+    return sat_refutes(usable, support, budget)
+
+# Available entailment engines, selectable by name on BeliefBase and BeliefRevisionAgent
+# Each engine takes the belief clauses and the clauses of ¬query and returns True when together they are unsatisfiable
+# An engine also takes an optional budget (see budget.py) and raises BudgetExceeded when it runs out
+ENGINES = {
+    "resolution": resolution_refutes,
+    "sat": sat_refutes,
+    "truth_table": truth_table_refutes,
+    "auto": auto_refutes,
+}
+
+def get_engine(name: str):
+    """Returns the refutation function registered under the given name."""
+    try:
+        return ENGINES[name]
+    except KeyError:
+        raise ValueError(f"Unknown entailment engine: {name!r}, expected one of {sorted(ENGINES)}") from None
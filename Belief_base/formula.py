@@ -1,7 +1,72 @@
+import threading
+import weakref
+
+# Unique table of every live formula node, keyed by its structure. Creating a formula that is structurally equal
+# to an existing one hands back the existing object, so equal formulas are always the same object.
+# Values are weak references, so nodes that nobody uses any more disappear from the table on their own.
+_unique = weakref.WeakValueDictionary()
+_unique_lock = threading.Lock()
+
+# The operands of And and Or without duplicates, in the order of their structural sort keys
+def _canonical(formulas):
+    return tuple(sorted(set(formulas), key=lambda f: f._order))
+
 class Formula:
     """
     This is an abstract base class (a.k.a interface) for all formula types, like a template.
+
+    Formula nodes are hash-consed and immutable: And(p, q) twice gives the same object, so comparing formulas
+    is an identity check and the hash is computed once when the node is built.
     """
+    __slots__ = ("_hash", "_order", "_symbols", "_compiled", "_vectorized", "__weakref__")
+
+    # Returns the node for the given structure key, building it with init (which sets the node's fields) if needed
+    @classmethod
+    def _intern(cls, key, init):
+        with _unique_lock:
+            node = _unique.get(key)
+            if node is None:
+                node = object.__new__(cls)
+                init(node)
+                object.__setattr__(node, "_hash", hash(key))
+                object.__setattr__(node, "_order", node._compute_order())
+                object.__setattr__(node, "_symbols", None)
+                object.__setattr__(node, "_compiled", None)
+                object.__setattr__(node, "_vectorized", None)
+                _unique[key] = node
+            return node
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} formulas are immutable")
+
+    # Equal formulas are the same object, so equality is identity and the hash was computed once up front
+    def __eq__(self, other):
+        return self is other
+
+    def __hash__(self):
+        return self._hash
+
+    # Pickle and copy by rebuilding the node from its constructor arguments, which goes through the unique table again
+    def __reduce__(self):
+        return (type(self), self._args())
+
+    def _args(self):
+        raise NotImplementedError
+
+    # A sort key that only depends on the structure of the formula, used to put the operands of And, Or and Equiv
+    # in one fixed order. The key nests the keys of the children (shared, not copied), so it costs one tuple per node
+    def _compute_order(self):
+        raise NotImplementedError
+
+    # The symbols are computed on first use and then kept on the node
+    def symbols(self):
+        """Returns the set of propositional symbols in the formula."""
+        if self._symbols is None:
+            object.__setattr__(self, "_symbols", frozenset(self._compute_symbols()))
+        return self._symbols
+
+    def _compute_symbols(self):
+        raise NotImplementedError
     
     # The datastructure used is an Abstract Syntax Tree (AST) where each node is a formula, each leaf is a variable.
     """   p ∧ (q ∨ ¬r)
@@ -23,15 +88,49 @@ class Formula:
               r
     """
 
+    # Example: f = Implies(Atom("p"), Atom("q")).compile() gives f.symbols == ("p", "q"), and f(True, False) is False
+    # The generated function has one line per distinct subformula, see _compile below
+    def compile(self, symbols=None):
+        """
+        Returns a function that evaluates the formula with one positional bool per symbol, in the order of symbols
+        (sorted names by default), available as the function's symbols attribute.
+        """
+        return self._cached_compile("_compiled", symbols, _PYTHON_OPS)
+
+    # The function for the default symbol order is kept on the node in the given slot, so it is only generated once.
+    # Passing that same order explicitly finds the kept function, any other order gets a fresh one
+    def _cached_compile(self, slot, symbols, ops):
+        cached = getattr(self, slot)
+        if symbols is not None:
+            symbols = tuple(symbols)
+            return cached if cached is not None and cached.symbols == symbols else _compile(self, symbols, ops)
+        if cached is None:
+            cached = _compile(self, tuple(sorted(self.symbols())), ops)
+            object.__setattr__(self, slot, cached)
+        return cached
+
+    # Example: Or(p, q).evaluate_many([(False, False), (True, False)]) gives [False, True]
+    def evaluate_many(self, assignments, symbols=None):
+        """
+        Evaluates the formula under many assignments. Each row gives one bool per symbol, in the order of symbols
+        (sorted names by default). A 2-D numpy bool array is evaluated column-wise and gives a 1-D bool array,
+        any other iterable of rows gives a list of bools.
+        """
+        if hasattr(assignments, "ndim"):
+            # Only reached with a numpy array, so numpy is installed
+            import numpy as np
+            # The same code with &, |, ~ evaluates whole columns at once
+            function = self._cached_compile("_vectorized", symbols, _NUMPY_OPS)
+            result = function(*(assignments[:, i] for i in range(len(function.symbols))))
+            # A formula that is a single atom returns the column itself, and one without atoms a plain bool
+            return np.broadcast_to(np.asarray(result, dtype=bool), (len(assignments),)).copy()
+        function = self.compile(symbols)
+        return [function(*row) for row in assignments]
+
     # Define how to convert formula into a readable string like (p ∧ q)
     def __str__(self):
         raise NotImplementedError
     
-    # Example: And(Atom("p"), Atom("q")).symbols() becomes {"p", "q"}
-    def symbols(self):
-        """Returns the set of propositional symbols in the formula."""
-        raise NotImplementedError
-    
     # An assignment is a dictionary that looks like {"p": True, "q": False}
     # Example: Implies(Atom("p"), Atom("q")).evaluate({"p": True, "q": False}) becomes False
     def evaluate(self, assignment):
@@ -54,27 +153,27 @@ class Formula:
 # This inherits the interface of Formula and MUST implement all these methods
 class Atom(Formula):
     """A propositional symbol/atom."""
-    def __init__(self, name):
-        self.name = name
+    __slots__ = ("name",)
+
+    def __new__(cls, name):
+        return cls._intern(("atom", name), lambda node: object.__setattr__(node, "name", name))
+
+    def _args(self):
+        return (self.name,)
+
+    def _compute_order(self):
+        return (0, self.name)
         
     # print(Atom("p"))  # Output: p
     def __str__(self):
         return self.name
     
-    # Atom("p") == Atom("p")  # True
+    # Atom("p") == Atom("p")  # True, in fact Atom("p") is Atom("p")
     # Atom("p") == Atom("q")  # False
-    def __eq__(self, other):
-        if isinstance(other, Atom):
-            return self.name == other.name
-        return False
-    
-    # This function is here so that if we have a1 = Atom("p") and a2 = Atom("q"), it will only keep one of them in a set to avoid duplicates!
-    def __hash__(self):
-        return hash(self.name)
     
     # Returns the set of symbols used in the formula — in this case, just the one atom itself.
     # Like Atom("p").symbols()  # {'p'}
-    def symbols(self):
+    def _compute_symbols(self):
         return {self.name}
     
     # This is how we determine whether the formula is True or False given a model (assignment of truth values):
@@ -90,27 +189,27 @@ class Atom(Formula):
 # Represents the negation of a formula, like ¬p or ¬(p ∧ q)
 class Not(Formula):
     """Negation of a formula."""
-    def __init__(self, formula):
-        self.formula = formula
+    __slots__ = ("formula",)
+
+    def __new__(cls, formula):
+        return cls._intern(("not", formula), lambda node: object.__setattr__(node, "formula", formula))
+
+    def _args(self):
+        return (self.formula,)
+
+    def _compute_order(self):
+        return (1, self.formula._order)
     
     # print(Not(Atom("p")))  # Output: ¬(p)
     def __str__(self):
         return f"¬({str(self.formula)})"
     
-    # Formula to check if two Not objects are equal
-    def __eq__(self, other):
-        if isinstance(other, Not):
-            return self.formula == other.formula
-        return False
-    
-    # Without it, order sensitive like Not(And(p, q)) != Not(And(q, p)) # True so we need this to avoid that 
-    def __hash__(self):
-        return hash(("not", hash(self.formula)))
+    # Not(And(p, q)) == Not(And(q, p)) because And(p, q) and And(q, p) are already the same node
     
     # Returns all variables inside the negated formulas
     # Not(And(Atom("p"), Atom("q"))).symbols()
     # becomes {"p", "q"}
-    def symbols(self):
+    def _compute_symbols(self):
         return self.formula.symbols()
     
     # Evaluates the negation of the formula
@@ -147,26 +246,29 @@ class Not(Formula):
 
 class And(Formula):
     
+    __slots__ = ("formulas",)
+
     # Pass arguments And(p,q,r) because *formulas means we can pass any number of arguments
-    def __init__(self, *formulas):
-        self.formulas = formulas
+    # The operands are deduplicated and sorted first, so And(p, q), And(q, p) and And(q, p, q) are the same node
+    # and always print as (p) ∧ (q), no matter which of them was built first
+    def __new__(cls, *formulas):
+        formulas = _canonical(formulas)
+        return cls._intern(("and", formulas), lambda node: object.__setattr__(node, "formulas", formulas))
+
+    def _args(self):
+        return self.formulas
+
+    def _compute_order(self):
+        return (2, tuple(f._order for f in self.formulas))
     
     # print(And(Atom("p"), Atom("q")))  # Output: (p) ∧ (q)
     def __str__(self):
         return " ∧ ".join(f"({str(f)})" for f in self.formulas)
     
     # And(p, q) == And(q, p)  # True
-    def __eq__(self, other):
-        if isinstance(other, And):
-            return set(self.formulas) == set(other.formulas)
-        return False
-    
-    # Hashes so that we can use And(p, q) and And(q, p) in a set and it will only keep one of them
-    def __hash__(self):
-        return hash(("and", frozenset(self.formulas)))
     
     # Returns all symbols inside the And formula example: And(Atom("p"), Atom("q")).symbols() becomes {"p", "q"}
-    def symbols(self):
+    def _compute_symbols(self):
         return set().union(*[f.symbols() for f in self.formulas])
     
     # Returns true if all formulas inside the And formula are true, otherwise false
@@ -194,27 +296,29 @@ class And(Formula):
         return And(*flattened)
 
 class Or(Formula):
+    __slots__ = ("formulas",)
+
     # Pass arguments Or(p,q,r) because *formulas means we can pass any number of arguments
-    def __init__(self, *formulas):
-        self.formulas = formulas
+    # Like And, the operands are deduplicated and sorted, so Or(q, p) is Or(p, q) and prints as (p) ∨ (q)
+    def __new__(cls, *formulas):
+        formulas = _canonical(formulas)
+        return cls._intern(("or", formulas), lambda node: object.__setattr__(node, "formulas", formulas))
+
+    def _args(self):
+        return self.formulas
+
+    def _compute_order(self):
+        return (3, tuple(f._order for f in self.formulas))
     
     # print(Or(Atom("p"), Atom("q")))  # Output: (p) ∨ (q)
     def __str__(self):
         return " ∨ ".join(f"({str(f)})" for f in self.formulas)
     
     # Or(Atom("p"), Atom("q")) == Or(Atom("q"), Atom("p"))  # True regardless of order
-    def __eq__(self, other):
-        if isinstance(other, Or):
-            return set(self.formulas) == set(other.formulas)
-        return False
-    
-    # We need this because we don't care about the order of the formulas inside the Or formula
     # set([Or(p, q), Or(q, p)])  # Only one element stored
-    def __hash__(self):
-        return hash(("or", frozenset(self.formulas)))
     
     # Or(Atom("p"), Not(Atom("q"))).symbols() # returns {"p", "q"}
-    def symbols(self):
+    def _compute_symbols(self):
         return set().union(*[f.symbols() for f in self.formulas])
     
     # {"p": True, "q": False} returns True because p is True
@@ -267,27 +371,29 @@ class Implies(Formula):
     """Implication formula (P → Q)."""
     # Extract the premise and conclusion from the implication
     # Example: Implies(Atom("p"), Atom("q")) gives p → q
-    def __init__(self, premise, conclusion):
-        self.premise = premise
-        self.conclusion = conclusion
+    __slots__ = ("premise", "conclusion")
+
+    def __new__(cls, premise, conclusion):
+        def init(node):
+            object.__setattr__(node, "premise", premise)
+            object.__setattr__(node, "conclusion", conclusion)
+        return cls._intern(("implies", premise, conclusion), init)
+
+    def _args(self):
+        return (self.premise, self.conclusion)
+
+    def _compute_order(self):
+        return (4, self.premise._order, self.conclusion._order)
     
     # print(Implies(Atom("p"), Atom("q")))  # Output: (p) → (q)
     def __str__(self):
         return f"({str(self.premise)}) → ({str(self.conclusion)})"
     
     # Implies(p, q) == Implies(p, q)  → True
-    def __eq__(self, other):
-        if isinstance(other, Implies):
-            return self.premise == other.premise and self.conclusion == other.conclusion
-        return False
-    
-    # Makes the implication usable in sets and dictionaries
-    def __hash__(self):
-        return hash(("implies", hash(self.premise), hash(self.conclusion)))
     
     # Returns the set of symbols in the implication
     # Example: Implies(Atom("p"), Atom("q")).symbols() gives {"p", "q"}
-    def symbols(self):
+    def _compute_symbols(self):
         return self.premise.symbols().union(self.conclusion.symbols())
     
     # Returns false if the premise is true and the conclusion is false, otherwise true
@@ -302,28 +408,32 @@ class Implies(Formula):
 
 class Equiv(Formula):
     """Equivalence formula (P ↔ Q)."""
+    __slots__ = ("left", "right")
+
     # Equiv(p, q) becomes (p ↔ q)
-    def __init__(self, left, right):
-        self.left = left
-        self.right = right
+    # Equiv(p, q) and Equiv(q, p) share a node because the two sides are put in the fixed order first
+    def __new__(cls, left, right):
+        if right._order < left._order:
+            left, right = right, left
+        def init(node):
+            object.__setattr__(node, "left", left)
+            object.__setattr__(node, "right", right)
+        return cls._intern(("equiv", left, right), init)
+
+    def _args(self):
+        return (self.left, self.right)
+
+    def _compute_order(self):
+        return (5, self.left._order, self.right._order)
     
     # print(Equiv(Atom("p"), Atom("q")))  # Output: (p) ↔ (q)
     def __str__(self):
         return f"({str(self.left)}) ↔ ({str(self.right)})"
     
     # Equiv(p, q) == Equiv(q, p)  # True because p ↔ q is logically symmetric
-    def __eq__(self, other):
-        if isinstance(other, Equiv):
-            return (self.left == other.left and self.right == other.right) or \
-                  (self.left == other.right and self.right == other.left)
-        return False
-    
-    # Again hashing to ignore order of the formulas inside the Equiv formula
-    def __hash__(self):
-        return hash(("equiv", frozenset([hash(self.left), hash(self.right)])))
     
     # Equiv(Atom("p"), Not(Atom("q"))).symbols() leads to {'p', 'q'}
-    def symbols(self):
+    def _compute_symbols(self):
         return self.left.symbols().union(self.right.symbols())
     
     # Evaluates the equivalence: True if both sides are equal, False otherwise
@@ -336,3 +446,76 @@ class Equiv(Formula):
             Or(Not(self.left), self.right),
             Or(Not(self.right), self.left)
         ).to_cnf()
+
+
+"""
+Compiling formulas to Python functions for bulk evaluation.
+
+evaluate walks the tree with a method call per node and a dict lookup per atom. compile generates the source of
+a function instead, with the symbols as positional arguments and one local variable per distinct subformula
+(formulas are hash-consed, so a subformula that occurs several times is computed once):
+
+    (p → q) ∧ ¬p  with symbols ("p", "q")  becomes
+
+    def _formula(a0, a1):
+        t0 = not a0
+        t1 = (not a0) or a1
+        t2 = t1 and t0
+        return t2
+
+The same generator with the operators &, | and ~ gives a function that works on whole numpy columns at once.
+The subformulas are listed with an explicit stack, so deeply nested formulas don't hit the recursion limit.
+"""
+
+# How each connective is written, for plain bools and for numpy bool arrays
+_PYTHON_OPS = {"not": "not {}", "and": " and ", "or": " or ", "implies": "(not {}) or {}", "equiv": "{} == {}",
+               "true": "True"}
+_NUMPY_OPS = {"not": "~{}", "and": " & ", "or": " | ", "implies": "~{} | {}", "equiv": "{} == {}",
+              "true": "True"}
+
+def _compile(formula, symbols, ops):
+    args = {name: f"a{i}" for i, name in enumerate(symbols)}
+    names = {}
+    lines = []
+
+    # Name of the value of a node that was already listed
+    def ref(node):
+        return args[node.name] if isinstance(node, Atom) else names[node]
+
+    stack = [(formula, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if isinstance(node, Atom):
+            if node.name not in args:
+                raise ValueError(f"Symbol {node.name!r} is missing from the argument list {list(symbols)}")
+            continue
+        if node in names:
+            continue
+        children = node._args()
+        if not expanded:
+            # List the children first, then come back to this node
+            stack.append((node, True))
+            stack.extend((child, False) for child in children)
+            continue
+        if isinstance(node, Not):
+            expr = ops["not"].format(ref(node.formula))
+        elif isinstance(node, And):
+            expr = ops["and"].join(ref(f) for f in children) if children else ops["true"]
+        elif isinstance(node, Or):
+            expr = ops["or"].join(ref(f) for f in children) if children else f"not {ops['true']}"
+        elif isinstance(node, Implies):
+            expr = ops["implies"].format(ref(node.premise), ref(node.conclusion))
+        elif isinstance(node, Equiv):
+            expr = ops["equiv"].format(ref(node.left), ref(node.right))
+        else:
+            raise ValueError(f"Unknown formula type: {type(node).__name__}")
+        names[node] = f"t{len(names)}"
+        lines.append(f"    {names[node]} = {expr}")
+
+    source = f"def _formula({', '.join(args.values())}):\n" + "\n".join(lines) + f"\n    return {ref(formula)}\n"
+    namespace = {}
+    exec(source, namespace)
+    function = namespace["_formula"]
+    function.symbols = symbols
+    function.source = source
+    return function
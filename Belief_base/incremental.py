@@ -0,0 +1,80 @@
+from typing import Dict, Iterable, List, Sequence
+from Belief_base.sat_solver import CDCLSolver
+from Belief_base.entailment import Clause
+from Belief_base import instrumentation
+
+"""
+Incremental entailment checks for subsets of a belief base.
+
+Every belief i gets its own selector atom s_i, and each clause C of belief i is added to one persistent solver
+as (¬s_i ∨ C). Assuming s_i is true switches belief i on, leaving s_i unassigned switches it off because the
+solver can simply make s_i false. The clauses of ¬phi are added without a selector, so
+
+    subset ∪ {¬phi} is unsatisfiable  <=>  solve(assumptions = [s_i for i in subset]) is False  <=>  subset ⊨ phi
+
+The solver keeps its learnt clauses between calls, so every subset we test benefits from the work done on the
+previous ones instead of starting from scratch.
+"""
+
+class IncrementalEntailment:
+    """
+    Tests subsets of beliefs (given as belief indexes) against one incremental CDCL solver.
+
+    Example:
+        checker = IncrementalEntailment(base.get_belief_clauses(), negated_query_clauses(phi))
+        checker.entails({0, 2})  # True if beliefs 0 and 2 together entail phi
+    """
+    def __init__(self, belief_clauses: Sequence[List[Clause]], query_clauses: Iterable[Clause] = ()):
+        self.solver = CDCLSolver()
+        # The solver gets its own numbering, so the selectors never clash with atoms of the symbol table
+        self.ids: Dict[int, int] = {}
+        self.num_vars = 0
+        self.selectors: List[int] = []
+        # Reverse lookup from selector to belief index, used to turn a core into belief indexes
+        self.owner: Dict[int, int] = {}
+        self.checks = 0
+        for clauses in belief_clauses:
+            self.add_belief(clauses)
+        for clause in query_clauses:
+            self.solver.add_clause(self._local(clause))
+
+    def add_belief(self, clauses: List[Clause]) -> int:
+        """Adds one more belief behind its own selector and returns its index."""
+        i = len(self.selectors)
+        selector = self._fresh()
+        self.selectors.append(selector)
+        self.owner[selector] = i
+        for clause in clauses:
+            self.solver.add_clause([-selector] + self._local(clause))
+        return i
+
+    def _fresh(self) -> int:
+        self.num_vars += 1
+        return self.num_vars
+
+    # Map a clause over symbol table atoms to the solver's own numbering
+    def _local(self, clause: Clause) -> List[int]:
+        lits = []
+        for lit in clause:
+            var = self.ids.get(abs(lit))
+            if var is None:
+                var = self.ids[abs(lit)] = self._fresh()
+            lits.append(var if lit > 0 else -var)
+        return lits
+
+    def entails(self, indexes: Iterable[int], budget=None) -> bool:
+        """
+        Returns True if the beliefs with the given indexes entail phi.
+        With a budget (see budget.py), raises BudgetExceeded when it runs out, and the checker can still be used.
+        """
+        self.checks += 1
+        if instrumentation.ENABLED:
+            instrumentation.count(solver_checks=1)
+        return not self.solver.solve([self.selectors[i] for i in indexes], budget)
+
+    def core(self) -> set:
+        """
+        After entails(...) returned True, the belief indexes that were actually needed.
+        The core is a subset of the tested indexes that still entails phi, but it is not always minimal.
+        """
+        return {self.owner[lit] for lit in self.solver.core}
@@ -0,0 +1,212 @@
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, List, Optional
+
+"""
+Opt-in counters and timers for the hot paths of entailment, contraction and revision.
+
+Instrumentation is off by default. Every instrumented function then only checks the module flag ENABLED before doing
+its normal work, and the inner loops keep plain local counters that are only reported when the flag is on, so the
+overhead is one attribute lookup per call.
+
+Turn it on for a block and get everything recorded inside it:
+
+    with instrumentation.collecting() as stats:
+        agent.revise(phi)
+    stats.seconds                         # wall time of the block
+    stats.counters["resolvents"]          # summed over every call made inside the block
+    stats.phases["compute_remainders"]    # wall time spent in compute_remainders
+
+or turn it on for the whole process with enable() and read instrumentation.last(), the Stats of the last top-level
+operation of this thread, and instrumentation.aggregates(), the totals per operation since the last reset().
+Callbacks registered with add_hook(callback) get the Stats of every operation as soon as it finishes, to export them.
+
+Operations nest: revise calls contract_partial_meet, which calls compute_remainders, which calls resolution_refutes
+for every subset. When an operation finishes, its counters and phases are added to the operation that called it, and
+its wall time becomes a phase of the caller under its own name. Phases of nested operations overlap, revise's phases
+can say 2 s in contract_partial_meet and 1.9 s of that in compute_remainders.
+
+Counters:
+    clauses_in        clauses given to a refutation (resolution_refutes, sat_refutes)
+    resolvents        new clauses derived by resolution
+    subsumed          clauses dropped by forward or backward subsumption
+    given_clauses     clauses picked as given clause by resolution
+    conflicts, decisions, propagations   CDCL solver work (sat_refutes)
+    solver_checks     subset checks on an incremental solver (remainders, kernels, revise_many)
+    subsets_tested    subsets whose entailment compute_remainders had to know
+    subsets_pruned    subsets compute_remainders skipped because a larger remainder contains them
+    remainders        remainders found by compute_remainders
+    cache_hits, cache_misses   entailment cache lookups
+    clauses_out       clauses produced by extract_clauses
+    relevant_clauses  belief clauses that the relevance filter of BeliefBase.entails handed to the engine
+"""
+
+# Checked by every instrumented function, flip it with enable() / disable() or collecting()
+ENABLED = False
+
+class Stats:
+    """
+    Counters and wall times of one operation (or of a collecting() block).
+    seconds is the wall time of the whole call, phases the wall time per phase or nested operation.
+    """
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.seconds = 0.0
+        # Number of calls, 1 for a single call and the number of merged calls in aggregates()
+        self.calls = 1
+        self.counters: Dict[str, int] = {}
+        self.phases: Dict[str, float] = {}
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_phase(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def merge(self, other: "Stats"):
+        """Adds the counters and phases of a nested operation, with its wall time as the phase of its name."""
+        for name, amount in other.counters.items():
+            self.count(name, amount)
+        for name, seconds in other.phases.items():
+            self.add_phase(name, seconds)
+        self.add_phase(other.operation, other.seconds)
+
+    def as_dict(self):
+        return {
+            "operation": self.operation,
+            "calls": self.calls,
+            "seconds": self.seconds,
+            "counters": dict(self.counters),
+            "phases": dict(self.phases),
+        }
+
+    def __repr__(self):
+        return f"Stats({self.as_dict()!r})"
+
+
+_local = threading.local()
+_lock = threading.Lock()
+_aggregates: Dict[str, Stats] = {}
+_hooks: List[Callable[[Stats], None]] = []
+
+# The Stats of the operations running in this thread, innermost last
+def _stack() -> List[Stats]:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+def enable():
+    global ENABLED
+    ENABLED = True
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+@contextmanager
+def collecting():
+    """Turns instrumentation on for the block and yields a Stats that receives every operation run inside it."""
+    global ENABLED
+    previous = ENABLED
+    ENABLED = True
+    root = Stats("collecting")
+    stack = _stack()
+    stack.append(root)
+    start = time.perf_counter()
+    try:
+        yield root
+    finally:
+        root.seconds = time.perf_counter() - start
+        stack.remove(root)
+        ENABLED = previous
+
+@contextmanager
+def operation(name: str):
+    """Records one call of the named operation. Only use it when ENABLED is True, instrumented() checks that for you."""
+    stats = Stats(name)
+    stack = _stack()
+    parent = stack[-1] if stack else None
+    stack.append(stats)
+    start = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        stats.seconds = time.perf_counter() - start
+        stack.pop()
+        if parent is not None:
+            parent.merge(stats)
+        if parent is None or parent.operation == "collecting":
+            _local.last = stats
+        with _lock:
+            total = _aggregates.get(name)
+            if total is None:
+                total = _aggregates[name] = Stats(name)
+                total.calls = 0
+            total.calls += 1
+            total.seconds += stats.seconds
+            for counter, amount in stats.counters.items():
+                total.count(counter, amount)
+            for phase_name, seconds in stats.phases.items():
+                total.add_phase(phase_name, seconds)
+        for hook in list(_hooks):
+            hook(stats)
+
+def instrumented(name: str):
+    """Decorator that records every call of the function as the named operation while instrumentation is on."""
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return function(*args, **kwargs)
+            with operation(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+@contextmanager
+def phase(name: str):
+    """Adds the wall time of the block to the named phase of the current operation."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stack = _stack()
+        if stack:
+            stack[-1].add_phase(name, time.perf_counter() - start)
+
+def count(**counters: int):
+    """Adds to counters of the current operation, for example count(resolvents=12, subsumed=3)."""
+    stack = _stack()
+    if stack:
+        current = stack[-1]
+        for name, amount in counters.items():
+            current.count(name, amount)
+
+def current() -> Optional[Stats]:
+    """The Stats of the innermost operation running in this thread, None outside of any."""
+    stack = _stack()
+    return stack[-1] if stack else None
+
+def last() -> Optional[Stats]:
+    """The Stats of the last top-level operation that finished in this thread."""
+    return getattr(_local, "last", None)
+
+def aggregates() -> Dict[str, dict]:
+    """Totals per operation over every call since the last reset(), as dicts (see Stats.as_dict)."""
+    with _lock:
+        return {name: stats.as_dict() for name, stats in _aggregates.items()}
+
+def reset():
+    """Forgets the aggregates."""
+    with _lock:
+        _aggregates.clear()
+
+def add_hook(callback: Callable[[Stats], None]):
+    """Calls callback(stats) whenever an operation finishes, in the thread that ran it."""
+    _hooks.append(callback)
+
+def remove_hook(callback: Callable[[Stats], None]):
+    _hooks.remove(callback)
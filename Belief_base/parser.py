@@ -1,4 +1,6 @@
 import re
+import time
+from typing import Iterator, List, NamedTuple, Optional, Tuple
 from Belief_base.formula import Implies, Or, Not, Atom, Formula, And, Equiv
 
 TOKENS = {
@@ -18,96 +20,164 @@ def _tokenize(expr: str):
     tokens = re.findall(pattern, expr)
     return tokens
 
+# Binding strength of each connective, higher binds tighter: ¬p ∧ q ∨ r → s ↔ t reads as ((((¬p) ∧ q) ∨ r) → s) ↔ t
+PRECEDENCE = {
+    TOKENS["NOT"]: 5,
+    TOKENS["AND"]: 4,
+    TOKENS["OR"]: 3,
+    TOKENS["IMP"]: 2,
+    TOKENS["EQU"]: 1,
+}
+
+# ∧ and ∨ chains are collected into one n-ary node, p ∧ q ∧ r becomes And(p, q, r) instead of And(And(p, q), r)
+_NARY = {TOKENS["AND"]: And, TOKENS["OR"]: Or}
+
+class _Chain:
+    """An ∧ or ∨ chain that is still being parsed, turned into a single node once it is complete."""
+    __slots__ = ("cls", "items")
+
+    def __init__(self, cls, items):
+        self.cls = cls
+        self.items = items
+
+def _finish(node):
+    return node.cls(*node.items) if isinstance(node, _Chain) else node
+
+def _reduce(op, operands):
+    """Pop the operands of op off the operand stack and push the node it builds."""
+    if op == TOKENS["NOT"]:
+        operands.append(Not(_finish(operands.pop())))
+        return
+    right = _finish(operands.pop())
+    left = operands.pop()
+    cls = _NARY.get(op)
+    if cls is None:
+        left = _finish(left)
+        operands.append(Implies(left, right) if op == TOKENS["IMP"] else Equiv(left, right))
+        return
+    # Nested nodes of the same connective are merged in, so (p ∧ q) ∧ r is And(p, q, r) as well
+    items = list(right.formulas) if isinstance(right, cls) else [right]
+    if isinstance(left, _Chain) and left.cls is cls:
+        left.items.extend(items)
+        operands.append(left)
+    else:
+        left = _finish(left)
+        operands.append(_Chain(cls, (list(left.formulas) if isinstance(left, cls) else [left]) + items))
+
 def parse_formula(s: str) -> Formula:
-    """Recursive-descent parser handling parentheses depth and edge cases."""
+    """
+    Iterative operator-precedence (shunting-yard) parser, so deeply nested formulas don't hit the recursion limit.
+    Binary connectives group to the left like before: p → q → r is (p → q) → r.
+    """
     tokens = _tokenize(s)
-    # We'll parse equivalences → implications → OR → AND → NOT → atoms
-
-    def parse_equiv(index=0):
-        node, index = parse_imp(index)
-        while index < len(tokens) and tokens[index] == TOKENS["EQU"]:
-            index += 1
-            right_node, index = parse_imp(index)
-            node = Equiv(node, right_node)
-        return node, index
-
-    def parse_imp(index=0):
-        node, index = parse_or(index)
-        while index < len(tokens) and tokens[index] == TOKENS["IMP"]:
-            index += 1
-            right_node, index = parse_or(index)
-            node = Implies(node, right_node)
-        return node, index
-
-    def parse_or(index=0):
-        node, index = parse_and(index)
-        while index < len(tokens) and tokens[index] == TOKENS["OR"]:
-            index += 1
-            right_node, index = parse_and(index)
-            node = Or(node, right_node)
-        return node, index
-
-    def parse_and(index=0):
-        node, index = parse_not(index)
-        while index < len(tokens) and tokens[index] == TOKENS["AND"]:
-            index += 1
-            right_node, index = parse_not(index)
-            node = And(node, right_node)
-        return node, index
-
-    def parse_not(index=0):
-        while index < len(tokens) and tokens[index] == TOKENS["NOT"]:
-            index += 1
-            sub_node, index = parse_not(index)
-            return Not(sub_node), index
-        return parse_atom(index)
-
-    def parse_atom(index=0):
-        if index >= len(tokens):
-            raise ValueError("Unexpected end of tokens.")
-        t = tokens[index]
-        if t == TOKENS["LPAREN"]:
-            node, new_idx = parse_equiv(index+1)
-            if new_idx >= len(tokens) or tokens[new_idx] != TOKENS["RPAREN"]:
-                raise ValueError("Missing closing parenthesis.")
-            return node, new_idx+1
-        elif re.fullmatch(r"[a-zA-Z0-9]+", t):
-            return Atom(t), index+1
+    # Operands are formulas (or unfinished chains), operators are connectives and "(" markers
+    operands = []
+    operators = []
+    # True when the next token has to start an operand (an atom, ¬ or "("), False when a connective or ")" is expected
+    expect_operand = True
+
+    for i, t in enumerate(tokens):
+        if expect_operand:
+            if t == TOKENS["NOT"] or t == TOKENS["LPAREN"]:
+                operators.append(t)
+            elif re.fullmatch(r"[a-zA-Z0-9]+", t):
+                operands.append(Atom(t))
+                expect_operand = False
+            else:
+                raise ValueError(f"Unexpected token: {t}")
+        elif t == TOKENS["RPAREN"]:
+            while operators and operators[-1] != TOKENS["LPAREN"]:
+                _reduce(operators.pop(), operands)
+            if not operators:
+                # A ")" without its "(" ends the formula early, just like a stray token after it would
+                raise ValueError(f"Extra tokens after parsing: {tokens[i:]}")
+            operators.pop()
+        elif t in PRECEDENCE and t != TOKENS["NOT"]:
+            # Everything on the stack that binds at least as tight is complete now (this makes chains left-grouped)
+            while operators and operators[-1] != TOKENS["LPAREN"] and PRECEDENCE[operators[-1]] >= PRECEDENCE[t]:
+                _reduce(operators.pop(), operands)
+            operators.append(t)
+            expect_operand = True
+        elif TOKENS["LPAREN"] in operators:
+            # Inside parentheses the formula should have been closed here
+            raise ValueError("Missing closing parenthesis.")
         else:
-            raise ValueError(f"Unexpected token: {t}")
+            raise ValueError(f"Extra tokens after parsing: {tokens[i:]}")
 
-    root, next_pos = parse_equiv()
-    if next_pos != len(tokens):
-        raise ValueError(f"Extra tokens after parsing: {tokens[next_pos:]}")
-    
-    # remove or comment out the debug print below
-    # print(f"Parsed formula: {root}")
-    
-    return root
+    if expect_operand:
+        raise ValueError("Unexpected end of tokens.")
+    while operators:
+        op = operators.pop()
+        if op == TOKENS["LPAREN"]:
+            raise ValueError("Missing closing parenthesis.")
+        _reduce(op, operands)
 
+    return _finish(operands.pop())
 
-def parse_file(file_path: str) -> list[tuple[Formula, int]]:
+
+class ParseError(NamedTuple):
+    """A line of a belief file that could not be parsed."""
+    line_number: int
+    line: str
+    message: str
+
+
+class LoadReport(NamedTuple):
+    """Summary of load_into: how many beliefs were added, which lines failed and how fast it went."""
+    loaded: int
+    errors: List[ParseError]
+    seconds: float
+    lines_per_second: float
+
+
+def parse_line(line: str) -> Tuple[Formula, int]:
+    """Parses one line formatted as: formula ; priority (the priority defaults to 0 if missing)."""
+    if ";" in line:
+        formula_str, priority_str = line.split(";")
+        return parse_formula(formula_str.strip()), int(priority_str.strip())
+    # default priority 0 if missing
+    return parse_formula(line), 0
+
+
+def iter_file(file_path: str, errors: Optional[List[ParseError]] = None) -> Iterator[Tuple[Formula, int]]:
     """
-    Parses a file with each line formatted as: formula ; priority
-    Returns a list of (Formula, priority) tuples.
+    Streams (Formula, priority) tuples from a file with each line formatted as: formula ; priority
+    Lines that fail to parse are skipped and, if an errors list is given, recorded there as ParseError.
     """
-    results = []
     with open(file_path, 'r', encoding='utf-8') as f:
-        for line in f:
+        for line_number, line in enumerate(f, start=1):
             line = line.strip()
             if not line:
                 continue
             try:
-                if ";" in line:
-                    formula_str, priority_str = line.split(";")
-                    formula = parse_formula(formula_str.strip())
-                    priority = int(priority_str.strip())
-                    results.append((formula, priority))
-                else:
-                    # default priority 0 if missing
-                    formula = parse_formula(line)
-                    results.append((formula, 0))
+                entry = parse_line(line)
             except Exception as e:
-                print(f"Error parsing '{line}': {e}")
+                if errors is not None:
+                    errors.append(ParseError(line_number, line, str(e)))
                 continue
+            yield entry
+
+
+def load_into(base, file_path: str) -> LoadReport:
+    """Streams a belief file straight into a BeliefBase, without building the whole list first."""
+    errors: List[ParseError] = []
+    loaded = 0
+    start = time.perf_counter()
+    for formula, priority in iter_file(file_path, errors):
+        base.add(formula, priority)
+        loaded += 1
+    seconds = time.perf_counter() - start
+    lines = loaded + len(errors)
+    return LoadReport(loaded, errors, seconds, lines / seconds if seconds > 0 else float("inf"))
+
+
+def parse_file(file_path: str) -> list[tuple[Formula, int]]:
+    """
+    Parses a file with each line formatted as: formula ; priority
+    Returns a list of (Formula, priority) tuples.
+    """
+    errors: List[ParseError] = []
+    results = list(iter_file(file_path, errors))
+    for error in errors:
+        print(f"Error parsing '{error.line}': {error.message}")
     return results
@@ -0,0 +1,285 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations, islice
+from typing import FrozenSet, Iterator, List, Sequence, Set, Tuple
+from Belief_base.entailment import Clause
+from Belief_base.incremental import IncrementalEntailment
+
+"""
+Remainders through minimal correction sets instead of trying every subset with combinations().
+
+Write B for the belief base and phi for the formula we contract by.
+    - A kernel is a minimal subset of B that entails phi (a minimal unsatisfiable subset of B ∪ {¬phi}).
+    - A correction set is a set H of beliefs such that B \\ H no longer entails phi.
+    - A remainder is B \\ H for a minimal correction set H.
+
+Every correction set has to contain at least one belief of every kernel (otherwise that kernel is still there and
+still entails phi), and the minimal correction sets are exactly the minimal hitting sets of the kernels. So the
+remainders of largest size, which are the ones compute_remainders returns, are B minus the smallest hitting sets
+of the kernels.
+
+We don't know the kernels up front, so they are discovered on the way (the implicit hitting set approach):
+    1. Start with no known kernels and m = 0.
+    2. Enumerate the hitting sets of size m of the kernels found so far.
+    3. For each hitting set H, test whether B \\ H entails phi.
+         - If not, H is a correction set, and since no hitting set is smaller, B \\ H is a largest remainder.
+         - If it does, shrink B \\ H to a new kernel, which H does not hit, and go back to 2 with the same m.
+    4. If there are no hitting sets of size m at all, go to m + 1.
+Every entailment check either confirms a remainder or finds a new kernel, so the work grows with the number of
+kernels and remainders instead of with 2^n.
+"""
+
+def hitting_sets(kernels: Sequence[FrozenSet[int]], size: int) -> Iterator[FrozenSet[int]]:
+    """
+    Yields every set of at most size beliefs that contains at least one belief of each kernel, each set once.
+    Only beliefs that occur in some kernel are used.
+    """
+    def extend(chosen, forbidden):
+        # Find a kernel that is not hit yet
+        unhit = next((kernel for kernel in kernels if not kernel & chosen), None)
+        if unhit is None:
+            yield frozenset(chosen)
+            return
+        if len(chosen) == size:
+            return
+        # Branch on which belief hits this kernel. Beliefs tried in earlier branches are forbidden in later ones,
+        # so every hitting set is produced by exactly one branch (the one of its smallest belief in this kernel)
+        candidates = sorted(unhit - forbidden)
+        for i, belief in enumerate(candidates):
+            yield from extend(chosen | {belief}, forbidden | set(candidates[:i]))
+    yield from extend(frozenset(), frozenset())
+
+
+def shrink_to_kernel(checker: IncrementalEntailment, subset: Set[int]) -> FrozenSet[int]:
+    """
+    Given a subset that entails phi (checker.entails(subset) was just True), returns a kernel inside it.
+    Starts from the solver's core and then drops every belief that is not needed.
+    """
+    kernel = set(checker.core())
+    for belief in sorted(kernel):
+        if belief not in kernel:
+            continue
+        trial = kernel - {belief}
+        if checker.entails(trial):
+            # Still entails phi without it, and the new core may let us drop even more
+            kernel = trial & checker.core()
+    return frozenset(kernel)
+
+
+def mcs_remainders(belief_clauses: Sequence[List[Clause]], query_clauses: List[Clause]) -> List[Set[int]]:
+    """
+    The largest subsets of the beliefs (as index sets) that don't entail phi, given the clauses of each belief and
+    the clauses of ¬phi. Returns the same remainders, in the same order, as the combinations() search in
+    BeliefBase.compute_remainders.
+    """
+    n = len(belief_clauses)
+    if n == 0:
+        return []
+    checker = IncrementalEntailment(belief_clauses, query_clauses)
+    everything = frozenset(range(n))
+    kernels: List[FrozenSet[int]] = []
+    # Hitting sets we already know to be correction sets, so we don't test them again after finding a new kernel
+    corrections: Set[FrozenSet[int]] = set()
+    size = 0
+    while size <= n:
+        candidates = list(hitting_sets(kernels, size))
+        if not candidates:
+            # No hitting set this small exists, and since kernels are only ever added none will appear later
+            size += 1
+            continue
+        new_kernel = None
+        for hitting in candidates:
+            if hitting in corrections:
+                continue
+            rest = everything - hitting
+            if checker.entails(rest):
+                new_kernel = shrink_to_kernel(checker, rest)
+                break
+            corrections.add(hitting)
+        if new_kernel is None:
+            # Every smallest hitting set is a correction set
+            break
+        if not new_kernel:
+            # Even the empty set entails phi (phi is a tautology), so nothing can be removed to stop entailing it
+            return []
+        kernels.append(new_kernel)
+
+    remainders = [set(everything - hitting) for hitting in corrections]
+    # The combinations() search never tests the empty subset, so removing every belief gives no remainder there
+    remainders = [remainder for remainder in remainders if remainder]
+    # combinations() visits the subsets of one size in lexicographic order, so sort the same way
+    remainders.sort(key=lambda remainder: sorted(remainder))
+    return remainders
+
+
+"""
+Branch and bound for the best remainders, without enumerating the remainders first.
+
+Partial meet contraction keeps the largest remainders and, among those, the ones with the highest priority sum
+(select_remainders). That is the same as maximizing (size, priority sum) in lexicographic order over all subsets
+that don't entail phi: a non-entailing subset of the largest size is automatically a remainder.
+
+The search walks the beliefs in order and decides for each one whether it is kept or dropped, trying "kept" first.
+    - Keeping a belief is only allowed if the kept beliefs still don't entail phi (one incremental solver check).
+      When they do, the solver core is an entailing set that at least one belief has to be dropped from.
+    - A branch is cut as soon as its best possible (size, sum) is below the best found so far. Every entailing set
+      found so far that can still be completed needs one more dropped belief, so the bound keeps all undecided
+      beliefs except one from each of a group of such sets that share no undecided belief.
+Ties are kept, so the result is exactly what select_remainders picks from the full list of remainders.
+"""
+
+def best_remainders(belief_clauses: Sequence[List[Clause]], query_clauses: List[Clause],
+                    priorities: Sequence[int]) -> List[Set[int]]:
+    """
+    The remainders with the highest priority sum among the largest remainders, as index sets, in the order that
+    select_remainders(compute_remainders(...), priorities) returns them.
+    """
+    n = len(belief_clauses)
+    if n == 0:
+        return []
+    checker = IncrementalEntailment(belief_clauses, query_clauses)
+    if checker.entails([]):
+        # phi is a tautology, so nothing can be removed to stop entailing it
+        return []
+    # suffix[i] is the priority sum of beliefs i..n-1
+    suffix = [0] * (n + 1)
+    for i in range(n - 1, -1, -1):
+        suffix[i] = suffix[i + 1] + priorities[i]
+    # Entailing sets found on the way (solver cores, not always minimal)
+    kernels: List[FrozenSet[int]] = []
+    best_key = (-1, 0)
+    best: List[Set[int]] = []
+
+    # Upper bound on (size, sum) of any completion of kept when beliefs from i on are still undecided
+    def bound(kept, kept_sum, i):
+        size = len(kept) + n - i
+        total = kept_sum + suffix[i]
+        used = set()
+        for kernel in kernels:
+            undecided = {b for b in kernel if b >= i}
+            # Beliefs dropped earlier already break this kernel, and overlapping kernels could share the dropped belief
+            if any(b < i and b not in kept for b in kernel) or undecided & used:
+                continue
+            used |= undecided
+            size -= 1
+            total -= min(priorities[b] for b in undecided)
+        return size, total
+
+    def search(kept, kept_sum, i):
+        nonlocal best_key, best
+        if i == n:
+            key = (len(kept), kept_sum)
+            if key > best_key:
+                best_key, best = key, [set(kept)]
+            elif key == best_key:
+                best.append(set(kept))
+            return
+        if bound(kept, kept_sum, i) < best_key:
+            return
+        trial = kept + [i]
+        if checker.entails(trial):
+            kernel = frozenset(checker.core())
+            if kernel not in kernels:
+                kernels.append(kernel)
+        else:
+            search(trial, kept_sum + priorities[i], i + 1)
+        search(kept, kept_sum, i + 1)
+
+    search([], 0, 0)
+    # Like compute_remainders, keeping no belief at all is not a remainder
+    best = [remainder for remainder in best if remainder]
+    best.sort(key=lambda remainder: sorted(remainder))
+    return best
+
+
+"""
+Enumerating every phi-kernel, for kernel contraction.
+
+This is the hitting set loop of mcs_remainders without the size limit. Every minimal correction set is a minimal
+hitting set of the kernels and the other way round, so once every minimal hitting set of the kernels found so far is
+a correction set (B minus it does not entail phi), no kernel is missing: a missing kernel K would leave a minimal
+hitting set inside B \\ K, and B minus that set contains K and still entails phi.
+    1. Enumerate the minimal hitting sets H of the kernels found so far.
+    2. If B \\ H entails phi, shrink it to a new kernel (H does not hit it) and start over.
+    3. Otherwise remember H as a correction set, so it is not tested again after the next restart.
+"""
+
+def enumerate_kernels(belief_clauses: Sequence[List[Clause]], query_clauses: List[Clause]) -> List[FrozenSet[int]]:
+    """
+    All minimal subsets of the beliefs (as index sets) that entail phi, given the clauses of each belief and the
+    clauses of ¬phi, smallest first. A tautology gives the single kernel frozenset(), and a phi that no subset
+    entails gives [].
+    """
+    n = len(belief_clauses)
+    checker = IncrementalEntailment(belief_clauses, query_clauses)
+    if checker.entails([]):
+        return [frozenset()]
+    everything = frozenset(range(n))
+    kernels: List[FrozenSet[int]] = []
+    corrections: Set[FrozenSet[int]] = set()
+
+    # A hitting set is minimal when every belief in it is the only one hitting some kernel
+    def minimal(hitting):
+        return all(any(kernel & hitting == {belief} for kernel in kernels) for belief in hitting)
+
+    while True:
+        new_kernel = None
+        for hitting in hitting_sets(kernels, n):
+            if hitting in corrections or not minimal(hitting):
+                continue
+            rest = everything - hitting
+            if checker.entails(rest):
+                new_kernel = shrink_to_kernel(checker, rest)
+                break
+            corrections.add(hitting)
+        if new_kernel is None:
+            break
+        kernels.append(new_kernel)
+    kernels.sort(key=lambda kernel: (len(kernel), sorted(kernel)))
+    return kernels
+
+
+"""
+The combinations() search of compute_remainders spread over worker processes.
+
+The subsets of one size k are independent checks, so they are cut into chunks and handed to a ProcessPoolExecutor.
+Each worker gets the clauses once, as plain lists of int tuples, when it starts (the pool initializer) and builds its
+own IncrementalEntailment from them, so a chunk is only a list of index tuples going out and a list of bools coming
+back. Chunks are sent a window at a time so the subsets of a large k never all sit in memory together, and the
+answers are collected in submission order, so the remainders come out in exactly the order of the sequential search.
+"""
+
+# The checker of this worker process, set up by _init_worker
+_worker_checker = None
+
+def _init_worker(belief_clauses: Sequence[List[Clause]], query_clauses: List[Clause]):
+    global _worker_checker
+    _worker_checker = IncrementalEntailment(belief_clauses, query_clauses)
+
+def _check_chunk(chunk: List[Tuple[int, ...]]) -> List[bool]:
+    return [_worker_checker.entails(indexes) for indexes in chunk]
+
+def parallel_remainders(belief_clauses: Sequence[List[Clause]], query_clauses: List[Clause], workers: int,
+                        chunksize: int = 64) -> List[Set[int]]:
+    """
+    The remainders of the combinations() search in BeliefBase.compute_remainders, in the same order, with the subsets
+    of each size checked by workers processes.
+    """
+    n = len(belief_clauses)
+    remainders: List[Set[int]] = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(belief_clauses, query_clauses)) as pool:
+        for k in range(n, 0, -1):
+            # Same pruning as the sequential search: skip subsets of a remainder that was already found
+            candidates = (indexes for indexes in combinations(range(n), k)
+                          if not any(set(indexes).issubset(rem) for rem in remainders))
+            while True:
+                # A few chunks per worker at a time keeps every worker busy without materializing all subsets
+                window = list(islice(candidates, chunksize * workers * 4))
+                if not window:
+                    break
+                chunks = [window[i:i + chunksize] for i in range(0, len(window), chunksize)]
+                for chunk, results in zip(chunks, pool.map(_check_chunk, chunks)):
+                    remainders.extend(set(indexes) for indexes, entails in zip(chunk, results) if not entails)
+            if remainders:
+                break
+    return remainders
@@ -0,0 +1,511 @@
+"""
+Pure-Python CDCL SAT solver used as an alternative entailment backend.
+
+Clauses come in as lists of signed ints (DIMACS style): 3 means atom 3 is true and -3 means atom 3 is false.
+Internally every variable v gets an index and its two literals are encoded as 2*v (positive) and 2*v + 1 (negative),
+so the negation of an internal literal is simply lit ^ 1.
+
+The solver implements the usual ingredients:
+    - unit propagation with two watched literals per clause
+    - conflict-driven clause learning (first UIP) with non-chronological backtracking
+    - VSIDS-style branching (bump variables seen in conflicts, decay everything else)
+    - phase saving and Luby restarts
+    - periodic removal of long learnt clauses
+    - incremental solving under assumptions: clauses can be added between calls to solve, learnt clauses are kept,
+      and when the assumptions cannot all hold, core holds the assumptions that were involved in the conflict
+"""
+
+
+def luby(i):
+    """Returns the i-th element (0-based) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ..."""
+    # Find the finite subsequence that contains index i and its size
+    size, seq = 1, 0
+    while size < i + 1:
+        seq += 1
+        size = 2 * size + 1
+    # Walk down into the subsequence until i hits the last element of one
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        seq -= 1
+        i = i % size
+    return 1 << seq
+
+
+class _VarOrder:
+    """Max-heap of variables ordered by activity, used for VSIDS branching."""
+
+    def __init__(self, activity):
+        self.activity = activity
+        self.heap = []
+        # position of each variable in the heap, -1 if it is not in the heap
+        self.pos = []
+
+    def grow(self):
+        self.pos.append(-1)
+
+    def __contains__(self, var):
+        return self.pos[var] >= 0
+
+    def push(self, var):
+        if self.pos[var] >= 0:
+            return
+        self.heap.append(var)
+        self.pos[var] = len(self.heap) - 1
+        self._sift_up(len(self.heap) - 1)
+
+    def pop(self):
+        heap, pos = self.heap, self.pos
+        top = heap[0]
+        last = heap.pop()
+        pos[top] = -1
+        if heap:
+            heap[0] = last
+            pos[last] = 0
+            self._sift_down(0)
+        return top
+
+    # Called after the activity of var was increased
+    def increased(self, var):
+        if self.pos[var] >= 0:
+            self._sift_up(self.pos[var])
+
+    def _sift_up(self, i):
+        heap, pos, act = self.heap, self.pos, self.activity
+        var = heap[i]
+        while i > 0:
+            parent = (i - 1) >> 1
+            if act[heap[parent]] >= act[var]:
+                break
+            heap[i] = heap[parent]
+            pos[heap[i]] = i
+            i = parent
+        heap[i] = var
+        pos[var] = i
+
+    def _sift_down(self, i):
+        heap, pos, act = self.heap, self.pos, self.activity
+        var = heap[i]
+        n = len(heap)
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            if child + 1 < n and act[heap[child + 1]] > act[heap[child]]:
+                child += 1
+            if act[heap[child]] <= act[var]:
+                break
+            heap[i] = heap[child]
+            pos[heap[i]] = i
+            i = child
+        heap[i] = var
+        pos[var] = i
+
+
+class CDCLSolver:
+    """
+    Conflict-driven clause learning SAT solver.
+
+    Example:
+        solver = CDCLSolver([[1, 2], [-1], [-2]])
+        solver.solve()  # False, the clauses are unsatisfiable
+    """
+
+    def __init__(self, clauses=None, restart_base=100, var_decay=0.95):
+        # Mapping between external (signed int) variables and internal indexes
+        self.var_map = {}
+        self.var_names = []
+        # values[lit] is True, False or None (unassigned), kept for both literals of each variable
+        self.values = []
+        self.level = []
+        self.reason = []
+        self.phase = []
+        self.seen = []
+        self.activity = []
+        self.order = _VarOrder(self.activity)
+        # watches[lit] holds the clauses where lit is one of the two watched literals
+        self.watches = []
+        self.clauses = []
+        self.learnts = []
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+        self.var_inc = 1.0
+        self.var_decay = var_decay
+        self.restart_base = restart_base
+        self.max_learnts = 2000
+        # False once the clause set is known to be unsatisfiable at level 0
+        self.ok = True
+        self.model = None
+        # Assumptions of the current call to solve, and the failed ones after an unsatisfiable call
+        self.assumptions = []
+        self.core = None
+        # Budget of the current call to solve, if any, and the conflict count when the call started
+        self.budget = None
+        self.budget_start = 0
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0
+        if clauses is not None:
+            for clause in clauses:
+                self.add_clause(clause)
+
+    # ---------------------------------------------------------------- variables
+
+    def _var(self, ext):
+        """Internal index for an external variable, creating it on first use."""
+        var = self.var_map.get(ext)
+        if var is None:
+            var = len(self.var_names)
+            self.var_map[ext] = var
+            self.var_names.append(ext)
+            self.values.extend((None, None))
+            self.level.append(0)
+            self.reason.append(None)
+            self.phase.append(False)
+            self.seen.append(False)
+            self.activity.append(0.0)
+            self.watches.extend(([], []))
+            self.order.grow()
+            self.order.push(var)
+        return var
+
+    def _lit(self, ext_lit):
+        var = self._var(abs(ext_lit))
+        return 2 * var + (1 if ext_lit < 0 else 0)
+
+    def _ext(self, lit):
+        ext = self.var_names[lit >> 1]
+        return -ext if lit & 1 else ext
+
+    # ---------------------------------------------------------------- clauses
+
+    def add_clause(self, clause):
+        """
+        Adds a clause given as an iterable of signed ints.
+        Returns False if the solver became unsatisfiable at level 0.
+        """
+        if not self.ok:
+            return False
+        # Clauses are only ever added between calls to solve, so we are always at level 0 here
+        values = self.values
+        lits = []
+        # Map every literal first so that all variables show up in the model, even in dropped clauses
+        for lit in [self._lit(ext_lit) for ext_lit in set(clause)]:
+            # Drop tautologies and clauses that are already satisfied at level 0
+            if values[lit] is True or (lit ^ 1) in lits:
+                return True
+            # Literals that are false at level 0 can never help
+            if values[lit] is False:
+                continue
+            lits.append(lit)
+        if not lits:
+            self.ok = False
+            return False
+        if len(lits) == 1:
+            self._assign(lits[0], None)
+            if self._propagate() is not None:
+                self.ok = False
+                return False
+            return True
+        self._attach(lits)
+        self.clauses.append(lits)
+        return True
+
+    def _attach(self, clause):
+        self.watches[clause[0]].append(clause)
+        self.watches[clause[1]].append(clause)
+
+    # ---------------------------------------------------------------- assignment
+
+    def _decision_level(self):
+        return len(self.trail_lim)
+
+    def _assign(self, lit, reason):
+        var = lit >> 1
+        self.values[lit] = True
+        self.values[lit ^ 1] = False
+        self.level[var] = len(self.trail_lim)
+        self.reason[var] = reason
+        self.trail.append(lit)
+
+    def _cancel_until(self, level):
+        """Undo all assignments made above the given decision level."""
+        if len(self.trail_lim) <= level:
+            return
+        values, phase, order = self.values, self.phase, self.order
+        start = self.trail_lim[level]
+        for lit in reversed(self.trail[start:]):
+            var = lit >> 1
+            values[lit] = None
+            values[lit ^ 1] = None
+            self.reason[var] = None
+            # Phase saving: remember the polarity so we try it again first
+            phase[var] = not (lit & 1)
+            order.push(var)
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = len(self.trail)
+
+    # ---------------------------------------------------------------- propagation
+
+    def _propagate(self):
+        """
+        Unit propagation over the two watched literals.
+        Returns the conflicting clause, or None if no conflict was found.
+        """
+        values, watches, trail = self.values, self.watches, self.trail
+        while self.qhead < len(trail):
+            false_lit = trail[self.qhead] ^ 1
+            self.qhead += 1
+            self.propagations += 1
+            watchers = watches[false_lit]
+            kept = []
+            i, n = 0, len(watchers)
+            while i < n:
+                clause = watchers[i]
+                i += 1
+                # Make sure the false literal sits at position 1
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], false_lit
+                first = clause[0]
+                # Clause is already satisfied by the other watch
+                if values[first] is True:
+                    kept.append(clause)
+                    continue
+                # Look for a new literal to watch that is not false
+                for k in range(2, len(clause)):
+                    lit = clause[k]
+                    if values[lit] is not False:
+                        clause[1], clause[k] = lit, false_lit
+                        watches[lit].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if values[first] is False:
+                        # Conflict: keep the remaining watchers and stop
+                        kept.extend(watchers[i:])
+                        watches[false_lit] = kept
+                        self.qhead = len(trail)
+                        return clause
+                    # Clause became unit, so its first literal is implied
+                    self._assign(first, clause)
+            watches[false_lit] = kept
+        return None
+
+    # ---------------------------------------------------------------- conflict analysis
+
+    def _bump(self, var):
+        activity = self.activity
+        activity[var] += self.var_inc
+        if activity[var] > 1e100:
+            # Rescale every activity to avoid floating point overflow
+            for v in range(len(activity)):
+                activity[v] *= 1e-100
+            self.var_inc *= 1e-100
+        self.order.increased(var)
+
+    def _analyze(self, conflict):
+        """
+        First-UIP conflict analysis.
+        Returns the learnt clause (asserting literal first) and the level to backjump to.
+        """
+        seen, level, reason, trail = self.seen, self.level, self.reason, self.trail
+        current = len(self.trail_lim)
+        learnt = [None]
+        counter = 0
+        p = None
+        index = len(trail) - 1
+        clause = conflict
+        while True:
+            for q in clause:
+                if q == p:
+                    continue
+                var = q >> 1
+                if not seen[var] and level[var] > 0:
+                    seen[var] = True
+                    self._bump(var)
+                    if level[var] == current:
+                        counter += 1
+                    else:
+                        learnt.append(q)
+            # Walk back along the trail to the next literal involved in the conflict
+            while not seen[trail[index] >> 1]:
+                index -= 1
+            p = trail[index]
+            index -= 1
+            clause = reason[p >> 1]
+            seen[p >> 1] = False
+            counter -= 1
+            if counter == 0:
+                break
+        learnt[0] = p ^ 1
+
+        # Remove literals implied by other literals of the learnt clause
+        minimized = [learnt[0]]
+        for q in learnt[1:]:
+            r = reason[q >> 1]
+            if r is None or any(not seen[x >> 1] and level[x >> 1] > 0 for x in r if x != q ^ 1):
+                minimized.append(q)
+        for q in learnt[1:]:
+            seen[q >> 1] = False
+        learnt = minimized
+
+        # Backjump to the second highest level in the clause, which we put at position 1 to watch it
+        if len(learnt) == 1:
+            return learnt, 0
+        best = 1
+        for k in range(2, len(learnt)):
+            if level[learnt[k] >> 1] > level[learnt[best] >> 1]:
+                best = k
+        learnt[1], learnt[best] = learnt[best], learnt[1]
+        return learnt, level[learnt[1] >> 1]
+
+    def _record(self, learnt):
+        if len(learnt) == 1:
+            self._assign(learnt[0], None)
+        else:
+            self._attach(learnt)
+            self.learnts.append(learnt)
+            self._assign(learnt[0], learnt)
+
+    def _reduce_db(self):
+        """Forget the longer half of the learnt clauses, keeping those that are reasons for assignments."""
+        if len(self.learnts) < self.max_learnts:
+            return
+        locked = {id(self.reason[lit >> 1]) for lit in self.trail if self.reason[lit >> 1] is not None}
+        self.learnts.sort(key=len)
+        half = len(self.learnts) // 2
+        self.learnts = self.learnts[:half] + [c for c in self.learnts[half:] if id(c) in locked]
+        # Rebuild the watch lists from the clauses we keep; positions 0 and 1 are still the watched ones
+        self.watches = [[] for _ in self.watches]
+        for clause in self.clauses:
+            self._attach(clause)
+        for clause in self.learnts:
+            self._attach(clause)
+        self.max_learnts = int(self.max_learnts * 1.1)
+
+    # ---------------------------------------------------------------- search
+
+    def _pick_branch(self):
+        order, values = self.order, self.values
+        while order.heap:
+            var = order.pop()
+            if values[2 * var] is None:
+                return 2 * var + (0 if self.phase[var] else 1)
+        return None
+
+    def _analyze_final(self, lit):
+        """
+        Called when the assumption lit turned out to be false.
+        Returns the assumptions (external literals) that together force ¬lit.
+        """
+        seen, reason, level, trail = self.seen, self.reason, self.level, self.trail
+        core = {self._ext(lit)}
+        if not self.trail_lim:
+            return core
+        seen[lit >> 1] = True
+        # Walk back over everything assigned after level 0 and follow the reasons of the marked variables
+        for t in reversed(trail[self.trail_lim[0]:]):
+            var = t >> 1
+            if not seen[var]:
+                continue
+            r = reason[var]
+            if r is None:
+                # Only assumptions are decided before all assumptions are placed, so this one is part of the core
+                core.add(self._ext(t))
+            else:
+                for q in r:
+                    if q != t and level[q >> 1] > 0:
+                        seen[q >> 1] = True
+            seen[var] = False
+        seen[lit >> 1] = False
+        return core
+
+    def _search(self, conflict_limit):
+        """
+        Search until a result is found or conflict_limit conflicts happened (then returns None to restart).
+        Returns False with self.core set when the assumptions cannot hold, and False without a core when the clauses
+        themselves are unsatisfiable.
+        """
+        conflicts = 0
+        while True:
+            conflict = self._propagate()
+            if conflict is not None:
+                conflicts += 1
+                self.conflicts += 1
+                if not self.trail_lim:
+                    return False
+                learnt, backjump = self._analyze(conflict)
+                self._cancel_until(backjump)
+                self._record(learnt)
+                self.var_inc /= self.var_decay
+                if self.budget is not None:
+                    # Every conflict derives one learnt clause
+                    self.budget.check(len(self.clauses) + len(self.learnts), self.conflicts - self.budget_start)
+            else:
+                if conflicts >= conflict_limit:
+                    self._cancel_until(0)
+                    self._reduce_db()
+                    return None
+                lit = None
+                # The first decision levels are used to place the assumptions, one per level
+                while len(self.trail_lim) < len(self.assumptions):
+                    assumption = self.assumptions[len(self.trail_lim)]
+                    if self.values[assumption] is True:
+                        # Already holds, open an empty decision level so levels and assumptions stay aligned
+                        self.trail_lim.append(len(self.trail))
+                    elif self.values[assumption] is False:
+                        self.core = self._analyze_final(assumption)
+                        return False
+                    else:
+                        lit = assumption
+                        break
+                if lit is None:
+                    lit = self._pick_branch()
+                if lit is None:
+                    # Every variable is assigned without conflict so we found a model
+                    self.model = {self.var_names[v]: self.values[2 * v] for v in range(len(self.var_names))}
+                    return True
+                self.decisions += 1
+                self.trail_lim.append(len(self.trail))
+                self._assign(lit, None)
+
+    def solve(self, assumptions=(), budget=None):
+        """
+        Returns True if the clauses are satisfiable with every assumption (external literals) true,
+        self.model then holds a model. Returns False otherwise, and if that is because of the assumptions,
+        self.core holds a subset of the assumptions that cannot be true together.
+        With a budget (see budget.py), budget.check is called after every conflict and whatever it raises is passed
+        on, with the solver back at level 0 so it can be used again.
+        """
+        self.model = None
+        self.core = None
+        if self.ok and self._propagate() is not None:
+            self.ok = False
+        if not self.ok:
+            # An empty core: the clauses are unsatisfiable whatever we assume
+            self.core = set()
+            return False
+        self.assumptions = [self._lit(lit) for lit in assumptions]
+        self.budget = budget
+        self.budget_start = self.conflicts
+        restarts = 0
+        try:
+            if budget is not None:
+                budget.check(len(self.clauses) + len(self.learnts), 0)
+            while True:
+                result = self._search(luby(restarts) * self.restart_base)
+                restarts += 1
+                if result is not None:
+                    self._cancel_until(0)
+                    if result is False and self.core is None:
+                        # Unsatisfiable without any assumption, so every later call is unsatisfiable too
+                        self.ok = False
+                        self.core = set()
+                    return result
+        except BaseException:
+            self._cancel_until(0)
+            raise
+        finally:
+            self.assumptions = []
+            self.budget = None
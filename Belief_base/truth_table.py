@@ -0,0 +1,109 @@
+from typing import List
+
+try:
+    import numpy as np
+except ImportError:
+    # numpy is optional, without it the truth table engine is unavailable and the "auto" engine uses the SAT solver
+    np = None
+
+"""
+Truth table entailment over packed bit arrays.
+
+usable ∪ support is refuted when no assignment of its n variables satisfies every clause. Instead of trying the
+2^n assignments one at a time, assignment number a is stored as bit a of a long bit array (64 assignments per uint64
+word), and variable k is true exactly in the assignments whose number has bit k set. So each variable is one fixed
+bit pattern, for example
+
+    variable 0: 1010 1010 ...   (word 0xAAAAAAAAAAAAAAAA)
+    variable 1: 1100 1100 ...   (word 0xCCCCCCCCCCCCCCCC)
+    variable 6: whole words alternate between all zeros and all ones
+
+and a clause is evaluated for all assignments at once by OR-ing the patterns of its literals, the clause set by
+AND-ing the clauses. The formula is satisfiable iff a bit survives.
+
+The assignment space is evaluated in chunks of CHUNK_WORDS words so memory stays bounded. Within a chunk only the
+low variables change, the high ones (above the chunk size) are the same for every assignment of the chunk, so
+clauses are simplified with them first: a clause with a true high literal is dropped and false high literals are
+removed, which makes the work per chunk depend only on the low variables.
+"""
+
+# Assignments per chunk are 64 * CHUNK_WORDS, so 2^18 assignments and 32 KB per bit array
+CHUNK_WORDS = 1 << 12
+
+# Bit pattern of variable k < 6 inside every word
+_WORD_PATTERNS = [
+    0xAAAAAAAAAAAAAAAA,
+    0xCCCCCCCCCCCCCCCC,
+    0xF0F0F0F0F0F0F0F0,
+    0xFF00FF00FF00FF00,
+    0xFFFF0000FFFF0000,
+    0xFFFFFFFF00000000,
+]
+
+def available() -> bool:
+    """True if numpy is installed, so truth_table_refutes can be used."""
+    return np is not None
+
+# Bit arrays of the variables 0..count-1 for a chunk of the given number of words
+def _patterns(count: int, words: int):
+    index = np.arange(words, dtype=np.uint64)
+    rows = []
+    for k in range(count):
+        if k < 6:
+            rows.append(np.full(words, _WORD_PATTERNS[k], dtype=np.uint64))
+        else:
+            # Whole words are all ones where bit k - 6 of the word index is set
+            rows.append(((index >> np.uint64(k - 6)) & np.uint64(1)) * np.uint64(0xFFFFFFFFFFFFFFFF))
+    return rows
+
+def truth_table_refutes(usable: List[tuple], support: List[tuple], budget=None) -> bool:
+    """
+    Returns True if usable ∪ support is unsatisfiable, by checking every assignment of its variables.
+    With a budget (see budget.py), its deadline is checked before every chunk.
+    """
+    if np is None:
+        raise ImportError("The truth_table engine needs numpy, install it or use the 'sat' or 'auto' engine")
+    clauses = list(usable) + list(support)
+    if any(not clause for clause in clauses):
+        return True
+    # Number the variables 0..n-1 in order of first appearance
+    position = {}
+    for clause in clauses:
+        for lit in clause:
+            position.setdefault(abs(lit), len(position))
+    n = len(position)
+    # Variables below low change inside a chunk, the ones from low on are fixed per chunk
+    total_words = max(1, (1 << n) >> 6)
+    words = min(total_words, CHUNK_WORDS)
+    low = min(n, 6 + words.bit_length() - 1)
+    rows = _patterns(low, words)
+    negated = [~row for row in rows]
+    # Fewer than 64 assignments only use the lowest bits of the single word
+    full = np.uint64((1 << (1 << n)) - 1) if n < 6 else np.uint64(0xFFFFFFFFFFFFFFFF)
+    # Each clause as its (low literals, high literals), with literals as (variable position, is positive)
+    split = []
+    for clause in clauses:
+        lits = [(position[abs(lit)], lit > 0) for lit in clause]
+        split.append(([l for l in lits if l[0] < low], [l for l in lits if l[0] >= low]))
+
+    sat = np.empty(words, dtype=np.uint64)
+    acc = np.empty(words, dtype=np.uint64)
+    for chunk in range(total_words // words):
+        if budget is not None:
+            budget.check(len(clauses), 0)
+        sat.fill(full)
+        for low_lits, high_lits in split:
+            # High variable k is true in this chunk when bit k - low of the chunk number is set
+            if any(bool((chunk >> (k - low)) & 1) == positive for k, positive in high_lits):
+                continue
+            if not low_lits:
+                # Every literal is false for the whole chunk
+                sat.fill(0)
+                break
+            acc.fill(0)
+            for k, positive in low_lits:
+                np.bitwise_or(acc, rows[k] if positive else negated[k], out=acc)
+            np.bitwise_and(sat, acc, out=sat)
+        if sat.any():
+            return False
+    return True
@@ -0,0 +1,131 @@
+from typing import List
+from Belief_base.formula import Formula, Atom, Not, And, Or, Implies, Equiv
+
+"""
+Definitional (Tseitin) clause conversion with the polarity trick of Plaisted and Greenbaum.
+
+to_cnf distributes ∨ over ∧, so a formula like (p1 ∧ q1) ∨ (p2 ∧ q2) ∨ ... ∨ (pk ∧ qk) turns into 2^k clauses.
+Here every compound subformula that sits below a ∨ gets a fresh auxiliary atom x instead, plus a few clauses
+that tie x to the subformula, so the number of clauses grows linearly with the size of the formula.
+
+Example: p ∨ (q ∧ r) becomes
+    (p ∨ x)        x stands for q ∧ r
+    (¬x ∨ q)       x → q
+    (¬x ∨ r)       x → r
+
+Only the direction we need is written down: a subformula that occurs positively needs x → subformula, one that
+occurs negatively needs subformula → x. The result is not logically equivalent to the input (it talks about x),
+but it is satisfiable exactly when the input is, which is all that refutation needs.
+
+Auxiliary atoms come from the symbol table and are shared by equal subformulas. Sharing is safe: all the clauses
+ever written down for x are part of the full definition x ↔ subformula, and adding that definition never changes
+whether a clause set is satisfiable.
+"""
+
+def tseitin_clauses(formula: Formula, table) -> List[tuple]:
+    """Equisatisfiable clauses (sorted tuples of signed ints) for the formula, without tautologies."""
+    clauses = []
+    # (aux atom, polarity) pairs whose definition clauses were already written for this formula
+    defined = set()
+
+    def add(lits):
+        clauses.append(tuple(sorted(set(lits))))
+
+    # The literal that stands for f where f occurs with the given polarity
+    def literal(f, positive):
+        if isinstance(f, Not):
+            return -literal(f.formula, not positive)
+        if isinstance(f, Atom):
+            return table.intern(f.name)
+        x = table.aux(f)
+        if (x, positive) not in defined:
+            defined.add((x, positive))
+            define(f, x, positive)
+        return x
+
+    # Write x → f (positive) or f → x (negative) as clauses
+    def define(f, x, positive):
+        if isinstance(f, And):
+            if positive:
+                for sub in f.formulas:
+                    add([-x, literal(sub, True)])
+            else:
+                add([x] + [-literal(sub, False) for sub in f.formulas])
+        elif isinstance(f, Or):
+            if positive:
+                add([-x] + [literal(sub, True) for sub in f.formulas])
+            else:
+                for sub in f.formulas:
+                    add([x, -literal(sub, False)])
+        elif isinstance(f, Implies):
+            a, b = f.premise, f.conclusion
+            if positive:
+                add([-x, -literal(a, False), literal(b, True)])
+            else:
+                add([x, literal(a, True)])
+                add([x, -literal(b, False)])
+        elif isinstance(f, Equiv):
+            a, b = f.left, f.right
+            if positive:
+                add([-x, -literal(a, False), literal(b, True)])
+                add([-x, literal(a, True), -literal(b, False)])
+            else:
+                add([x, literal(a, True), literal(b, True)])
+                add([x, -literal(a, False), -literal(b, False)])
+        else:
+            raise ValueError(f"Unknown formula type: {type(f).__name__}")
+
+    # Split the top level into conjuncts, each of which becomes one clause
+    def conjuncts(f, out):
+        if isinstance(f, And):
+            for sub in f.formulas:
+                conjuncts(sub, out)
+        elif isinstance(f, Equiv):
+            # a ↔ b is (a → b) ∧ (b → a), which needs no auxiliary atom at the top
+            conjuncts(Implies(f.left, f.right), out)
+            conjuncts(Implies(f.right, f.left), out)
+        elif isinstance(f, Not):
+            g = f.formula
+            if isinstance(g, Not):
+                conjuncts(g.formula, out)
+            elif isinstance(g, Or):
+                # ¬(a ∨ b) is ¬a ∧ ¬b
+                for sub in g.formulas:
+                    conjuncts(Not(sub), out)
+            elif isinstance(g, Implies):
+                # ¬(a → b) is a ∧ ¬b
+                conjuncts(g.premise, out)
+                conjuncts(Not(g.conclusion), out)
+            elif isinstance(g, Equiv):
+                # ¬(a ↔ b) is (a ∨ b) ∧ (¬a ∨ ¬b)
+                out.append(Or(g.left, g.right))
+                out.append(Or(Not(g.left), Not(g.right)))
+            else:
+                out.append(f)
+        else:
+            out.append(f)
+        return out
+
+    # Split a conjunct into the literals of its clause
+    def disjuncts(f, out):
+        if isinstance(f, Or):
+            for sub in f.formulas:
+                disjuncts(sub, out)
+        elif isinstance(f, Implies):
+            # a → b is ¬a ∨ b
+            disjuncts(Not(f.premise), out)
+            disjuncts(f.conclusion, out)
+        elif isinstance(f, Not) and isinstance(f.formula, Not):
+            disjuncts(f.formula.formula, out)
+        elif isinstance(f, Not) and isinstance(f.formula, And):
+            # ¬(a ∧ b) is ¬a ∨ ¬b
+            for sub in f.formula.formulas:
+                disjuncts(Not(sub), out)
+        else:
+            out.append(literal(f, True))
+        return out
+
+    for conjunct in conjuncts(formula, []):
+        add(disjuncts(conjunct, []))
+    # A clause with p and ¬p is always true and only gets in the way of resolution
+    return [c for c in clauses if len({abs(lit) for lit in c}) == len(c)]
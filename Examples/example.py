@@ -1,6 +1,6 @@
 from Belief_base.belief_base import BeliefBase
 from Belief_base.formula import Implies, Or, Not, Atom
-from Belief_base.entailment import cnf_clauses_for_query
+from Belief_base.entailment import cnf_clauses_for_query, SYMBOLS
 from Belief_base.entailment import resolution_entails
 from Agent.agent import BeliefRevisionAgent
 from Belief_base.parser import parse_file
@@ -46,12 +46,13 @@ def tryClauses():
     # Query: q and method to get CNF clauses 
     clauses = cnf_clauses_for_query(KB, q)
     for c in clauses:
-        print(c)
+        # Clauses are tuples of ints, decode them back to (atom name, is_positive) pairs for printing
+        print(c, SYMBOLS.decode(c))
         
-    # You should see:
-    #  frozenset({('p', False), ('q', True)})   # from ¬p ∨ q
-    #  frozenset({('p', True)})                 # from p
-    #  frozenset({('q', False)})                # from ¬q (the negated query)
+    # You should see (the numbers depend on the order atoms were first seen):
+    #  (-1, 2) frozenset({('p', False), ('q', True)})   # from ¬p ∨ q
+    #  (1,) frozenset({('p', True)})                   # from p
+    #  (-2,) frozenset({('q', False)})                 # from ¬q (the negated query)
 
 # Example usage
 def example():
@@ -0,0 +1,58 @@
+import random
+from itertools import product
+from Belief_base.bdd import BDD
+from Belief_base.belief_base import BeliefBase
+from Belief_base.formula import Atom, Not, And, Or, Implies, Equiv
+from Agent.agent import BeliefRevisionAgent
+from Tests.test_belief_base import random_formula
+
+def test_equivalent_formulas_share_a_node():
+    p, q = Atom("p"), Atom("q")
+    bdd = BDD(["p", "q"])
+    assert bdd.from_formula(Implies(p, q)) == bdd.from_formula(Or(Not(p), q))
+    assert bdd.from_formula(Equiv(p, q)) == bdd.from_formula(And(Implies(p, q), Implies(q, p)))
+    assert bdd.from_formula(Or(p, Not(p))) == BDD.TRUE
+    assert bdd.count(bdd.from_formula(And(p, q))) == 1
+
+def test_bdd_engine_matches_resolution_and_counts_models():
+    rng = random.Random(31)
+    names = "pqrs"
+    atoms = [Atom(name) for name in names]
+    for _ in range(60):
+        KB = BeliefBase()
+        for _ in range(rng.randint(0, 4)):
+            KB.add(random_formula(rng, atoms, 2))
+        for query in [random_formula(rng, atoms, 2) for _ in range(3)]:
+            assert KB.entails(query, engine="bdd") == KB.entails(query, engine="resolution")
+        symbols = sorted(set().union(*[f.symbols() for f in KB.get_beliefs()]))
+        models = sum(all(f.evaluate(dict(zip(symbols, bits))) for f in KB.get_beliefs())
+                     for bits in product([False, True], repeat=len(symbols)))
+        assert KB.count_models() == models
+
+def test_compiled_base_is_rebuilt_only_after_a_change():
+    p, q = Atom("p"), Atom("q")
+    agent = BeliefRevisionAgent(engine="bdd")
+    agent.expand(Implies(p, q))
+    agent.expand(p)
+    assert agent.ask(q)
+    compiled = agent.base.compiled()
+    assert agent.ask(And(p, q)) and not agent.ask(Not(q))
+    assert agent.base.compiled() is compiled and agent.base.compiled_stats()["queries"] == 3
+    agent.revise(Not(q))
+    assert agent.base.compiled() is not compiled
+    assert agent.ask(Not(q)) and not agent.ask(q)
+
+def test_deep_order_and_compacted_table(monkeypatch):
+    # More atoms than the recursion limit has frames, each one a level of the order
+    atoms = [Atom(f"x{i}") for i in range(1200)]
+    KB = BeliefBase(engine="bdd", cache_size=0)
+    KB.add(Or(*atoms))
+    KB.add(Not(atoms[0]))
+    for query in (Or(*atoms[1:]), atoms[5], Or(atoms[0], atoms[1])):
+        assert KB.entails(query) == KB.entails(query, engine="sat")
+    # Past MAX_NODES every query leaves only the base's nodes in the table, and the answers stay the same
+    compiled = KB.compiled()
+    monkeypatch.setattr(BDD, "MAX_NODES", 0)
+    assert KB.entails(Or(*atoms[1:])) and not KB.entails(atoms[5])
+    assert compiled.stats()["table_nodes"] == compiled.stats()["nodes"]
+    assert compiled.count_models() == KB.count_models()
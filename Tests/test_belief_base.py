@@ -1,7 +1,16 @@
-from Belief_base.belief_base import BeliefBase
-from Belief_base.formula import Implies, Or, Not, Atom
+import pickle
+import random
+import sys
+import threading
+from itertools import product, combinations
+from Belief_base.belief_base import BeliefBase, select_remainders
+from Belief_base.formula import Implies, Or, Not, Atom, And, Equiv
+from Belief_base.parser import parse_formula
 from Agent.agent import BeliefRevisionAgent
-from Belief_base.entailment import resolution_entails
+from functools import partial
+from benchmarks import generators
+from benchmarks.generators import random_kcnf
+from Belief_base.entailment import resolution_entails, resolution_refutes, extract_clauses, is_tautology, SymbolTable, negated_query_clauses
 
 def test_entailment():
     KB = BeliefBase()
@@ -40,7 +49,290 @@ def test_contraction():
     # Ask again
     print("\n❓ Does the base entail q now?", agent.ask(q))  # Should be False
 
+def test_int_clauses():
+    table = SymbolTable()
+    p, q, r = Atom("p"), Atom("q"), Atom("r")
+    # And lists the atom r before the Or, so r ↦ 1, p ↦ 2, q ↦ 3 in a fresh symbol table
+    clauses = extract_clauses(And(Or(p, Not(q)), r), table)
+    assert sorted(clauses) == [(-3, 2), (1,)]
+    assert table.decode((-3, 2)) == frozenset({("p", True), ("q", False)})
+    assert is_tautology((-1, 1, 2))
+    assert not is_tautology((-2, 1))
+
+def test_tautological_input_clauses_are_ignored():
+    # p ∨ ¬p ∨ ... is always true, so it must not turn a satisfiable set into a refutation
+    assert not resolution_refutes([(-2, -1)] * 4, [(1, 2), (-1,), (-2, -1), (-2, 2)])
+    assert not resolution_refutes([(-2, 2), (1, -1)], [(1,)])
+    assert resolution_refutes([(-2, 2), (1,)], [(-1, 3, -3), (-1,)])
+
+def test_clause_cache():
+    KB = BeliefBase()
+    p, q = Atom("p"), Atom("q")
+    KB.add(Implies(p, q))
+    KB.add(p)
+    # Both beliefs were clausified when they were added
+    assert len(KB.clause_cache) == 2
+    assert KB.entails(q)
+    KB.remove(p)
+    assert p not in KB.clause_cache
+    assert not KB.entails(q)
+    KB.clear()
+    assert KB.clause_cache == {}
+
+def test_sorted_storage():
+    KB = BeliefBase()
+    p, q, r, s = Atom("p"), Atom("q"), Atom("r"), Atom("s")
+    for belief, priority in ((p, 1), (q, 3), (r, 1), (s, 3), (p, 0)):
+        KB.add(belief, priority)
+    # Descending priority, and in the order they were added among equal priorities
+    assert KB.get_prioritized_beliefs() == [(q, 3), (s, 3), (p, 1), (r, 1), (p, 0)]
+    assert p in KB and Implies(p, q) not in KB
+    # Removing a formula removes every copy of it, removing one that isn't stored changes nothing
+    KB.remove(p)
+    version = KB.version
+    KB.remove(p)
+    assert KB.version == version and p not in KB
+    assert KB.get_beliefs() == [q, s, r]
+    KB.add(Implies(p, q), 3)
+    assert Implies(p, q) in KB and KB.get_beliefs()[2] == Implies(p, q).to_cnf()
+    # remove finds a belief the same way, by the formula as given
+    KB.remove(Implies(p, q))
+    assert Implies(p, q) not in KB and KB.get_beliefs() == [q, s, r]
+
+def test_entailment_cache():
+    KB = BeliefBase(cache_size=2)
+    p, q, r = Atom("p"), Atom("q"), Atom("r")
+    KB.add(Implies(p, q))
+    KB.add(p)
+    assert KB.entails(q)
+    # q ∨ q has the same clauses as q, so the second check is a hit
+    assert KB.entails(Or(q, q))
+    assert KB.cache_stats()["hits"] == 1
+    # Removing p bumps the version, so the cached answer for q is not used any more
+    version = KB.version
+    KB.remove(p)
+    assert KB.version > version
+    assert not KB.entails(q)
+    KB.entails(r)
+    KB.entails(p)
+    stats = KB.cache_stats()
+    assert stats["size"] == 2 and stats["evictions"] >= 1
+
+# Smaller formulas than the benchmarks use, every test that calls this relies on them staying cheap
+random_formula = partial(generators.random_formula, leaf_probability=0.3)
+
+def test_resolution_matches_truth_table():
+    rng = random.Random(3)
+    atoms = [Atom(name) for name in "pqrs"]
+    for _ in range(150):
+        KB = BeliefBase()
+        for _ in range(rng.randint(0, 4)):
+            KB.add(random_formula(rng, atoms, 2))
+        query = random_formula(rng, atoms, 2)
+        # KB ⊨ query iff every model of the beliefs is a model of the query
+        expected = all(query.evaluate(model) for model in (dict(zip("pqrs", bits)) for bits in product([False, True], repeat=4))
+                       if all(f.evaluate(model) for f in KB.get_beliefs()))
+        assert resolution_entails(KB, query) == expected
+
+def test_remainder_methods_match_combinations():
+    rng = random.Random(7)
+    atoms = [Atom(name) for name in "pqrs"]
+    for _ in range(40):
+        KB = BeliefBase()
+        for _ in range(rng.randint(1, 6)):
+            KB.add(random_formula(rng, atoms, 2), priority=rng.randint(0, 3))
+        phi = random_formula(rng, atoms, 2)
+        expected = KB.compute_remainders(phi, method="combinations")
+        assert KB.compute_remainders(phi, method="incremental") == expected
+        assert KB.compute_remainders(phi, method="mcs") == expected
+
+def test_parallel_remainders_match_combinations():
+    rng = random.Random(19)
+    atoms = [Atom(name) for name in "pqrs"]
+    KB = BeliefBase(workers=2)
+    for _ in range(7):
+        KB.add(random_formula(rng, atoms, 2), priority=rng.randint(0, 3))
+    for _ in range(5):
+        phi = random_formula(rng, atoms, 2)
+        assert KB.compute_remainders(phi, method="parallel") == KB.compute_remainders(phi)
+
+def test_best_remainders_match_selection():
+    rng = random.Random(11)
+    atoms = [Atom(name) for name in "pqrs"]
+    for _ in range(60):
+        KB = BeliefBase()
+        for _ in range(rng.randint(1, 7)):
+            KB.add(random_formula(rng, atoms, 2), priority=rng.randint(-1, 3))
+        phi = random_formula(rng, atoms, 2)
+        remainders = KB.compute_remainders(phi)
+        priorities = [priority for _, priority in KB.get_prioritized_beliefs()]
+        expected = select_remainders(remainders, priorities) if remainders else []
+        assert KB.best_remainders(phi) == expected
+        # Both selections must leave the agent with the same beliefs
+        agents = [BeliefRevisionAgent(selection=selection) for selection in ("enumerate", "branch_and_bound")]
+        for agent in agents:
+            for belief, priority in KB.get_prioritized_beliefs():
+                agent.expand(belief, priority)
+            agent.contract_partial_meet(phi)
+        assert agents[0].base.get_prioritized_beliefs() == agents[1].base.get_prioritized_beliefs()
+
+def test_kernels_and_kernel_contraction():
+    rng = random.Random(13)
+    atoms = [Atom(name) for name in "pqrs"]
+    for _ in range(60):
+        KB = BeliefBase()
+        for _ in range(rng.randint(1, 6)):
+            KB.add(random_formula(rng, atoms, 2), priority=rng.randint(0, 3))
+        phi = random_formula(rng, atoms, 2)
+        n = len(KB.beliefs)
+        # Brute force: subsets that entail phi while none of their strict subsets do
+        entailing = [set(s) for k in range(n + 1) for s in combinations(range(n), k) if entails_subset(KB, s, phi)]
+        expected = [s for s in entailing if not any(other < s for other in entailing)]
+        assert [set(kernel) for kernel in KB.compute_kernels(phi)] == expected
+
+        agent = BeliefRevisionAgent()
+        for belief, priority in KB.get_prioritized_beliefs():
+            agent.expand(belief, priority)
+        agent.contract_kernel(phi)
+        # Success: only a tautology is still entailed, and only the lowest belief of each kernel was removed
+        assert not agent.ask(phi) or expected == [set()]
+        assert len(agent.base.beliefs) == n - len({max(kernel) for kernel in expected if kernel})
+
+def test_ask_many_matches_ask():
+    rng = random.Random(17)
+    atoms = [Atom(name) for name in "pqrs"]
+    for _ in range(20):
+        agent = BeliefRevisionAgent(cache_size=0)
+        for _ in range(rng.randint(0, 5)):
+            agent.expand(random_formula(rng, atoms, 2), priority=rng.randint(0, 3))
+        queries = [random_formula(rng, atoms, 2) for _ in range(15)]
+        expected = [agent.ask(query) for query in queries]
+        assert agent.ask_many(queries).results == expected
+    # Spread over worker processes, the answers still come back in query order
+    batch = agent.ask_many(queries * 4, workers=2)
+    assert batch.results == expected * 4 and batch.queries_per_second > 0
+
+def test_revise_many_matches_revise():
+    rng = random.Random(23)
+    atoms = [Atom(name) for name in "pqrs"]
+    for strategy in ("partial_meet", "kernel"):
+        for _ in range(15):
+            stream = [(random_formula(rng, atoms, 2), rng.randint(0, 3)) for _ in range(rng.randint(1, 8))]
+            sequential, batched = BeliefRevisionAgent(engine="sat"), BeliefRevisionAgent(engine="sat")
+            for formula, priority in stream:
+                sequential.revise(formula, priority, strategy=strategy)
+            batched.revise_many(stream, strategy=strategy)
+            assert batched.base.get_prioritized_beliefs() == sequential.base.get_prioritized_beliefs()
+
+def test_relevance_filter_matches_full_check():
+    rng = random.Random(29)
+    # Two groups of atoms that only some beliefs connect
+    groups = [[Atom(name) for name in "pqr"], [Atom(name) for name in "stu"]]
+    for _ in range(40):
+        filtered, full = BeliefBase(), BeliefBase(relevance_filter=False)
+        for _ in range(rng.randint(1, 6)):
+            atoms = groups[0] + groups[1] if rng.random() < 0.2 else rng.choice(groups)
+            belief = random_formula(rng, atoms, 2)
+            filtered.add(belief)
+            full.add(belief)
+        if rng.random() < 0.3:
+            belief = rng.choice(filtered.get_beliefs())
+            filtered.remove(belief)
+            full.remove(belief)
+        queries = [random_formula(rng, rng.choice(groups), 2) for _ in range(5)]
+        # The batch first, so it doesn't just read the answers of entails from the cache
+        assert filtered.entails_many(queries).results == [full.entails(query) for query in queries]
+        for query in queries:
+            assert filtered.entails(query) == full.entails(query)
+    # An inconsistent group makes every query entailed, even one about the other group
+    KB = BeliefBase()
+    KB.add(Atom("s"))
+    KB.add(Atom("p"))
+    # Only the belief about p is connected to a query about p and q
+    assert KB.relevant_beliefs(negated_query_clauses(Or(Atom("p"), Atom("q")))) == {Atom("p")}
+    assert not KB.entails(Atom("q"))
+    KB.add(Not(Atom("s")))
+    assert not KB.is_consistent() and KB.entails(Atom("q"))
+    assert KB.entails_many([Atom("q"), Atom("r")]).results == [True, True]
+    KB.remove(Not(Atom("s")))
+    assert KB.is_consistent() and not KB.entails(Atom("q"))
+    KB.clear()
+    assert KB.symbol_index == {} and KB.is_consistent()
+
+def test_concurrent_consistency_checks():
+    # Threads switching as often as possible, so checks that share the solver without the lock would interleave
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for seed in range(8):
+            KB = BeliefBase(engine="sat")
+            for belief in random_kcnf(70, 200, seed=seed):
+                KB.add(belief)
+            expected = BeliefBase(engine="sat")
+            for belief in KB.get_beliefs():
+                expected.add(belief)
+            barrier = threading.Barrier(6)
+            results = []
+            def check():
+                barrier.wait()
+                results.append(KB.is_consistent())
+            threads = [threading.Thread(target=check) for _ in range(6)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert results == [expected.is_consistent()] * 6
+    finally:
+        sys.setswitchinterval(interval)
+
+def test_localized_remainders_match_whole_base():
+    rng = random.Random(31)
+    groups = [[Atom(name) for name in "pqr"], [Atom(name) for name in "stu"], [Atom(name) for name in "vw"]]
+    for _ in range(30):
+        local, whole = BeliefBase(engine="sat"), BeliefBase(engine="sat", relevance_filter=False)
+        for _ in range(rng.randint(1, 7)):
+            belief, priority = random_formula(rng, rng.choice(groups), 2), rng.randint(0, 3)
+            local.add(belief, priority)
+            whole.add(belief, priority)
+        phi = random_formula(rng, rng.choice(groups), 2)
+        for method in ("combinations", "incremental", "mcs"):
+            assert local.compute_remainders(phi, method) == whole.compute_remainders(phi, method)
+        assert local.best_remainders(phi) == whole.best_remainders(phi)
+        assert local.compute_kernels(phi) == whole.compute_kernels(phi)
+    # Contracting a formula about p leaves the beliefs about s untouched, the same objects with the same clauses
+    p, q, s, t = Atom("p"), Atom("q"), Atom("s"), Atom("t")
+    agent = BeliefRevisionAgent(engine="sat")
+    for belief in (p, Implies(p, q), s, Implies(s, t)):
+        agent.expand(belief)
+    assert sorted(map(len, agent.base.components())) == [2, 2]
+    untouched = agent.base.get_beliefs()[2:]
+    agent.contract_partial_meet(q)
+    assert not agent.ask(q) and agent.ask(t)
+    assert all(any(belief is kept for kept in agent.base.get_beliefs()) for belief in untouched)
+    # A belief about p and s joins two components, and removing it splits them again
+    KB = BeliefBase()
+    for belief in (p, s, Or(p, s)):
+        KB.add(belief)
+    assert KB.components() == [[0, 1, 2]]
+    KB.remove(Or(p, s))
+    assert KB.components() == [[0], [1]]
+
+def entails_subset(KB, indexes, phi):
+    sub = BeliefBase()
+    for i in indexes:
+        sub.add(*KB.beliefs[i])
+    return sub.entails(phi)
+
 if __name__ == "__main__":
     # test_entailment()
     test_contraction()
-    # print("All tests passed ✅")
\ No newline at end of file
+    # print("All tests passed ✅")
+
+def test_operand_order_does_not_depend_on_history():
+    p, q = Atom("p"), Atom("q")
+    first = And(p, q, p)
+    assert And(q, p) is first and first.formulas == (p, q) and str(first) == "(p) ∧ (q)"
+    # Whichever order an equal node was first built with, the same text comes back
+    assert str(parse_formula("q ∨ p")) == str(Or(q, p)) == "(p) ∨ (q)"
+    assert Equiv(q, p) is Equiv(p, q) and (Equiv(q, p).left, Equiv(q, p).right) == (p, q)
+    assert pickle.loads(pickle.dumps(And(q, Or(q, p)))) is And(Or(p, q), q)
@@ -0,0 +1,29 @@
+import io
+from Belief_base.belief_base import BeliefBase
+from Belief_base.formula import Atom
+from benchmarks import generators
+from benchmarks.run import run, compare
+
+def test_generators():
+    # Same seed, same formulas
+    assert generators.random_kcnf(10, 30, seed=4) == generators.random_kcnf(10, 30, seed=4)
+    assert generators.prioritized_base(8, seed=4) == generators.prioritized_base(8, seed=4)
+    beliefs, query = generators.chain(5)
+    KB = BeliefBase(engine="sat")
+    for belief in beliefs:
+        KB.add(belief)
+    assert KB.entails(query)
+    # More pigeons than holes is unsatisfiable, as many pigeons as holes is not
+    for pigeons, consistent in ((3, True), (4, False)):
+        KB = BeliefBase(engine="sat")
+        for belief in generators.pigeonhole(pigeons, 3):
+            KB.add(belief)
+        assert KB.entails(Atom("unrelated")) != consistent
+
+def test_run_and_compare():
+    report = run(quick=True, repeats=1, name_filter="entails/sat/chain", out=io.StringIO())
+    assert sorted(report["results"]) == ["entails/sat/chain-10", "entails/sat/chain-20"]
+    # Against a baseline that was twice as fast, both scenarios are regressions
+    baseline = {"results": {name: {"min": result["min"] / 2} for name, result in report["results"].items()}}
+    assert compare(baseline, report, threshold=0.5, out=io.StringIO()) == sorted(report["results"])
+    assert compare(report, report, out=io.StringIO()) == []
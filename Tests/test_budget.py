@@ -0,0 +1,71 @@
+import pytest
+from Belief_base.belief_base import BeliefBase
+from Belief_base.budget import Budget, BudgetExceeded, EntailmentResult, ENTAILED, NOT_ENTAILED, UNKNOWN
+from Belief_base.entailment import negated_query_clauses
+from Belief_base.formula import Atom, Not, Implies
+from Belief_base.incremental import IncrementalEntailment
+from Agent.agent import BeliefRevisionAgent
+from benchmarks import generators
+
+def pigeonhole_base(engine, pigeons, **options):
+    KB = BeliefBase(engine=engine, **options)
+    for belief in generators.pigeonhole(pigeons, pigeons - 1):
+        KB.add(belief)
+    return KB
+
+def test_entailment_within_budget():
+    # Without the relevance filter the engine itself runs out, with it the consistency check of the filter does
+    for engine, relevance_filter in (("resolution", False), ("sat", False), ("resolution", True)):
+        KB = pigeonhole_base(engine, 5, relevance_filter=relevance_filter)
+        result = KB.entails(Atom("x"), budget=Budget(max_resolvents=5))
+        assert result.status == UNKNOWN and result.reason == "max_resolvents"
+        assert result.stats["resolvents"] > 5 and result.entailed is None
+        with pytest.raises(ValueError):
+            bool(result)
+        # Unknown answers are not cached, so the same query with enough budget is decided
+        assert len(KB.entailment_cache) == 0
+        assert KB.entails(Atom("x"), budget=Budget(seconds=60)) == EntailmentResult(ENTAILED)
+        assert KB.entails(Atom("x"), budget=Budget(seconds=0)).stats == {"cached": True}
+    KB = pigeonhole_base("resolution", 5, relevance_filter=False)
+    assert KB.entails(Atom("x"), budget=Budget(max_clauses=20)).reason == "max_clauses"
+    assert KB.entails(Atom("x"), budget=Budget(seconds=0)).reason == "deadline"
+    assert KB.entails(Not(Atom("x")), engine="bdd", budget=Budget(seconds=60)).status == ENTAILED
+    KB = BeliefBase()
+    KB.add(Atom("p"))
+    assert not KB.entails(Atom("q"), budget=Budget(seconds=60)) and KB.entails(Atom("q"), budget=Budget()).status == NOT_ENTAILED
+
+def test_incremental_checker_survives_budget():
+    KB = pigeonhole_base("sat", 6)
+    checker = IncrementalEntailment(KB.get_belief_clauses(), negated_query_clauses(Atom("x")))
+    everything = range(len(KB.beliefs))
+    with pytest.raises(BudgetExceeded):
+        checker.entails(everything, Budget(max_resolvents=3))
+    assert checker.entails(everything)
+
+def test_contraction_unknown_policies():
+    p, q = Atom("p"), Atom("q")
+    def agent(policy):
+        agent = BeliefRevisionAgent(unknown_policy=policy)
+        agent.expand(p, 2)
+        agent.expand(Implies(p, q), 1)
+        return agent
+    before = agent("raise").base.get_prioritized_beliefs()
+    # Out of time before the first check: raise leaves the beliefs alone, so does not_entailed (nothing is proven
+    # entailed), and entailed removes everything since no subset was proven safe to keep
+    strict = agent("raise")
+    with pytest.raises(BudgetExceeded):
+        strict.contract_partial_meet(q, budget=Budget(seconds=0))
+    assert strict.base.get_prioritized_beliefs() == before
+    lenient = agent("not_entailed")
+    lenient.revise(Not(q), budget=Budget(seconds=0))
+    assert len(lenient.base.beliefs) == 3
+    cautious = agent("entailed")
+    cautious.contract_partial_meet(q, budget=Budget(seconds=0))
+    assert cautious.base.beliefs == []
+    # With enough budget it is the usual contraction
+    bounded, unbounded = agent("raise"), agent("raise")
+    bounded.revise(Not(q), budget=Budget(seconds=60, max_resolvents=10_000))
+    unbounded.revise(Not(q))
+    assert bounded.base.get_prioritized_beliefs() == unbounded.base.get_prioritized_beliefs()
+    with pytest.raises(ValueError):
+        bounded.revise(q, strategy="kernel", budget=Budget())
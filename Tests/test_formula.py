@@ -0,0 +1,73 @@
+import pickle
+from Belief_base.formula import Atom, Not, Or, And, Implies, Equiv
+from Belief_base.belief_base import BeliefBase
+
+def test_equal_formulas_are_the_same_object():
+    p, q = Atom("p"), Atom("q")
+    assert Atom("p") is p
+    assert And(p, q) is And(q, p)
+    assert Or(p, Not(q)) is Or(Not(q), p)
+    assert Equiv(p, q) is Equiv(q, p)
+    assert Implies(p, q) is not Implies(q, p)
+    assert len({And(p, q), And(q, p), Or(p, q)}) == 2
+
+def test_formulas_are_immutable_and_picklable():
+    p, q = Atom("p"), Atom("q")
+    formula = Implies(And(p, q), Not(p))
+    try:
+        formula.premise = q
+        assert False, "Expected formulas to be immutable"
+    except AttributeError:
+        pass
+    assert not hasattr(formula, "__dict__")
+    assert pickle.loads(pickle.dumps(formula)) is formula
+    assert formula.symbols() == {"p", "q"}
+
+def test_remove_uses_interned_formulas():
+    p, q = Atom("p"), Atom("q")
+    KB = BeliefBase()
+    KB.add(Or(p, q))
+    KB.add(p)
+    KB.remove(Or(q, p))
+    assert KB.get_beliefs() == [p]
+
+def test_compile_matches_evaluate():
+    import random
+    from itertools import product
+    from Tests.test_belief_base import random_formula
+    rng = random.Random(29)
+    atoms = [Atom(name) for name in "pqrs"]
+    rows = list(product([False, True], repeat=4))
+    for _ in range(100):
+        formula = random_formula(rng, atoms, 3)
+        expected = [formula.evaluate(dict(zip("pqrs", row))) for row in rows]
+        compiled = formula.compile("pqrs")
+        assert [compiled(*row) for row in rows] == expected
+        assert formula.evaluate_many(rows, symbols="pqrs") == expected
+    # Deep nesting is compiled without recursion
+    deep = atoms[0]
+    for i in range(5000):
+        deep = Not(deep) if i % 2 else And(deep, atoms[1])
+    compiled = deep.compile(("p", "q"))
+    # Every And(x, q) with q true is x, and the Nots come in pairs
+    assert compiled(True, True) is True and compiled(False, True) is False
+
+def test_evaluate_many_reuses_the_compiled_function(monkeypatch):
+    import Belief_base.formula as formula_module
+    p, q = Atom("p"), Atom("q")
+    formula = Implies(p, Or(q, Not(p)))
+    rows = [(False, True), (True, False)]
+    assert formula.evaluate_many(rows) == [True, False]
+    compiled = formula.compile()
+    # Once compiled, neither the default order nor the same order given explicitly generates code again
+    monkeypatch.setattr(formula_module, "_compile", None)
+    assert formula.evaluate_many(rows) == formula.evaluate_many(rows, symbols="pq") == [True, False]
+    assert formula.compile(("p", "q")) is compiled
+
+def test_evaluate_many_on_numpy_arrays():
+    np = __import__("pytest").importorskip("numpy")
+    p, q = Atom("p"), Atom("q")
+    rows = np.array([[False, False], [False, True], [True, False], [True, True]])
+    assert Implies(p, q).evaluate_many(rows).tolist() == [True, True, False, True]
+    assert Equiv(p, Not(q)).evaluate_many(rows).tolist() == [False, True, True, False]
+    assert p.evaluate_many(rows, symbols=("p", "q")).tolist() == [False, False, True, True]
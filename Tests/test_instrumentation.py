@@ -0,0 +1,46 @@
+from Belief_base import instrumentation
+from Belief_base.formula import Atom, Not, Implies
+from Agent.agent import BeliefRevisionAgent
+
+def make_agent(**options):
+    p, q, r = Atom("p"), Atom("q"), Atom("r")
+    agent = BeliefRevisionAgent(**options)
+    agent.expand(p, 3)
+    agent.expand(Implies(p, q), 2)
+    agent.expand(Implies(q, r), 1)
+    return agent
+
+def test_collecting_counts_nested_operations():
+    agent = make_agent()
+    with instrumentation.collecting() as stats:
+        agent.revise(Not(Atom("r")))
+    revise = instrumentation.last()
+    assert revise.operation == "revise"
+    # The revise call is the only operation of the block, so the block saw exactly what revise saw
+    assert stats.counters == revise.counters
+    assert revise.counters["subsets_tested"] > 0 and revise.counters["resolvents"] > 0
+    assert revise.counters["cache_misses"] > 0
+    # Nested operations show up as phases, and they are part of revise's wall time
+    for name in ("contract_partial_meet", "compute_remainders", "resolution_refutes", "expand"):
+        assert 0 < revise.phases[name] <= revise.seconds
+    assert not instrumentation.ENABLED
+
+def test_hooks_aggregates_and_disabled():
+    agent = make_agent(engine="sat")
+    instrumentation.reset()
+    seen = []
+    instrumentation.add_hook(seen.append)
+    try:
+        # Off: nothing is recorded
+        agent.ask(Atom("r"))
+        assert seen == [] and instrumentation.aggregates() == {}
+        with instrumentation.collecting():
+            agent.ask(Atom("q"))
+            agent.ask(Atom("q"))
+    finally:
+        instrumentation.remove_hook(seen.append)
+    # Every finished operation reaches the hook, nested ones first
+    assert [stats.operation for stats in seen] == ["sat_refutes", "entails", "ask", "entails", "ask"]
+    totals = instrumentation.aggregates()
+    assert totals["ask"]["calls"] == 2 and totals["entails"]["counters"]["cache_hits"] == 1
+    assert totals["sat_refutes"]["counters"]["clauses_in"] > 0
@@ -1,5 +1,33 @@
 import os
-from Belief_base.parser import parse_file
+from Belief_base.parser import parse_file, parse_formula, iter_file, load_into
+from Belief_base.formula import Atom, Not, And, Or, Implies
+from Belief_base.belief_base import BeliefBase
+
+def test_chains_are_flat():
+    p, q, r, s = Atom("p"), Atom("q"), Atom("r"), Atom("s")
+    formula = parse_formula("p ∧ q ∧ (r ∧ s)")
+    assert isinstance(formula, And) and len(formula.formulas) == 4
+    assert parse_formula("¬p ∨ q ∧ r → s") == Implies(Or(Not(p), And(q, r)), s)
+    # Binary connectives still group to the left
+    assert parse_formula("p → q → r") == Implies(Implies(p, q), r)
+
+def test_deep_nesting_does_not_recurse():
+    depth = 5000
+    assert parse_formula("(" * depth + "p" + ")" * depth) == Atom("p")
+    chain = parse_formula(" ∨ ".join(f"a{i}" for i in range(depth)))
+    assert len(chain.formulas) == depth
+
+def test_load_into_collects_errors(tmp_path):
+    path = tmp_path / "beliefs.txt"
+    path.write_text("p;1\n(p → q);2\n(p ∧;3\n\nq\n", encoding="utf-8")
+    errors = []
+    assert [priority for _, priority in iter_file(str(path), errors)] == [1, 2, 0]
+    assert [error.line_number for error in errors] == [3]
+    KB = BeliefBase()
+    report = load_into(KB, str(path))
+    assert report.loaded == 3 and len(report.errors) == 1
+    assert report.lines_per_second > 0
+    assert KB.entails(Atom("q"))
 
 if __name__ == "__main__":
     # build path to the .txt in this tests folder
@@ -0,0 +1,75 @@
+import random
+from itertools import product
+from Belief_base.sat_solver import CDCLSolver
+from Belief_base.belief_base import BeliefBase
+from Belief_base.formula import Atom, Not, Or, And, Implies, Equiv
+from Belief_base.entailment import resolution_entails, sat_entails
+from Agent.agent import BeliefRevisionAgent
+
+# Try every assignment, only usable for a handful of variables
+def brute_force_sat(clauses, n):
+    for bits in product([False, True], repeat=n):
+        if all(any(bits[abs(l) - 1] == (l > 0) for l in c) for c in clauses):
+            return True
+    return False
+
+def test_random_3cnf_matches_brute_force():
+    rng = random.Random(0)
+    for _ in range(200):
+        n = rng.randint(3, 8)
+        clauses = [[rng.choice([-1, 1]) * rng.randint(1, n) for _ in range(3)] for _ in range(rng.randint(1, 40))]
+        solver = CDCLSolver(clauses)
+        result = solver.solve()
+        assert result == brute_force_sat(clauses, n)
+        # A reported model must actually satisfy every clause
+        if result:
+            assert all(any(solver.model[abs(l)] == (l > 0) for l in c) for c in clauses)
+
+def test_pigeonhole_is_unsat():
+    # 5 pigeons in 4 holes, variable for (pigeon i, hole j) is i * 4 + j + 1
+    pigeons, holes = 5, 4
+    var = lambda i, j: i * holes + j + 1
+    clauses = [[var(i, j) for j in range(holes)] for i in range(pigeons)]
+    for j in range(holes):
+        for a in range(pigeons):
+            for b in range(a + 1, pigeons):
+                clauses.append([-var(a, j), -var(b, j)])
+    assert not CDCLSolver(clauses).solve()
+
+# KB ⊨ query checked by evaluating every assignment of the symbols involved
+def truth_table_entails(kb, query):
+    symbols = sorted(set().union(query.symbols(), *[f.symbols() for f in kb.get_beliefs()]))
+    for bits in product([False, True], repeat=len(symbols)):
+        model = dict(zip(symbols, bits))
+        if all(f.evaluate(model) for f in kb.get_beliefs()) and not query.evaluate(model):
+            return False
+    return True
+
+def test_sat_engine_matches_truth_table():
+    p, q, r = Atom("p"), Atom("q"), Atom("r")
+    KB = BeliefBase()
+    KB.add(Implies(p, q))
+    KB.add(Equiv(q, r))
+    KB.add(Or(p, r))
+    for query in [q, r, p, Not(p), And(q, r), Or(Not(p), q), And(p, Not(p))]:
+        assert sat_entails(KB, query) == truth_table_entails(KB, query)
+
+def test_sat_engine_agrees_with_resolution():
+    p, q = Atom("p"), Atom("q")
+    KB = BeliefBase()
+    KB.add(Implies(p, q))
+    KB.add(p)
+    for query in [q, p, Not(q), Or(p, q), And(p, Not(p))]:
+        assert sat_entails(KB, query) == resolution_entails(KB, query)
+
+def test_agent_with_sat_engine():
+    p, q, r = Atom("p"), Atom("q"), Atom("r")
+    agents = [BeliefRevisionAgent(), BeliefRevisionAgent(engine="sat")]
+    for agent in agents:
+        agent.base.add(Implies(p, q), priority=2)
+        agent.base.add(p, priority=1)
+        agent.base.add(Or(Not(q), r), priority=3)
+        agent.contract_partial_meet(q)
+        agent.revise(Not(r))
+    assert set(agents[0].base.get_beliefs()) == set(agents[1].base.get_beliefs())
+    assert not agents[1].ask(r)
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import time
+from Agent.agent import BeliefRevisionAgent
+from Agent.client import AgentClient, AgentError
+from Agent.server import AgentServer, LatencyHistogram
+
+def test_pipelined_requests_over_tcp():
+    async def main():
+        server = AgentServer(lambda: BeliefRevisionAgent(engine="sat"))
+        await server.start()
+        host, port = server.address[:2]
+        client = await AgentClient.connect(host, port)
+        # Sent back to back without waiting: the mutations are applied in order before the asks that follow them
+        results = await asyncio.gather(client.expand("p → q", priority=2), client.expand("p", priority=1),
+                                       client.ask("q"), client.ask("¬q"), client.ask("p ∧ q"))
+        assert results == [None, None, True, False, True]
+        await client.revise("¬q")
+        assert await client.ask("¬q") and not await client.ask("q")
+        assert await client.ask("¬q", budget={"seconds": 5}) == "entailed"
+        assert await client.ask("r", budget={"seconds": 0}) == "unknown"
+        # A second agent on the same server starts out empty
+        other = await AgentClient.connect(host, port, agent="other")
+        assert await other.beliefs() == []
+        try:
+            await client.ask("p ∧")
+            assert False, "Expected a parse error"
+        except AgentError as e:
+            assert "Unexpected end of tokens" in str(e)
+        stats = await client.stats()
+        assert stats["ask"]["count"] >= 5 and stats["expand"]["count"] == 2
+        await client.close()
+        await other.close()
+        await server.close()
+    asyncio.run(main())
+
+def test_pipelined_ask_sees_only_earlier_writes():
+    async def main():
+        server = AgentServer(lambda: BeliefRevisionAgent(engine="sat"))
+        await server.start()
+        client = await AgentClient.connect(*server.address[:2])
+        # The first ask comes after the expand and before the revise, the second one after both
+        results = await asyncio.gather(client.expand("p"), client.ask("p"), client.revise("¬p"), client.ask("p"),
+                                       client.beliefs())
+        assert results == [None, True, None, False, ["0: ¬(p)"]]
+        await client.close()
+        await server.close()
+    asyncio.run(main())
+
+def test_handler_survives_a_broken_connection():
+    class BrokenWriter:
+        closed = False
+        def write(self, data):
+            pass
+        async def drain(self):
+            raise ConnectionResetError("Connection reset by peer")
+        def is_closing(self):
+            return self.closed
+        def close(self):
+            self.closed = True
+
+    async def main():
+        server = AgentServer()
+        queue = asyncio.Queue()
+        for i in range(3):
+            queue.put_nowait((time.perf_counter(), json.dumps({"id": i, "op": "expand", "formula": f"p{i}"}).encode()))
+        handler = asyncio.create_task(server._handle(queue, BrokenWriter()))
+        # Every request is still taken off the queue, so a connection that waits for it to drain can finish
+        await asyncio.wait_for(queue.join(), 5)
+        assert not handler.done()
+        handler.cancel()
+        assert len(server.agents["default"].base.beliefs) == 3
+        server.executor.shutdown()
+    asyncio.run(main())
+
+def test_unix_socket(tmp_path):
+    async def main():
+        server = AgentServer()
+        path = str(tmp_path / "agent.sock")
+        await server.start(path=path)
+        client = await AgentClient.connect(path=path)
+        await client.expand("p ∨ q")
+        # Kernel contraction can't run under a budget, so it is refused instead of running without one
+        for op in (client.contract, client.revise):
+            try:
+                await op("¬p", strategy="kernel", budget={"seconds": 5})
+                assert False, "Expected an error for a kernel contraction with a budget"
+            except AgentError as e:
+                assert "strategy='partial_meet'" in str(e)
+        assert len(await client.beliefs()) == 1
+        await client.contract("p ∨ q", strategy="kernel")
+        assert await client.beliefs() == []
+        await client.close()
+        await server.close()
+    asyncio.run(main())
+
+def test_missing_formula_is_named_in_the_error():
+    import Agent.server
+    assert Agent.server.__doc__.lstrip().startswith("asyncio server")
+    async def main():
+        server = AgentServer(lambda: BeliefRevisionAgent(engine="sat"))
+        try:
+            await server.dispatch({"id": 1, "op": "ask"})
+            assert False, "Expected a missing field error"
+        except ValueError as e:
+            assert "'formula'" in str(e) and "ask" in str(e)
+        server.executor.shutdown()
+    asyncio.run(main())
+
+def test_latency_histogram():
+    histogram = LatencyHistogram()
+    for micros in [3, 5, 900, 1000, 1100]:
+        histogram.record(micros / 1e6)
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 5
+    # The median is in the bucket of 900 µs, [512, 1024)
+    assert snapshot["p50_ms"] == 1.024 and snapshot["max_ms"] == 1.1
@@ -0,0 +1,38 @@
+import random
+import pytest
+from Belief_base import truth_table
+from Belief_base.truth_table import truth_table_refutes
+from Belief_base.belief_base import BeliefBase
+from Belief_base.formula import Atom
+from Belief_base.entailment import sat_refutes
+from Tests.test_belief_base import random_formula
+
+def random_clauses(rng, n, m):
+    return [tuple(sorted({rng.choice([-1, 1]) * rng.randint(1, n) for _ in range(3)})) for _ in range(m)]
+
+def test_truth_table_matches_sat(monkeypatch):
+    pytest.importorskip("numpy")
+    rng = random.Random(5)
+    for _ in range(200):
+        n = rng.randint(1, 12)
+        clauses = random_clauses(rng, n, rng.randint(0, 5 * n))
+        assert truth_table_refutes(clauses[::2], clauses[1::2]) == sat_refutes(clauses[::2], clauses[1::2])
+    # Tiny chunks, so the variables above the chunk size are exercised too
+    monkeypatch.setattr(truth_table, "CHUNK_WORDS", 4)
+    for _ in range(100):
+        n = rng.randint(6, 12)
+        clauses = random_clauses(rng, n, rng.randint(0, 5 * n))
+        assert truth_table_refutes(clauses, []) == sat_refutes(clauses, [])
+
+def test_auto_engine_matches_resolution():
+    # Runs with or without numpy: without it "auto" always uses the SAT solver
+    rng = random.Random(23)
+    atoms = [Atom(name) for name in "pqrs"]
+    for _ in range(50):
+        formulas = [random_formula(rng, atoms, 2) for _ in range(rng.randint(0, 4))]
+        query = random_formula(rng, atoms, 2)
+        bases = [BeliefBase(engine=engine) for engine in ("auto", "resolution")]
+        for base in bases:
+            for formula in formulas:
+                base.add(formula)
+        assert bases[0].entails(query) == bases[1].entails(query)
@@ -0,0 +1,57 @@
+import random
+from itertools import product
+from Belief_base.formula import Atom, Not, Or, And, Implies, Equiv
+from Belief_base.entailment import SymbolTable, extract_clauses
+from Belief_base.tseitin import tseitin_clauses
+from Belief_base.sat_solver import CDCLSolver
+from Belief_base.belief_base import BeliefBase
+from Tests.test_belief_base import random_formula
+
+def is_satisfiable(formula):
+    symbols = sorted(formula.symbols())
+    return any(formula.evaluate(dict(zip(symbols, bits))) for bits in product([False, True], repeat=len(symbols)))
+
+def test_equisatisfiable_with_formula():
+    rng = random.Random(11)
+    atoms = [Atom(name) for name in "pqrs"]
+    table = SymbolTable()
+    for _ in range(300):
+        formula = random_formula(rng, atoms, 4)
+        assert CDCLSolver(tseitin_clauses(formula, table)).solve() == is_satisfiable(formula)
+
+def test_cnf_input_gives_same_clauses():
+    table = SymbolTable()
+    p, q, r = Atom("p"), Atom("q"), Atom("r")
+    formula = And(Or(p, Not(q)), r, Or(Not(p), q, r))
+    assert sorted(tseitin_clauses(formula, table)) == sorted(extract_clauses(formula, table))
+
+def test_equiv_chain_stays_linear():
+    table = SymbolTable()
+    atoms = [Atom(f"p{i}") for i in range(20)]
+    chain = atoms[0]
+    for atom in atoms[1:]:
+        chain = Equiv(chain, atom)
+    # to_cnf would need 2^19 clauses for this formula
+    assert len(tseitin_clauses(chain, table)) < 100
+    # With store_cnf=False the belief is never run through to_cnf
+    KB = BeliefBase(engine="sat", store_cnf=False)
+    KB.add(chain)
+    assert not KB.entails(atoms[0])
+    assert KB.entails(Or(chain, atoms[3]))
+
+def test_auxiliary_atoms_of_dropped_formulas_are_released():
+    table = SymbolTable()
+    p, q, r = Atom("p"), Atom("q"), Atom("r")
+    belief = Or(And(p, q), r)
+    clauses = tseitin_clauses(belief, table)
+    assert len(table.aux_ids) == 1
+    tseitin_clauses(Or(And(q, r), p), table)
+    # The second formula is gone, so its auxiliary atom is too, and the belief's one still has its number
+    assert len(table.aux_ids) == 1 and tseitin_clauses(belief, table) == clauses
+    assert table.name(table.aux_ids[And(p, q)]).startswith("_aux")
+    # A cached answer keeps its query's auxiliary atoms, so asking again is a cache hit
+    KB = BeliefBase(engine="sat")
+    KB.add(p)
+    # ¬query is (¬q ∧ ¬r) ∨ (¬p ∧ ¬r), which needs auxiliary atoms
+    assert not KB.entails(And(Or(q, r), Or(p, r)))
+    assert KB.entails(And(Or(q, r), Or(p, r))) is False and KB.cache_stats()["hits"] == 1
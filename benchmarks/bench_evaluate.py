@@ -0,0 +1,44 @@
+"""
+Compares Formula.evaluate with the compiled function of Formula.compile and with Formula.evaluate_many.
+
+Run from the root directory:
+    python -m benchmarks.bench_evaluate
+"""
+
+import random
+import time
+from itertools import product
+from Belief_base.formula import Atom
+from benchmarks.generators import random_formula
+
+def timed(label, function, count):
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+    print(f"{label:<28}{seconds:>9.3f} s {count / seconds:>14,.0f} assignments/s")
+    return result
+
+def main(num_atoms=16, depth=10, seed=0):
+    rng = random.Random(seed)
+    names = [f"x{i}" for i in range(num_atoms)]
+    formula = random_formula(rng, [Atom(name) for name in names], depth)
+    symbols = tuple(sorted(formula.symbols()))
+    rows = list(product([False, True], repeat=len(symbols)))
+    print(f"{len(symbols)} symbols, {len(rows)} assignments")
+
+    dicts = [dict(zip(symbols, row)) for row in rows]
+    expected = timed("evaluate (recursive)", lambda: [formula.evaluate(d) for d in dicts], len(rows))
+    compiled = formula.compile()
+    assert timed("compile() per row", lambda: [compiled(*row) for row in rows], len(rows)) == expected
+    assert timed("evaluate_many (tuples)", lambda: formula.evaluate_many(rows), len(rows)) == expected
+    try:
+        import numpy as np
+    except ImportError:
+        print("numpy is not installed, skipping evaluate_many on arrays")
+        return
+    array = np.array(rows, dtype=bool)
+    result = timed("evaluate_many (numpy)", lambda: formula.evaluate_many(array), len(rows))
+    assert result.tolist() == expected
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import random
+from itertools import combinations
+from typing import List, Tuple
+from Belief_base.formula import Formula, Atom, Not, And, Or, Implies, Equiv
+
+"""
+Seeded generators of belief bases for the benchmarks. The same arguments and seed always give the same formulas, so
+two runs (or a run and a saved baseline) time exactly the same work.
+
+    random_kcnf(atoms, clauses, k)   random clauses of k literals, one belief per clause
+    chain(length)                    x0, x0 → x1, ..., the query x0 → x<length> needs every link
+    pigeonhole(pigeons, holes)       every pigeon in a hole and no two in the same hole, unsatisfiable when
+                                     pigeons > holes and famously hard for resolution
+    prioritized_base(size)           random small formulas with priorities, for contraction and revision
+    subsystems(count, size)          count independent groups of size prioritized clauses, each over its own atoms
+    random_formula(atoms, depth)     one random formula with every connective, for parsing and to_cnf
+"""
+
+def atoms(count: int, prefix: str = "x") -> List[Atom]:
+    return [Atom(f"{prefix}{i}") for i in range(count)]
+
+def _literal(rng, pool):
+    atom = rng.choice(pool)
+    return atom if rng.random() < 0.5 else Not(atom)
+
+def random_kcnf(num_atoms: int, num_clauses: int, k: int = 3, seed: int = 0) -> List[Formula]:
+    """num_clauses clauses over num_atoms atoms, each with k literals over distinct atoms."""
+    rng = random.Random(seed)
+    pool = atoms(num_atoms)
+    clauses = []
+    for _ in range(num_clauses):
+        chosen = rng.sample(pool, k)
+        clauses.append(Or(*[atom if rng.random() < 0.5 else Not(atom) for atom in chosen]))
+    return clauses
+
+def chain(length: int) -> Tuple[List[Formula], Formula]:
+    """The beliefs x0, x0 → x1, ..., x<length-1> → x<length> and the query x<length> they entail."""
+    pool = atoms(length + 1)
+    beliefs = [pool[0]] + [Implies(pool[i], pool[i + 1]) for i in range(length)]
+    return beliefs, pool[length]
+
+def pigeonhole(pigeons: int, holes: int) -> List[Formula]:
+    """
+    The pigeonhole principle as clauses over the atoms p<i>_<j> (pigeon i sits in hole j): every pigeon sits in some
+    hole, and no hole holds two pigeons.
+    """
+    sits = [[Atom(f"p{i}_{j}") for j in range(holes)] for i in range(pigeons)]
+    beliefs: List[Formula] = [Or(*row) if len(row) > 1 else row[0] for row in sits]
+    for j in range(holes):
+        for a, b in combinations(range(pigeons), 2):
+            beliefs.append(Or(Not(sits[a][j]), Not(sits[b][j])))
+    return beliefs
+
+# Each node below the top is a literal with probability leaf_probability, and every node at the given depth is one
+def random_formula(rng: random.Random, pool: List[Atom], depth: int, leaf_probability: float = 0.2) -> Formula:
+    if depth == 0 or rng.random() < leaf_probability:
+        return _literal(rng, pool)
+    kind = rng.choice([And, Or, Implies, Equiv, Not])
+    if kind is Not:
+        return Not(random_formula(rng, pool, depth - 1, leaf_probability))
+    return kind(random_formula(rng, pool, depth - 1, leaf_probability),
+                random_formula(rng, pool, depth - 1, leaf_probability))
+
+def prioritized_base(size: int, num_atoms: int = None, depth: int = 2, max_priority: int = 5,
+                     seed: int = 0) -> List[Tuple[Formula, int]]:
+    """size random formulas of the given depth with priorities from 0 to max_priority, over size // 2 + 2 atoms by default."""
+    rng = random.Random(seed)
+    pool = atoms(num_atoms or size // 2 + 2)
+    return [(random_formula(rng, pool, depth), rng.randint(0, max_priority)) for _ in range(size)]
+
+def subsystems(count: int, size: int = 4, num_atoms: int = 3, max_priority: int = 5,
+               seed: int = 0) -> List[Tuple[Formula, int]]:
+    """
+    count sub-theories that share no atom, like one per device: size clauses of two literals over the atoms
+    s<i>_0, s<i>_1, ... of subsystem i, with priorities. Every literal is true under one random assignment per
+    subsystem, so the base is consistent and no disjunction of its beliefs is a tautology.
+    """
+    rng = random.Random(seed)
+    beliefs = []
+    for i in range(count):
+        pool = atoms(num_atoms, prefix=f"s{i}_")
+        model = {atom: rng.random() < 0.5 for atom in pool}
+        for _ in range(size):
+            clause = Or(*[atom if model[atom] else Not(atom) for atom in rng.sample(pool, 2)])
+            beliefs.append((clause, rng.randint(0, max_priority)))
+    return beliefs
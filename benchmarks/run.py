@@ -0,0 +1,229 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from functools import partial
+from Belief_base.belief_base import BeliefBase, REMAINDER_METHODS, SELECTION_METHODS, COMPILED_ENGINES
+from Belief_base.entailment import ENGINES, resolution_entails
+from Belief_base.formula import And, Or
+from Belief_base.parser import parse_formula
+from Belief_base import truth_table
+from Agent.agent import BeliefRevisionAgent
+from benchmarks import generators
+
+"""
+Timed scenarios over the seeded generators in generators.py, written to a JSON file that a later run can be compared
+against.
+
+Run from the root directory:
+    python -m benchmarks.run --output before.json
+    ... change something ...
+    python -m benchmarks.run --output after.json --baseline before.json
+
+Every scenario has a name like "entails/sat/chain-40" (what is timed / engine or method / instance). Each repeat
+builds its input from scratch outside of the timed part (contraction changes the base, and the entailment cache would
+answer a repeated query for free), and the file keeps the fastest and the median time of the repeats. With a baseline,
+every scenario present in both files gets the ratio new / old, and the run exits with status 1 if any scenario is
+slower than the baseline by more than --threshold, so it can guard a CI job.
+
+--quick uses smaller instances, --filter only runs the scenarios whose name contains the given text.
+"""
+
+# Engines that can run here, the truth table engine needs numpy
+def _engines():
+    engines = [engine for engine in sorted(ENGINES) if engine != "truth_table" or truth_table.available()]
+    return engines + list(COMPILED_ENGINES)
+
+# The remainder methods timed by default, "parallel" starts a process pool and is only worth it on several cores
+TIMED_REMAINDER_METHODS = [method for method in REMAINDER_METHODS if method != "parallel"]
+
+def _base(beliefs, **options):
+    base = BeliefBase(**options)
+    for belief in beliefs:
+        if isinstance(belief, tuple):
+            base.add(*belief)
+        else:
+            base.add(belief)
+    return base
+
+def _agent(beliefs, **options):
+    agent = BeliefRevisionAgent(**options)
+    for belief, priority in beliefs:
+        agent.expand(belief, priority)
+    return agent
+
+# A formula the base is known to entail, so contraction has real work to do: the conjunction of its first and last belief
+def _entailed(beliefs):
+    return And(beliefs[0][0], beliefs[-1][0])
+
+def _scenario(build, call):
+    """A setup function: build() makes the input of one repeat outside of the timing, call(input) is what is timed."""
+    def setup():
+        target = build()
+        return lambda: call(target)
+    return setup
+
+def _revise_each(agent, stream):
+    for formula, priority in stream:
+        agent.revise(formula, priority)
+
+def scenarios(quick=False):
+    """
+    The scenarios as (name, setup) pairs. setup() builds the input of one repeat and returns the function to time.
+    """
+    chains = [10, 20] if quick else [20, 50, 100]
+    # About 4.26 clauses per atom, where random 3-CNF is hardest
+    kcnf = [(12, 51)] if quick else [(20, 85), (40, 170)]
+    holes = [2] if quick else [2, 3, 4]
+    bases = [6, 8] if quick else [8, 12, 16]
+    streams = [10] if quick else [10, 20, 30]
+    result = []
+
+    # Parsing the text of random 3-CNF clauses and of deeper random formulas
+    def parse_all(texts):
+        return [parse_formula(text) for text in texts]
+    for num_atoms, num_clauses in kcnf:
+        texts = [str(clause) for clause in generators.random_kcnf(num_atoms, num_clauses * 5)]
+        result.append((f"parse_formula/kcnf-{num_atoms}-{len(texts)}", _scenario(lambda texts=texts: texts, parse_all)))
+    rng = random.Random(1)
+    pool = generators.atoms(8)
+    texts = [str(generators.random_formula(rng, pool, 6)) for _ in range(100 if quick else 300)]
+    result.append((f"parse_formula/random-depth6-{len(texts)}", _scenario(lambda: texts, parse_all)))
+
+    # to_cnf of random formulas, the distribution of ∨ over ∧ makes this grow quickly with the depth
+    for depth in ([3, 4] if quick else [3, 4, 5]):
+        rng = random.Random(depth)
+        formulas = [generators.random_formula(rng, pool, depth) for _ in range(100)]
+        result.append((f"to_cnf/random-depth{depth}-{len(formulas)}",
+                       _scenario(lambda formulas=formulas: formulas, lambda formulas: [f.to_cnf() for f in formulas])))
+
+    # Entailment queries, each with a fresh belief base so neither the clause cache nor the entailment cache helps
+    instances = []
+    for length in chains:
+        beliefs, query = generators.chain(length)
+        instances.append((f"chain-{length}", beliefs, query))
+    for num_atoms, num_clauses in kcnf:
+        beliefs = generators.random_kcnf(num_atoms, num_clauses)
+        instances.append((f"kcnf-{num_atoms}-{num_clauses}", beliefs, Or(*generators.atoms(3))))
+    for hole_count in holes:
+        # Unsatisfiable, so every query is entailed and proving it means refuting the pigeonhole principle
+        instances.append((f"pigeonhole-{hole_count + 1}-{hole_count}", generators.pigeonhole(hole_count + 1, hole_count),
+                          generators.atoms(1)[0]))
+    for label, beliefs, query in instances:
+        result.append((f"resolution_entails/{label}",
+                       _scenario(partial(_base, beliefs, cache_size=0), partial(resolution_entails, query=query))))
+        for engine in _engines():
+            result.append((f"entails/{engine}/{label}",
+                           _scenario(partial(_base, beliefs, engine=engine, cache_size=0),
+                                     lambda base, query=query: base.entails(query))))
+
+    # Remainders and contraction of prioritized bases of growing size
+    for size in bases:
+        beliefs = generators.prioritized_base(size)
+        phi = _entailed(beliefs)
+        for method in TIMED_REMAINDER_METHODS:
+            result.append((f"compute_remainders/{method}/base-{size}",
+                           _scenario(partial(_base, beliefs, engine="sat", remainder_method=method),
+                                     lambda base, phi=phi: base.compute_remainders(phi))))
+        for selection in SELECTION_METHODS:
+            result.append((f"contract_partial_meet/{selection}/base-{size}",
+                           _scenario(partial(_agent, beliefs, engine="sat", remainder_method="mcs", selection=selection),
+                                     lambda agent, phi=phi: agent.contract_partial_meet(phi))))
+
+    # Contraction of a base of independent subsystems by the disjunction of the beliefs of one of them, which every
+    # one of those beliefs entails on its own. Only that subsystem has to be searched
+    for count in ([4] if quick else [4, 16, 64]):
+        beliefs = generators.subsystems(count)
+        phi = Or(*[belief for belief, _ in beliefs[:4]])
+        for method in TIMED_REMAINDER_METHODS:
+            result.append((f"contract_partial_meet/{method}/subsystems-{count}",
+                           _scenario(partial(_agent, beliefs, engine="sat", remainder_method=method),
+                                     lambda agent, phi=phi: agent.contract_partial_meet(phi))))
+
+    # Revision of a base by a stream of formulas, one revise call at a time and through revise_many
+    for size in streams:
+        beliefs = generators.prioritized_base(size, seed=1)
+        stream = generators.prioritized_base(size, seed=2)
+        for engine in ("resolution", "sat"):
+            build = partial(_agent, beliefs, engine=engine, remainder_method="mcs", selection="branch_and_bound")
+            result.append((f"revise/{engine}/stream-{size}", _scenario(build, partial(_revise_each, stream=stream))))
+            result.append((f"revise_many/{engine}/stream-{size}",
+                           _scenario(build, lambda agent, stream=stream: agent.revise_many(stream))))
+    return result
+
+def measure(setup, repeats):
+    """Fastest and median time of repeats runs, each with a fresh input from setup()."""
+    times = []
+    for _ in range(repeats):
+        run = setup()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return {"min": min(times), "median": statistics.median(times), "repeats": repeats}
+
+def run(quick=False, repeats=3, name_filter=None, out=None):
+    """Times every scenario (containing name_filter, if given) and returns the results as a JSON-friendly dict."""
+    out = out or sys.stdout
+    results = {}
+    for name, setup in scenarios(quick):
+        if name_filter and name_filter not in name:
+            continue
+        results[name] = measure(setup, repeats)
+        print(f"{name:<52}{results[name]['min'] * 1e3:>12.3f} ms", file=out)
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": quick,
+        "results": results,
+    }
+
+def compare(baseline, current, threshold=0.25, out=None):
+    """
+    Prints old and new fastest times with their ratio for every scenario in both reports, and returns the names of
+    the scenarios that got slower by more than threshold (0.25 is 25 %).
+    """
+    out = out or sys.stdout
+    regressions = []
+    print(f"\n{'scenario':<52}{'baseline ms':>12}{'current ms':>12}{'ratio':>8}", file=out)
+    for name, result in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        ratio = result["min"] / old["min"] if old["min"] else float("inf")
+        mark = ""
+        if ratio > 1 + threshold:
+            mark = "  slower"
+            regressions.append(name)
+        elif ratio < 1 / (1 + threshold):
+            mark = "  faster"
+        print(f"{name:<52}{old['min'] * 1e3:>12.3f}{result['min'] * 1e3:>12.3f}{ratio:>8.2f}{mark}", file=out)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the belief revision operations on generated belief bases.")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against the results in this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="relative slowdown that counts as a regression (default 0.25)")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--quick", action="store_true", help="smaller instances")
+    parser.add_argument("--filter", help="only run scenarios whose name contains this text")
+    args = parser.parse_args(argv)
+
+    report = run(args.quick, args.repeats, args.filter)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(json.load(file), report, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} scenario(s) slower than the baseline")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())